@@ -0,0 +1,372 @@
+"""
+Замеры производительности анализа корпуса.
+
+Генерирует детерминированный синтетический корпус из словаря my_project/corpus,
+замеряет отдельные метрики, морфологию, запись CSV и отчёта и полный прогон
+analyze_corpus, сохраняет результаты в JSON и сравнивает их с прошлым замером.
+
+Пример:
+    python my_project/benchmark.py --files 1000 --output bench.json
+    python my_project/benchmark.py --files 1000 --baseline bench.json --threshold 0.2
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+from itertools import accumulate
+from collections import Counter
+
+from file_utils import get_files_in_folder, read_text_file, write_csv_file, write_text_file
+from text_utils import (TokenizedText, EncodedText, Vocabulary, count_words, count_unique_words, calculate_ttr,
+                        get_most_common_words, count_lines, average_word_length,
+                        calculate_mattr, calculate_mtld, calculate_hdd, count_ngrams,
+                        calculate_lexical_density)
+from morph_utils import PosTagCache, create_morph_analyzer
+from similarity_utils import find_duplicates
+from metric_utils import MetricPlan, parse_metrics
+from profile_utils import Profiler
+import main
+
+# Авторы синтетического корпуса: префикс имени файла и имя в метаданных
+AUTHORS = {
+    'limonov': 'Эдуард Лимонов',
+    'nekrasov': 'Всеволод Некрасов',
+    'sapgir': 'Генрих Сапгир',
+}
+
+# Размер стихотворения в строках: короткое и длинное
+SHORT_LINES = (4, 24)
+LONG_LINES = (150, 600)
+
+# Файл с параметрами, по которым сгенерирован корпус
+_CORPUS_MARKER = '.benchmark_corpus.json'
+
+
+def build_vocabulary(corpus_folder='my_project/corpus'):
+    """
+    Собирает словарь настоящего корпуса вместе с частотами слов.
+
+    Args:
+        corpus_folder (str): Папка с исходными текстами
+
+    Returns:
+        tuple: (слова, накопленные частоты) для random.choices
+    """
+    counts = Counter()
+    for filename in sorted(get_files_in_folder(corpus_folder, '.txt')):
+        counts.update(read_text_file(os.path.join(corpus_folder, filename)).split())
+    words = sorted(counts)
+    return words, list(accumulate(counts[word] for word in words))
+
+
+def generate_poem(rng, words, cum_weights, long_poem):
+    """
+    Сочиняет одно синтетическое стихотворение.
+
+    Args:
+        rng (random.Random): Генератор случайных чисел
+        words (list): Словарь
+        cum_weights (list): Накопленные частоты слов
+        long_poem (bool): Длинное (True) или короткое стихотворение
+
+    Returns:
+        str: Текст стихотворения
+    """
+    low, high = LONG_LINES if long_poem else SHORT_LINES
+    lines = []
+    for _ in range(rng.randint(low, high)):
+        if rng.random() < 0.1:
+            lines.append('')  # пустая строка между строфами
+        else:
+            lines.append(' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(1, 8))))
+    return '\n'.join(lines) + '\n'
+
+
+def generate_corpus(out_folder, n_files, seed=0, long_ratio=0.05, source_folder='my_project/corpus'):
+    """
+    Создаёт синтетический корпус с метаданными. Повторный вызов с теми же
+    параметрами ничего не делает.
+
+    Args:
+        out_folder (str): Папка для корпуса
+        n_files (int): Количество стихотворений
+        seed (int): Начальное значение генератора (корпус детерминирован)
+        long_ratio (float): Доля длинных стихотворений
+        source_folder (str): Папка с настоящим корпусом, откуда берётся словарь
+
+    Returns:
+        str: Путь к metadata.csv синтетического корпуса
+    """
+    params = {'files': n_files, 'seed': seed, 'long_ratio': long_ratio}
+    marker = os.path.join(out_folder, _CORPUS_MARKER)
+    metadata_path = os.path.join(out_folder, 'metadata.csv')
+    try:
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f) == params:
+                return metadata_path
+    except (OSError, ValueError):
+        pass
+
+    os.makedirs(out_folder, exist_ok=True)
+    for filename in get_files_in_folder(out_folder, '.txt'):
+        os.remove(os.path.join(out_folder, filename))
+
+    words, cum_weights = build_vocabulary(source_folder)
+    rng = random.Random(seed)
+    prefixes = list(AUTHORS)
+    metadata = []
+    for i in range(n_files):
+        prefix = prefixes[i % len(prefixes)]
+        filename = f'{prefix}{i:07d}.txt'
+        text = generate_poem(rng, words, cum_weights, rng.random() < long_ratio)
+        write_text_file(os.path.join(out_folder, filename), text)
+        title = ' '.join(text.split()[:4])
+        metadata.append([filename, title, AUTHORS[prefix], rng.randint(1966, 2011)])
+    write_csv_file(metadata_path, metadata, ['filename', 'title', 'author', 'year'])
+    write_text_file(marker, json.dumps(params))
+    return metadata_path
+
+
+@contextlib.contextmanager
+def quiet():
+    """Подавляет вывод print внутри блока (прогресс анализа не нужен в замерах)."""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(func, repeat=3):
+    """
+    Замеряет время вызова, лучшее из нескольких попыток.
+
+    Args:
+        func (callable): Замеряемая функция без аргументов
+        repeat (int): Число попыток
+
+    Returns:
+        float: Время в секундах
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmarks(corpus_folder, metadata_path, sample_size=1000, repeat=3, workers=1):
+    """
+    Выполняет все замеры.
+
+    Args:
+        corpus_folder (str): Папка синтетического корпуса
+        metadata_path (str): Метаданные синтетического корпуса
+        sample_size (int): Сколько текстов брать для замеров отдельных метрик
+        repeat (int): Число попыток каждого замера
+        workers (int): Количество процессов для полного прогона
+
+    Returns:
+        dict: Словарь {название замера: {'seconds', 'items', 'us_per_item'}}
+    """
+    files = sorted(get_files_in_folder(corpus_folder, '.txt'))
+    texts = [read_text_file(os.path.join(corpus_folder, f)) for f in files[:sample_size]]
+    timings = {}
+
+    def record(name, seconds, items):
+        timings[name] = {
+            'seconds': round(seconds, 6),
+            'items': items,
+            'us_per_item': round(seconds / items * 1e6, 3) if items else None,
+        }
+        print(f"  {name:<32} {seconds:>10.4f} с  ({items} шт.)")
+
+    # Запуск программы: импорт модулей и разбор аргументов без анализа
+    main_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    record('startup.main_help', measure(lambda: subprocess.run([sys.executable, main_script, '--help'],
+                                                               stdout=subprocess.DEVNULL, check=True),
+                                        repeat), 1)
+
+    # Отдельные метрики: каждая разбирает строку сама, как при прямом вызове
+    for func in (count_words, count_unique_words, calculate_ttr, get_most_common_words,
+                 count_lines, average_word_length, calculate_mattr, calculate_mtld, calculate_hdd,
+                 count_ngrams):
+        record(f'metric.{func.__name__}', measure(lambda: [func(t) for t in texts], repeat), len(texts))
+
+    # Все базовые метрики на одном общем TokenizedText
+    def shared_metrics():
+        for text in texts:
+            tokens = TokenizedText(text)
+            count_words(tokens), count_unique_words(tokens), calculate_ttr(tokens)
+            get_most_common_words(tokens, 1), count_lines(tokens), average_word_length(tokens)
+    record('metric.all_shared_tokens', measure(shared_metrics, repeat), len(texts))
+
+    # То же на номерах словоформ из общего словаря
+    vocabulary = Vocabulary()
+    def encoded_metrics():
+        for text in texts:
+            tokens = EncodedText(text, vocabulary)
+            count_words(tokens), count_unique_words(tokens), calculate_ttr(tokens)
+            get_most_common_words(tokens, 1), count_lines(tokens), average_word_length(tokens)
+    record('metric.all_encoded_tokens', measure(encoded_metrics, repeat), len(texts))
+
+    # План подсчёта из analyze_single_text: только быстрые метрики и все, кроме морфологии
+    profiler = Profiler(enabled=False)
+    for label, spec in (('basic', 'basic'), ('no_morph', 'basic,diversity,ngrams')):
+        plan = MetricPlan(parse_metrics(spec))
+        record(f'metric.plan_{label}',
+               measure(lambda: [plan.compute(profiler, tokens=EncodedText(t, vocabulary), pos_cache=None)
+                                for t in texts], repeat), len(texts))
+
+    # Морфология: загрузка словарей, холодный и тёплый кэш частей речи
+    try:
+        record('morph.analyzer_load', measure(create_morph_analyzer, 1), 1)
+        morph = create_morph_analyzer()
+        warm_cache = PosTagCache(None, morph=morph)
+        with quiet():
+            cold = measure(lambda: [calculate_lexical_density(t, pos_cache=PosTagCache(None, morph=morph))
+                                    for t in texts], repeat)
+            for text in texts:
+                calculate_lexical_density(text, pos_cache=warm_cache)
+            warm = measure(lambda: [calculate_lexical_density(t, pos_cache=warm_cache) for t in texts], repeat)
+        record('morph.lexical_density_cold', cold, len(texts))
+        record('morph.lexical_density_warm', warm, len(texts))
+        # Вызов без своего кэша: общий анализатор и кэш процесса
+        with quiet():
+            default = measure(lambda: [calculate_lexical_density(t) for t in texts], repeat)
+        record('morph.lexical_density_default', default, len(texts))
+    except ImportError:
+        print("  pymorphy3 не установлен, замеры морфологии пропущены")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Полный прогон без кэшей; вывод прогресса подавляется
+        results = []
+        def end_to_end():
+            with quiet():
+                results[:] = main.analyze_corpus(
+                    corpus_folder, workers=workers, pos_cache_path=None, incremental=False,
+                    results_folder=tmp, metadata_path=metadata_path,
+                    manifest_path=os.path.join(tmp, 'manifest.json'), ngram_store_path=os.path.join(tmp, 'ngrams'))
+        record('end_to_end.analyze_corpus', measure(end_to_end, 1), len(files))
+
+        record('aggregate.vocabulary_exact', measure(lambda: main.count_vocabulary(results), repeat), len(results))
+        record('aggregate.vocabulary_hll', measure(lambda: main.count_vocabulary(results, 14), repeat), len(results))
+        record('aggregate.tfidf_index', measure(lambda: main.TfidfIndex(results), repeat), len(results))
+        record('aggregate.duplicates', measure(lambda: find_duplicates(results), repeat), len(results))
+
+        headers = ['filename', 'title', 'author', 'year', 'genre', 'word_count', 'unique_words',
+                   'most_common', 'ttr', 'line_count', 'avg_word_length', 'lexical_density',
+                   'noun_density', 'adj_density', 'verb_density']
+        csv_path = os.path.join(tmp, 'bench_statistics.csv')
+        record('output.statistics_csv',
+               measure(lambda: write_csv_file(csv_path, main.iter_statistics_rows(results, headers), headers),
+                       repeat), len(results))
+
+        def report():
+            with quiet():
+                main.generate_report(results, corpus_folder, results_folder=tmp)
+        record('output.report', measure(report, repeat), len(results))
+
+        def report_all_formats():
+            with quiet():
+                main.generate_report(results, corpus_folder, results_folder=tmp, formats=tuple(main.REPORT_FORMATS))
+        record('output.report_all_formats', measure(report_all_formats, repeat), len(results))
+
+    return timings
+
+
+def compare(current, baseline, threshold):
+    """
+    Сравнивает замеры с прошлым запуском.
+
+    Args:
+        current (dict): Текущие замеры
+        baseline (dict): Замеры прошлого запуска
+        threshold (float): Допустимое замедление (0.2 — на 20%)
+
+    Returns:
+        list: Названия замеров, замедлившихся сильнее порога
+    """
+    regressions = []
+    print(f"\n{'замер':<32} {'было, с':>10} {'стало, с':>10} {'изменение':>10}")
+    for name, timing in current.items():
+        old = baseline.get(name)
+        if not old or not old['seconds']:
+            continue
+        ratio = timing['seconds'] / old['seconds']
+        mark = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            mark = '  ❌'
+        print(f"{name:<32} {old['seconds']:>10.4f} {timing['seconds']:>10.4f} {ratio - 1:>+10.1%}{mark}")
+    return regressions
+
+
+def parse_args(argv=None):
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Замеры производительности анализа корпуса")
+    parser.add_argument('--files', type=int, default=100, help="размер синтетического корпуса (по умолчанию 100)")
+    parser.add_argument('--seed', type=int, default=0, help="начальное значение генератора")
+    parser.add_argument('--long-ratio', type=float, default=0.05, help="доля длинных стихотворений")
+    parser.add_argument('--corpus-dir', help="где хранить синтетический корпус (по умолчанию во временной папке)")
+    parser.add_argument('--sample', type=int, default=1000, help="сколько текстов брать для замеров метрик")
+    parser.add_argument('--repeat', type=int, default=3, help="число попыток каждого замера")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="процессов для полного прогона")
+    parser.add_argument('--output', default='my_project/cache/benchmark.json', help="куда записать JSON")
+    parser.add_argument('--baseline', help="JSON прошлого замера для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="допустимое замедление относительно baseline (по умолчанию 0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def run_cli(argv=None):
+    """
+    Точка входа: генерирует корпус, замеряет, сохраняет и сравнивает.
+
+    Returns:
+        int: Код выхода (1, если есть замедления сверх порога)
+    """
+    args = parse_args(argv)
+    corpus_dir = args.corpus_dir or os.path.join(
+        tempfile.gettempdir(), f'bench_corpus_{args.files}_{args.seed}_{args.long_ratio}')
+
+    print(f"📝 Синтетический корпус: {args.files} файлов в {corpus_dir}")
+    metadata_path = generate_corpus(corpus_dir, args.files, args.seed, args.long_ratio)
+
+    print("⏱  Замеры:")
+    timings = run_benchmarks(corpus_dir, metadata_path, args.sample, args.repeat, args.workers)
+
+    report = {
+        'meta': {
+            'files': args.files,
+            'seed': args.seed,
+            'long_ratio': args.long_ratio,
+            'sample': args.sample,
+            'workers': args.workers,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'timings': timings,
+    }
+    write_text_file(args.output, json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"\n💾 Замеры сохранены в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(timings, baseline.get('timings', {}), args.threshold)
+        if regressions:
+            print(f"\n❌ Замедление больше {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\n✅ Замедлений больше {args.threshold:.0%} нет")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
@@ -0,0 +1,75 @@
+import signal
+import threading
+import contextlib
+from file_utils import write_csv_file
+
+# Колонки errors.csv
+ERROR_HEADERS = ['filename', 'error']
+
+
+# Выведено ли уже предупреждение, что ограничение времени не действует
+_time_limit_warned = False
+
+
+class AnalysisTimeout(Exception):
+    """Анализ файла не уложился в отведённое время."""
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    """
+    Прерывает блок исключением AnalysisTimeout, если он выполняется дольше seconds.
+
+    Используется таймер SIGALRM, поэтому ограничение работает только
+    в главном потоке процесса и на системах с этим сигналом (не в Windows);
+    в остальных случаях (например, в потоке сервиса server.py) блок
+    выполняется без ограничения, о чём один раз выводится предупреждение.
+
+    Args:
+        seconds (float): Ограничение в секундах (None или 0 — без ограничения)
+
+    Raises:
+        AnalysisTimeout: Если время вышло
+    """
+    if not seconds:
+        yield
+        return
+    if not hasattr(signal, 'SIGALRM') or threading.current_thread() is not threading.main_thread():
+        global _time_limit_warned
+        if not _time_limit_warned:
+            _time_limit_warned = True
+            reason = "нет сигнала SIGALRM" if not hasattr(signal, 'SIGALRM') else "анализ идёт не в главном потоке"
+            print(f" Ограничение времени на файл не действует ({reason}): зависший файл остановит анализ")
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise AnalysisTimeout(f"анализ дольше {seconds:g} с")
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def describe_error(error):
+    """Описание исключения для отчета об ошибках: тип и сообщение."""
+    message = str(error)
+    return f"{type(error).__name__}: {message}" if message else type(error).__name__
+
+
+def write_errors(errors, path):
+    """
+    Записывает файлы, которые не удалось проанализировать.
+
+    Args:
+        errors (list): Словари {'filename': имя файла, 'error': описание}
+        path (str): Путь к errors.csv
+
+    Returns:
+        bool: True, если запись прошла успешно, иначе False
+    """
+    return write_csv_file(path, [[error['filename'], error['error']] for error in errors], ERROR_HEADERS)
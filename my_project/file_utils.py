@@ -1,4 +1,8 @@
 import os
+import csv
+import codecs
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 def read_text_file(filepath):
     """
@@ -18,6 +22,90 @@ def read_text_file(filepath):
         return "Ошибка: Файл не найден"
     return content
 
+def iter_text_chunks(filepath, chunk_size=1 << 20):
+    """
+    Читает текстовый файл по частям, не загружая его целиком в память.
+
+    Args:
+        filepath (str): Путь к файлу
+        chunk_size (int): Размер части в символах (по умолчанию 1 млн)
+
+    Yields:
+        str: Очередная часть текста
+
+    Raises:
+        FileNotFoundError: Если файл не найден
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            yield chunk
+
+def iter_prefetched_texts(filepaths, depth=8, threads=4, should_read=None):
+    """
+    Читает файлы заранее в пуле потоков, пока вызывающий код обрабатывает предыдущие.
+
+    Одновременно прочитано или читается не больше depth файлов: следующий файл
+    ставится в очередь только после того, как вызывающий код забрал текст,
+    поэтому память ограничена depth текстами при любой скорости диска.
+
+    Args:
+        filepaths (iterable): Пути к файлам
+        depth (int): Сколько файлов держать в очереди
+        threads (int): Количество потоков чтения
+        should_read (callable): Фильтр пути; для файлов, на которых он возвращает
+                                False (например, очень большие), текст не читается
+
+    Yields:
+        tuple: (путь, текст, исключение) в порядке filepaths; текст — как у
+               read_text_file (сообщение «Ошибка: ...», если файла нет), None для
+               файлов, отсеянных should_read, и для файлов, чтение которых
+               завершилось исключением (например, UnicodeDecodeError) — оно
+               возвращается третьим элементом, а не выбрасывается, чтобы
+               ошибка одного файла не прерывала перебор остальных
+    """
+
+    def collect(filepath, future):
+        if future is None:
+            return filepath, None, None
+        try:
+            return filepath, future.result(), None
+        except Exception as e:
+            return filepath, None, e
+
+    queue = deque()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        try:
+            for filepath in filepaths:
+                if should_read is None or should_read(filepath):
+                    queue.append((filepath, executor.submit(read_text_file, filepath)))
+                else:
+                    queue.append((filepath, None))
+                if len(queue) >= depth:
+                    yield collect(*queue.popleft())
+            while queue:
+                yield collect(*queue.popleft())
+        finally:
+            # Если чтение прервали, не ждём файлы, которые уже никому не нужны
+            for _, future in queue:
+                if future is not None:
+                    future.cancel()
+
+def iter_csv_rows(filepath):
+    """
+    Построчно читает CSV файл (с кавычками по RFC 4180), не загружая его целиком.
+
+    Args:
+        filepath (str): Путь к CSV файлу
+
+    Yields:
+        dict: Очередная строка, где ключи — названия колонок
+
+    Raises:
+        FileNotFoundError: Если файл не найден
+    """
+    with open(filepath, "r", encoding="utf-8-sig", newline="") as file:
+        yield from csv.DictReader(file)
+
 def read_csv_file(filepath):
     """
     Читает CSV файл и возвращает список словарей.
@@ -30,15 +118,7 @@ def read_csv_file(filepath):
 
     data = []
     try:
-        with open (filepath, "r", encoding = "utf-8") as file:
-            content = file.readlines()
-            headers = content[0].strip().split(',')
-            for line in content[1:]:
-                data_dict_for_one_row = {}
-                values = line.strip().split(",")
-                for i in range(len(values)):
-                    data_dict_for_one_row[headers[i]] = values[i]
-                data.append(data_dict_for_one_row)
+        data.extend(iter_csv_rows(filepath))
         return data
     except FileNotFoundError:
         print (f"Файл не найден: {filepath}")
@@ -51,28 +131,126 @@ def write_csv_file(filepath, data, headers):
     """
     Записывает данные в CSV файл.
 
+    Строки записываются по мере поступления, поэтому data может быть
+    генератором. Значения с запятыми, кавычками и переводами строк
+    заключаются в кавычки по RFC 4180.
+
     Args:
         filepath (str): Полный путь к файлу, включая папку и название файла
                        Например: 'results/statistics.csv'
-        data (list): Список списков [[val1, val2], [val1, val2], ...]
+        data (iterable): Список (или генератор) списков [[val1, val2], [val1, val2], ...]
         headers (list): Список заголовков ['col1', 'col2']
 
     Returns:
         bool: True если успешно
     """
-    import os
     folder = os.path.dirname(filepath)
-    os.makedirs(folder, exist_ok=True)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(','.join(headers) + '\n')
-            for row in data:
-                f.write(','.join(str(v) for v in row) + '\n')
-        if folder:
-            l = True
+        with open(filepath, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(headers)
+            writer.writerows(data)
+        return True
     except Exception as e:
-        print (f"Ошибка при записи файла {filepath}: {e}")   
-    return l
+        print (f"Ошибка при записи файла {filepath}: {e}")
+        return False
+
+class MetadataIndex:
+    """
+    Ленивый индекс CSV таблицы по ключевой колонке.
+
+    При первом обращении файл один раз просматривается и запоминается
+    только смещение каждой строки; сама строка читается с диска при
+    запросе. Если ключ повторяется, действует последняя строка.
+
+    Args:
+        filepath (str): Путь к CSV файлу
+        key (str): Ключевая колонка (по умолчанию 'filename')
+    """
+
+    def __init__(self, filepath, key='filename'):
+        self.filepath = filepath
+        self.key = key
+        self.headers = None
+        self._offsets = None
+        self._file = None
+
+    @staticmethod
+    def _iter_lines(f, position):
+        """Отдаёт строки файла, сдвигая position[0] на длину прочитанного."""
+        for line in iter(f.readline, b''):
+            position[0] += len(line)
+            yield line.decode('utf-8')
+
+    def _build(self):
+        """Просматривает файл и запоминает смещения строк."""
+        if self._offsets is not None:
+            return
+        offsets = {}
+        with open(self.filepath, 'rb') as f:
+            position = [0]
+            if f.read(3) == codecs.BOM_UTF8:
+                position[0] = 3
+            f.seek(position[0])
+            reader = csv.reader(self._iter_lines(f, position))
+            self.headers = next(reader, [])
+            key_index = self.headers.index(self.key) if self.key in self.headers else None
+            while key_index is not None:
+                # csv.reader не читает вперёд: запись начинается там, где кончилась предыдущая
+                start = position[0]
+                row = next(reader, None)
+                if row is None:
+                    break
+                if len(row) > key_index:
+                    offsets[row[key_index]] = start
+        self._offsets = offsets
+
+    def __len__(self):
+        self._build()
+        return len(self._offsets)
+
+    def __contains__(self, key):
+        self._build()
+        return key in self._offsets
+
+    def __iter__(self):
+        self._build()
+        return iter(self._offsets)
+
+    def get(self, key, default=None):
+        """
+        Читает строку таблицы по ключу.
+
+        Args:
+            key (str): Значение ключевой колонки
+            default: Что вернуть, если ключа нет
+
+        Returns:
+            dict: Строка таблицы, где ключи — названия колонок
+        """
+        self._build()
+        offset = self._offsets.get(key)
+        if offset is None:
+            return default
+        if self._file is None:
+            self._file = open(self.filepath, 'rb')
+        self._file.seek(offset)
+        row = next(csv.reader(self._iter_lines(self._file, [offset])))
+        return dict(zip(self.headers, row))
+
+    def __getitem__(self, key):
+        row = self.get(key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def close(self):
+        """Закрывает файл таблицы."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
 def write_text_file(filepath, text):
     """
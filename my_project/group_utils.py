@@ -0,0 +1,166 @@
+import math
+from table_utils import NUMERIC_COLUMNS
+
+# Признаки, по которым группируются результаты
+GROUP_FIELDS = ('author', 'year', 'decade', 'genre')
+
+# Колонки groups.csv
+GROUP_HEADERS = ['group', 'value', 'metric', 'count', 'mean', 'std', 'min', 'max']
+
+
+class RunningStats:
+    """
+    Количество, среднее, дисперсия (алгоритм Уэлфорда), минимум и максимум
+    ряда чисел за один проход, в памяти O(1).
+
+    Две сводки можно объединить (merge), например частичные результаты
+    разных процессов или узлов.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """
+        Учитывает очередное значение.
+
+        Args:
+            value (float): Значение
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Добавляет другую сводку (формула Чана для параллельных вычислений).
+
+        Args:
+            other (RunningStats): Другая сводка
+        """
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        """float: Выборочная дисперсия (0 для одного значения)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        """float: Выборочное стандартное отклонение"""
+        return math.sqrt(self.variance)
+
+
+def get_decade(year):
+    """
+    Определяет десятилетие по году.
+
+    Args:
+        year (str | int): Год, например '1976'
+
+    Returns:
+        str: Десятилетие, например '1970-е', или 'Неизвестно'
+    """
+    try:
+        return f'{int(str(year).strip()) // 10 * 10}-е'
+    except ValueError:
+        return 'Неизвестно'
+
+
+class GroupStats:
+    """
+    Сводки метрик по группам за один проход по результатам.
+
+    Для каждого значения каждого признака (автор, год, десятилетие, жанр)
+    и каждой числовой метрики хранится RunningStats, поэтому память
+    зависит от числа групп, а не от числа документов.
+
+    Args:
+        fields (tuple): Признаки группировки
+        metrics (iterable): Числовые метрики
+    """
+
+    def __init__(self, fields=GROUP_FIELDS, metrics=NUMERIC_COLUMNS):
+        self.fields = fields
+        self.metrics = tuple(metrics)
+        self.groups = {field: {} for field in fields}
+
+    def _value(self, result, field):
+        """Значение признака в результате (десятилетие вычисляется по году)."""
+        if field == 'decade':
+            return get_decade(result.get('year', 'Неизвестно'))
+        return str(result.get(field, 'Неизвестно'))
+
+    def add(self, result):
+        """
+        Учитывает результат анализа одного файла.
+
+        Args:
+            result (dict): Результат с метаданными
+        """
+        present = [(metric, result[metric]) for metric in self.metrics if metric in result]
+        for field in self.fields:
+            value = self._value(result, field)
+            group = self.groups[field].get(value)
+            if group is None:
+                group = self.groups[field][value] = {}
+            for metric, number in present:
+                stats = group.get(metric)
+                if stats is None:
+                    stats = group[metric] = RunningStats()
+                stats.add(number)
+
+    def merge(self, other):
+        """
+        Добавляет сводки другого GroupStats с теми же признаками.
+
+        Args:
+            other (GroupStats): Другие сводки
+        """
+        for field, values in other.groups.items():
+            for value, group in values.items():
+                own = self.groups.setdefault(field, {}).setdefault(value, {})
+                for metric, stats in group.items():
+                    own.setdefault(metric, RunningStats()).merge(stats)
+
+    def count(self, field, value):
+        """Количество файлов в группе."""
+        group = self.groups[field].get(value, {})
+        return max((stats.count for stats in group.values()), default=0)
+
+    def iter_rows(self):
+        """
+        Строки для groups.csv.
+
+        Yields:
+            list: [признак, значение, метрика, количество, среднее, ст. отклонение, минимум, максимум]
+        """
+        for field in self.fields:
+            for value, group in self.groups[field].items():
+                for metric in self.metrics:
+                    stats = group.get(metric)
+                    if stats is not None:
+                        yield [field, value, metric, stats.count, stats.mean, stats.std, stats.min, stats.max]
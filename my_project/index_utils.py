@@ -0,0 +1,277 @@
+import os
+import re
+import sqlite3
+from array import array
+from file_utils import read_text_file
+from fault_utils import describe_error
+
+# Файл инвертированного индекса корпуса
+INDEX_PATH = 'my_project/cache/index.sqlite'
+
+# Слово для индекса: буквы и цифры, допускаются дефисы внутри («из-за», «кто-то»)
+INDEX_WORD_RE = re.compile(r'\w+(?:-\w+)*')
+
+# Сколько файлов индексировать в одной транзакции
+_COMMIT_EVERY = 500
+
+
+def iter_line_words(line):
+    """
+    Находит слова строки в нижнем регистре и их место в исходной строке.
+
+    Слова ищутся в строке в нижнем регистре, а границы переводятся
+    в исходную строку: у редких букв (İ) нижний регистр длиннее.
+
+    Args:
+        line (str): Строка текста
+
+    Yields:
+        tuple: (слово в нижнем регистре, начало, конец) — границы в исходной строке
+    """
+    lower = line.lower()
+    if len(lower) == len(line):
+        for match in INDEX_WORD_RE.finditer(lower):
+            yield (match.group(),) + match.span()
+        return
+    # Для каждого символа нижнего регистра — номер исходного символа
+    origin = array('I')
+    for i, char in enumerate(line):
+        origin.extend([i] * len(char.lower()))
+    for match in INDEX_WORD_RE.finditer(lower):
+        start, end = match.span()
+        yield match.group(), origin[start], origin[end - 1] + 1
+
+
+def open_index(index_path=INDEX_PATH):
+    """
+    Открывает (и при необходимости создаёт) базу индекса.
+
+    Таблица postings хранит для пары (слово, файл) позиции вхождений
+    в виде упакованного массива пар (номер строки, номер слова в строке).
+
+    Args:
+        index_path (str): Путь к файлу индекса
+
+    Returns:
+        sqlite3.Connection: Соединение с базой
+    """
+    folder = os.path.dirname(index_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    db = sqlite3.connect(index_path)
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE,
+            filename TEXT,
+            author TEXT,
+            size INTEGER,
+            mtime INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            word TEXT,
+            file_id INTEGER,
+            positions BLOB,
+            PRIMARY KEY (word, file_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+    """)
+    return db
+
+
+def index_text(text):
+    """
+    Строит позиции всех слов одного текста.
+
+    Args:
+        text (str): Текст
+
+    Returns:
+        dict: Словарь {слово: array('I') [строка, номер слова, строка, номер слова, ...]}
+    """
+    postings = {}
+    for line_no, line in enumerate(text.splitlines(), 1):
+        for position, (word, _, _) in enumerate(iter_line_words(line)):
+            if word not in postings:
+                postings[word] = array('I')
+            postings[word].extend((line_no, position))
+    return postings
+
+
+def update_index(corpus_folder, files, authors=None, index_path=INDEX_PATH):
+    """
+    Добавляет в индекс новые и изменённые файлы и удаляет пропавшие.
+
+    Файл считается неизменным, если совпадают размер и время изменения.
+
+    Args:
+        corpus_folder (str): Путь к папке с текстами
+        files (list): Имена файлов корпуса
+        authors (dict): Словарь {имя файла: автор} из метаданных
+        index_path (str): Путь к файлу индекса
+
+    Returns:
+        dict: Сколько файлов добавлено/обновлено ('indexed'), пропущено
+              без изменений ('unchanged') и удалено ('removed')
+    """
+    authors = authors or {}
+    db = open_index(index_path)
+    known = {path: (file_id, size, mtime)
+             for file_id, path, size, mtime in db.execute("SELECT id, path, size, mtime FROM files")}
+    stats = {'indexed': 0, 'unchanged': 0, 'removed': 0}
+
+    current = set()
+    for filename in files:
+        filepath = os.path.join(corpus_folder, filename)
+        current.add(filepath)
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            continue
+        old = known.get(filepath)
+        if old is not None and old[1:] == (stat.st_size, stat.st_mtime_ns):
+            stats['unchanged'] += 1
+            continue
+
+        # Нечитаемый файл (не UTF-8, нет прав) пропускается, остальные индексируются
+        try:
+            text = read_text_file(filepath)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f" Пропуск {filename}: {describe_error(e)}")
+            continue
+        if text.startswith("Ошибка"):
+            print(f" Пропуск {filename}: {text}")
+            continue
+
+        if old is not None:
+            db.execute("DELETE FROM postings WHERE file_id = ?", (old[0],))
+            db.execute("DELETE FROM files WHERE id = ?", (old[0],))
+        file_id = db.execute(
+            "INSERT INTO files (path, filename, author, size, mtime) VALUES (?, ?, ?, ?, ?)",
+            (filepath, filename, authors.get(filename, 'Неизвестно'), stat.st_size, stat.st_mtime_ns)
+        ).lastrowid
+        db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                       ((word, file_id, positions.tobytes())
+                        for word, positions in index_text(text).items()))
+        stats['indexed'] += 1
+        if stats['indexed'] % _COMMIT_EVERY == 0:
+            db.commit()
+
+    for filepath, (file_id, _, _) in known.items():
+        if filepath not in current:
+            db.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+            db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            stats['removed'] += 1
+
+    db.commit()
+    db.close()
+    return stats
+
+
+class CorpusIndex:
+    """
+    Запросы к инвертированному индексу корпуса.
+
+    Args:
+        index_path (str): Путь к файлу индекса
+    """
+
+    def __init__(self, index_path=INDEX_PATH):
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"Индекс не найден: {index_path}")
+        self.db = sqlite3.connect(index_path)
+
+    def close(self):
+        """Закрывает соединение с индексом."""
+        self.db.close()
+
+    def document_frequency(self, word):
+        """
+        Возвращает число файлов, в которых встречается слово.
+
+        Args:
+            word (str): Слово (регистр не важен)
+
+        Returns:
+            int: Документная частота
+        """
+        row = self.db.execute("SELECT COUNT(*) FROM postings WHERE word = ?", (word.lower(),)).fetchone()
+        return row[0]
+
+    def author_hits(self, word):
+        """
+        Считает вхождения слова по авторам.
+
+        Args:
+            word (str): Слово (регистр не важен)
+
+        Returns:
+            dict: Словарь {автор: число вхождений}, по убыванию числа вхождений
+        """
+        # Каждое вхождение — два 4-байтовых числа (строка, номер слова)
+        rows = self.db.execute("""
+            SELECT f.author, SUM(LENGTH(p.positions)) / 8 AS hits
+            FROM postings p JOIN files f ON f.id = p.file_id
+            WHERE p.word = ?
+            GROUP BY f.author
+            ORDER BY hits DESC, f.author
+        """, (word.lower(),))
+        return dict(rows)
+
+    def postings(self, word):
+        """
+        Возвращает все вхождения слова.
+
+        Args:
+            word (str): Слово (регистр не важен)
+
+        Returns:
+            list: Список кортежей (имя файла, путь, [(строка, номер слова), ...])
+        """
+        rows = self.db.execute("""
+            SELECT f.filename, f.path, p.positions
+            FROM postings p JOIN files f ON f.id = p.file_id
+            WHERE p.word = ?
+            ORDER BY f.filename
+        """, (word.lower(),))
+        result = []
+        for filename, path, blob in rows:
+            positions = array('I')
+            positions.frombytes(blob)
+            result.append((filename, path, list(zip(positions[::2], positions[1::2]))))
+        return result
+
+    def concordance(self, word, width=40, limit=20):
+        """
+        Строит строки «ключевое слово в контексте» (KWIC).
+
+        Args:
+            word (str): Слово (регистр не важен)
+            width (int): Ширина левого и правого контекста в символах
+            limit (int): Максимальное число строк (None — все)
+
+        Returns:
+            list: Список кортежей (имя файла, номер строки, левый контекст,
+                  слово как в тексте, правый контекст)
+        """
+        lines = []
+        for filename, path, positions in self.postings(word):
+            try:
+                text = read_text_file(path)
+            except (OSError, UnicodeDecodeError):
+                continue  # файл стал нечитаемым после индексации
+            if text.startswith("Ошибка"):
+                continue
+            text_lines = text.splitlines()
+            for line_no, position in positions:
+                if limit is not None and len(lines) >= limit:
+                    return lines
+                if line_no > len(text_lines):
+                    continue  # файл изменился после индексации
+                line = text_lines[line_no - 1]
+                for i, (_, start, end) in enumerate(iter_line_words(line)):
+                    if i == position:
+                        lines.append((filename, line_no, line[:start][-width:],
+                                      line[start:end], line[end:][:width]))
+                        break
+        return lines
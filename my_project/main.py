@@ -1,67 +1,450 @@
 
 import os
-from file_utils import get_files_in_folder, read_text_file, read_csv_file, write_csv_file
-from text_utils import count_words, count_unique_words, calculate_ttr, get_most_common_words, count_lines, average_word_length, calculate_lexical_density
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from file_utils import get_files_in_folder, read_text_file, iter_text_chunks, iter_prefetched_texts, write_csv_file, MetadataIndex
+import text_utils
+from text_utils import set_verbose, EncodedText, StreamingTextStats
+from sketch_utils import new_frequency_table, new_distinct_counter
+from table_utils import ResultsTable
+from morph_utils import PosTagCache, POS_CACHE_PATH, warm_up_morph
+from manifest_utils import MANIFEST_PATH, CheckpointLog, load_manifest, save_manifest, make_entry, find_unchanged
+from index_utils import INDEX_PATH, CorpusIndex, update_index
+from profile_utils import Profiler, PROFILE_PATH
+from pack_utils import PACK_PATH, CorpusPack, build_pack, is_pack
+from ngram_utils import NGRAM_MEMORY_ITEMS, NGRAM_STORE_PATH, NGRAM_TABLE_KEYS, TOP_NGRAMS_KEY, NgramStore, result_ngrams, write_ngrams
+from group_utils import GroupStats, GROUP_HEADERS
+from fault_utils import time_limit, describe_error, write_errors
+from metric_utils import METRIC_SETS, get_plan, parse_metrics
+from similarity_utils import DUPLICATE_THRESHOLD, MINHASH_KEY, SIMILAR_TOP, TfidfIndex, write_duplicates
+from report_utils import REPORT_FORMATS, REPORT_WRITERS, FILE_COLUMNS, parse_report_formats
+from shard_utils import SHARD_FOLDER, shard_of, parse_shard, read_file_list, save_shard, load_shard, merge_shards
 
-def analyze_single_text(filepath, filename):
+# Файлы не меньше этого размера (в байтах) анализируются потоково, по частям
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+# Сколько потоков читают файлы заранее в режиме --prefetch (не больше глубины очереди)
+PREFETCH_THREADS = 4
+
+# Как часто (в секундах) сбрасывать на диск журнал готовых результатов во время анализа
+CHECKPOINT_INTERVAL = 60
+
+# Таблица с метаданными произведений
+METADATA_PATH = 'my_project/data/metadata.csv'
+
+# Папка для statistics.csv и report.txt
+RESULTS_FOLDER = 'my_project/results'
+
+# Выключенный профилировщик: используется, когда замеры не нужны
+_NO_PROFILER = Profiler(enabled=False)
+
+# Кэш частей речи процесса-обработчика: создаётся один раз при запуске процесса
+_worker_pos_cache = None
+
+# Включены ли замеры в процессе-обработчике
+_worker_profile = False
+
+# Пакет корпуса, открытый процессом-обработчиком (None — корпус в папке)
+_worker_pack = None
+
+def _should_stream(filepath, stream_threshold, size=None):
+    """Проверяет, нужно ли читать файл по частям."""
+    if stream_threshold is None:
+        return False
+    if size is not None:
+        return size >= stream_threshold
+    try:
+        return os.path.getsize(filepath) >= stream_threshold
+    except OSError:
+        # Об ошибке сообщит обычное чтение файла
+        return False
+
+def analyze_single_text(filepath, filename, pos_cache=None, stream_threshold=STREAM_THRESHOLD,
+                        profiler=None, text=None, pack=None, metrics=None):
     """
     Анализирует один текстовый файл.
     
     Args:
         filepath (str): Полный путь к файлу
         filename (str): Имя файла
+        pos_cache (PosTagCache): Кэш частей речи для лексической плотности
+        stream_threshold (int): Размер файла в байтах, начиная с которого он
+                                читается по частям (None — всегда целиком)
+        profiler (Profiler): Профилировщик для замеров этапов (None — без замеров)
+        text (str): Уже прочитанный текст файла (или сообщение об ошибке чтения);
+                    None — прочитать файл здесь
+        pack (CorpusPack): Пакет корпуса, из которого читается текст (None — с диска)
+        metrics (tuple): Какие метрики считать (см. metric_utils; None — все)
     
     Returns:
         dict: Словарь с результатами анализа или None в случае ошибки
     """
-    # Чтение файла
-    text = read_text_file(filepath)
-    
-    if text.startswith("Ошибка"):
-        print(f" Пропуск {filename}: {text}")
-        return None
-    
-    # Базовые метрики
-    result = {
-        'filename': filename,
-        'word_count': count_words(text),
-        'unique_words': count_unique_words(text),
-        'most_common': get_most_common_words(text, n = 1),
-        'ttr': calculate_ttr(text),
-        'line_count': count_lines(text),
-        'avg_word_length': average_word_length(text),
-    }
-    
-    # Лексическая плотность
+    profiler = profiler or _NO_PROFILER
+    plan = get_plan(metrics)
+    start = time.perf_counter()
+    
+    size = pack.size(filename) if pack is not None else None
+    if text is None and _should_stream(filepath, stream_threshold, size):
+        # Большой файл: счётчики копятся по частям, память ограничена словарём
+        chunks = pack.iter_text_chunks(filename) if pack is not None else iter_text_chunks(filepath)
+        try:
+            with profiler.stage('read_stream'):
+                tokens = StreamingTextStats.from_chunks(chunks)
+        except FileNotFoundError:
+            print(f" Пропуск {filename}: Ошибка: Файл не найден")
+            profiler.count('errors')
+            return None
+    else:
+        # Чтение файла, если он не прочитан заранее
+        if text is None:
+            with profiler.stage('read'):
+                text = pack.read_text(filename) if pack is not None else read_text_file(filepath)
+        
+        if text.startswith("Ошибка"):
+            print(f" Пропуск {filename}: {text}")
+            profiler.count('errors')
+            return None
+        
+        # Разбираем текст один раз в номера словоформ общего словаря процесса,
+        # все метрики используют общий результат
+        tokens = EncodedText(text)
+    
+    # Считаются только выбранные метрики и данные, от которых они зависят;
+    # общие промежуточные данные (частоты слов, части речи) — по одному разу
+    misses_before = pos_cache.misses if pos_cache is not None else 0
+    result = {'filename': filename}
     try:
-        lex_metrics = calculate_lexical_density(text)
-        result.update({
-            'lexical_density': lex_metrics['lexical_density'],
-            'noun_density': lex_metrics['noun_density'],
-            'adj_density': lex_metrics['adj_density'],
-            'verb_density': lex_metrics['verb_density'],
-        })
-    except NameError:
-        print(f" Функция лексической плотности не доступна для {filename}")
+        result.update(plan.compute(profiler, tokens=tokens, pos_cache=pos_cache))
+    finally:
+        if isinstance(tokens, StreamingTextStats):
+            # Временный файл с номерами слов больше не нужен
+            tokens.close()
     
+    if profiler.enabled:
+        profiler.count('bytes_read', size if size is not None else os.path.getsize(filepath))
+        profiler.count('tokens', result['word_count'])
+        # Без общего кэша каждое слово текста разбирается pymorphy3 заново
+        if plan.uses_morphology:
+            profiler.count('morph_calls', pos_cache.misses - misses_before if pos_cache is not None
+                           else len(tokens.morph_counts))
+        profiler.add_file(filename, time.perf_counter() - start)
     return result
 
-def analyze_corpus(corpus_folder='my_project/corpus'):
+def analyze_file_guarded(filepath, filename, timeout=None, **kwargs):
+    """
+    Анализирует файл так, чтобы ошибка или зависание на нём не остановили весь запуск.
+    
+    Args:
+        filepath (str): Полный путь к файлу
+        filename (str): Имя файла
+        timeout (float): Ограничение времени на файл в секундах (None — без ограничения;
+                         действует в главном потоке, см. time_limit)
+        **kwargs: Параметры analyze_single_text
+    
+    Returns:
+        tuple: (результат или None, описание ошибки или None)
+    """
+    try:
+        with time_limit(timeout):
+            result = analyze_single_text(filepath, filename, **kwargs)
+    except Exception as e:
+        profiler = kwargs.get('profiler') or _NO_PROFILER
+        profiler.count('errors')
+        return None, describe_error(e)
+    if result is None:
+        return None, "файл не прочитан"
+    return result, None
+
+def store_ngrams(result, entry, store):
+    """
+    Переносит таблицы n-грамм из результата анализа в хранилище на диске.
+    
+    В результате (и в манифесте) остаётся только сводка файла, поэтому
+    память и размер манифеста не растут с числом n-грамм корпуса.
+    
+    Args:
+        result (dict): Результат анализа (таблицы удаляются из него на месте)
+        entry (dict): Запись манифеста файла с хэшем содержимого (None — не сохранять)
+        store (NgramStore): Хранилище таблиц
+    """
+    tables = [result.pop(key) for key in NGRAM_TABLE_KEYS if key in result]
+    if tables and entry is not None:
+        store.save(entry['sha256'], tables)
+
+def needs_analysis(entry, plan, store):
+    """
+    Проверяет, нужно ли заново анализировать неизменённый файл.
+    
+    Args:
+        entry (dict): Актуальная запись манифеста с результатом
+        plan (MetricPlan): Выбранные метрики
+        store (NgramStore): Хранилище таблиц n-грамм
+    
+    Returns:
+        bool: True, если в прошлый раз посчитаны не все нужные метрики
+              или таблицы n-грамм файла не сохранились
+    """
+    if not plan.covers(entry.get('metrics')):
+        return True
+    return any(key in plan.metrics for key in NGRAM_TABLE_KEYS) and not store.has(entry['sha256'])
+
+def _init_worker(pos_cache_path, profile=False, verbose=False, pack_path=None):
+    """Создаёт кэш частей речи процесса-обработчика и переносит настройки родителя."""
+    global _worker_pos_cache, _worker_profile, _worker_pack
+    _worker_pos_cache = PosTagCache(pos_cache_path)
+    _worker_profile = profile
+    set_verbose(verbose)
+    # Каждый процесс отображает пакет сам; страницы файла общие через кэш ОС
+    _worker_pack = CorpusPack(pack_path) if pack_path is not None else None
+
+def _analyze_in_worker(task):
+    """Анализирует один файл в процессе-обработчике и возвращает ошибку, счётчики кэша и замеры."""
+    filepath, filename, stream_threshold, timeout, metrics = task
+    profiler = Profiler() if _worker_profile else None
+    before = _worker_pos_cache.stats()
+    result, error = analyze_file_guarded(filepath, filename, timeout, pos_cache=_worker_pos_cache,
+                                         stream_threshold=stream_threshold, profiler=profiler, pack=_worker_pack,
+                                         metrics=metrics)
+    after = _worker_pos_cache.stats()
+    snapshot = profiler.snapshot() if profiler is not None else None
+    return result, error, {key: after[key] - before[key] for key in after}, snapshot
+
+def iter_analysis_results(corpus_folder, files, workers=1, pos_cache=None,
+                          stream_threshold=STREAM_THRESHOLD, profiler=None, prefetch=0, pack=None,
+                          timeout=None, errors=None, metrics=None):
+    """
+    Анализирует файлы последовательно или в пуле процессов.
+    
+    Исключение при анализе файла не прерывает перебор: вместо результата
+    возвращается None, а описание ошибки добавляется в errors. Если процесс
+    пула аварийно завершился (segfault, нехватка памяти), так же отмечаются
+    все ещё не полученные файлы: готовые результаты к этому времени уже
+    отданы, и следующий запуск проанализирует только отмеченные файлы.
+    
+    Args:
+        corpus_folder (str): Путь к папке с текстами
+        files (list): Имена файлов для анализа
+        workers (int): Количество процессов (1 — без пула)
+        pos_cache (PosTagCache): Кэш частей речи; в параллельном режиме
+                                 в него складываются счётчики процессов
+        stream_threshold (int): Порог потокового чтения (см. analyze_single_text)
+        profiler (Profiler): Профилировщик; замеры процессов складываются в него
+        prefetch (int): Сколько файлов читать заранее в потоках, пока анализируются
+                        предыдущие (0 — читать по очереди; только без пула процессов)
+        pack (CorpusPack): Пакет, из которого читаются тексты (None — файлы папки);
+                           из пакета тексты читаются без упреждения
+        timeout (float): Ограничение времени на файл в секундах (None — без ограничения)
+        errors (list): Сюда добавляются {'filename', 'error'} для файлов с ошибкой
+        metrics (tuple): Какие метрики считать (None — все)
+    
+    Yields:
+        dict: Результат analyze_single_text (или None) в порядке списка files
+    """
+    tasks = [(os.path.join(corpus_folder, filename), filename, stream_threshold, timeout, metrics)
+             for filename in files]
+    
+    def checked(filename, result, error):
+        if error is not None and errors is not None:
+            errors.append({'filename': filename, 'error': error})
+        return result
+    
+    if workers <= 1 and prefetch > 0 and pack is None:
+        # Чтение следующих файлов идёт в потоках, пока текущий анализируется.
+        # Большие файлы не читаются заранее: они анализируются по частям
+        profiler = profiler or _NO_PROFILER
+        texts = iter_prefetched_texts((filepath for filepath, _, _, _, _ in tasks), depth=prefetch,
+                                      threads=min(prefetch, PREFETCH_THREADS),
+                                      should_read=lambda path: not _should_stream(path, stream_threshold))
+        try:
+            for filepath, filename, _, _, _ in tasks:
+                with profiler.stage('read_wait'):
+                    _, text, read_error = next(texts)
+                if read_error is not None:
+                    # Файл не прочитан (например, не UTF-8): как и при обычном чтении,
+                    # он попадает в errors.csv, анализ остальных продолжается
+                    profiler.count('errors')
+                    yield checked(filename, None, describe_error(read_error))
+                    continue
+                yield checked(filename, *analyze_file_guarded(filepath, filename, timeout, pos_cache=pos_cache,
+                                                              stream_threshold=stream_threshold,
+                                                              profiler=profiler, text=text, metrics=metrics))
+        finally:
+            texts.close()
+        return
+    
+    if workers <= 1:
+        for filepath, filename, _, _, _ in tasks:
+            yield checked(filename, *analyze_file_guarded(filepath, filename, timeout, pos_cache=pos_cache,
+                                                          stream_threshold=stream_threshold,
+                                                          profiler=profiler, pack=pack, metrics=metrics))
+        return
+    
+    # Отдаём файлы пачками, чтобы не платить за пересылку каждого по отдельности
+    chunksize = max(1, len(tasks) // (workers * 4))
+    pos_cache_path = pos_cache.path if pos_cache is not None else None
+    profile = profiler is not None and profiler.enabled
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(pos_cache_path, profile, text_utils.VERBOSE,
+                                       pack.path if pack is not None else None)) as executor:
+        # map возвращает результаты в порядке задач, независимо от порядка завершения
+        done = 0
+        try:
+            for (_, filename, _, _, _), (result, error, stats, snapshot) in zip(
+                    tasks, executor.map(_analyze_in_worker, tasks, chunksize=chunksize)):
+                if pos_cache is not None:
+                    pos_cache.add_stats(stats)
+                if snapshot is not None:
+                    profiler.merge(snapshot)
+                done += 1
+                yield checked(filename, result, error)
+        except BrokenProcessPool as e:
+            # Какой файл уронил процесс, неизвестно: все оставшиеся попадают в errors.csv
+            # и не попадают в манифест, поэтому следующий запуск начнёт с них
+            print(f"\n Процесс пула аварийно завершился, не проанализировано файлов: {len(tasks) - done}")
+            error = describe_error(e)
+            for _, filename, _, _, _ in tasks[done:]:
+                if profiler is not None:
+                    profiler.count('errors')
+                yield checked(filename, None, error)
+
+def iter_statistics_rows(results, headers):
+    """
+    Формирует строки statistics.csv из результатов анализа.
+    
+    Args:
+        results (iterable): Словари с результатами
+        headers (list): Колонки в порядке записи
+    
+    Yields:
+        list: Значения одной строки
+    """
+    for result in results:
+        row = []
+        for header in headers:
+            if header == 'most_common':
+                most_common = result.get('most_common', [])
+                if most_common:
+                    row.append(", ".join([f"{word}; ({count})" for word, count in most_common]))
+                else:
+                    row.append("")
+            else:
+                row.append(result.get(header, ''))
+        yield row
+
+def load_metadata(metadata_path=METADATA_PATH):
+    """
+    Загружает метаданные произведений.
+    
+    Args:
+        metadata_path (str): Путь к CSV с метаданными
+    
+    Returns:
+        MetadataIndex | dict: Ленивый индекс {имя файла: строка метаданных};
+                              пустой словарь, если файла нет
+    """
+    if not os.path.exists(metadata_path):
+        print(f"\n  Файл метаданных не найден: {metadata_path}")
+        return {}
+    
+    print(f"\n📄 Загружаем метаданные из {metadata_path}...")
+    # Запоминаются только смещения строк, сами строки читаются по запросу
+    metadata = MetadataIndex(metadata_path, key='filename')
+    try:
+        print(f" Загружено {len(metadata)} записей")
+    except Exception as e:
+        print(f'Ошибка при чтении файла {metadata_path}: {e}')
+        return {}
+    return metadata
+
+def close_metadata(metadata):
+    """
+    Закрывает файл таблицы метаданных, открытый для чтения строк по запросу.
+    
+    Args:
+        metadata (MetadataIndex | dict): Метаданные из load_metadata или load_corpus_metadata
+    """
+    if isinstance(metadata, MetadataIndex):
+        metadata.close()
+
+def load_corpus_metadata(pack, metadata_path=METADATA_PATH):
+    """
+    Загружает метаданные из оглавления пакета, а если их там нет — из CSV.
+    
+    Args:
+        pack (CorpusPack): Пакет корпуса (None — корпус в папке)
+        metadata_path (str): Путь к CSV с метаданными
+    
+    Returns:
+        MetadataIndex | dict: Метаданные {имя файла: строка}
+    """
+    if pack is not None and pack.metadata:
+        metadata = pack.metadata
+        print(f"\n📄 Метаданные из пакета: {len(metadata)} записей")
+    else:
+        metadata = load_metadata(metadata_path)
+    if not metadata:
+        print("  Будут использованы только базовые метрики")
+    return metadata
+
+def analyze_corpus(corpus_folder='my_project/corpus', workers=1, pos_cache_path=POS_CACHE_PATH,
+                   incremental=True, stream_threshold=STREAM_THRESHOLD, top_words_capacity=None,
+                   results_folder=RESULTS_FOLDER, metadata_path=METADATA_PATH, manifest_path=MANIFEST_PATH,
+                   profiler=None, prefetch=0, ngram_memory=NGRAM_MEMORY_ITEMS, report_formats=('txt',),
+                   vocabulary_precision=None, duplicate_threshold=DUPLICATE_THRESHOLD, file_timeout=None,
+                   checkpoint_interval=CHECKPOINT_INTERVAL, metrics=None, ngram_store_path=NGRAM_STORE_PATH):
     """
     Анализирует все тексты в папке, сохраняет результаты и выводит статистику.
     
+    Готовые результаты дописываются в журнал контрольных точек рядом с манифестом
+    и периодически сбрасываются на диск, поэтому после сбоя или прерывания следующий
+    инкрементальный запуск анализирует только оставшиеся файлы. Манифест целиком
+    записывается один раз в конце. Файлы с ошибкой пропускаются и попадают в errors.csv.
+    
     Args:
         corpus_folder (str): Путь к папке с текстами (например, 'corpus')
+                             или к пакету корпуса (см. pack_utils)
+        workers (int): Количество процессов для анализа (1 — последовательно)
+        pos_cache_path (str): Файл дискового кэша частей речи (None — без диска)
+        incremental (bool): Анализировать только новые и изменённые файлы,
+                            остальные результаты брать из манифеста
+        stream_threshold (int): Размер файла в байтах, начиная с которого он
+                                читается по частям (None — всегда целиком)
+        top_words_capacity (int): Размер приближённой таблицы частот корпуса
+                                  (Space-Saving); None — точный подсчёт
+        results_folder (str): Папка для statistics.csv и report.txt
+        metadata_path (str): Путь к CSV с метаданными
+        manifest_path (str): Путь к манифесту прошлых запусков
+        profiler (Profiler): Профилировщик для замеров этапов (None — без замеров)
+        prefetch (int): Сколько файлов читать заранее в потоках (0 — без упреждающего чтения)
+        ngram_memory (int): Сколько n-грамм держать в памяти при подсчёте по авторам
+                            и корпусу (остальное сбрасывается на диск)
+        report_formats (tuple): Форматы отчета: 'txt', 'jsonl', 'html'
+        vocabulary_precision (int): Считать словарь корпуса приближённо, HyperLogLog
+                                    с этой точностью (None — точно)
+        duplicate_threshold (float): Порог меры Жаккара для почти одинаковых текстов
+        file_timeout (float): Ограничение времени на файл в секундах (None — без ограничения)
+        checkpoint_interval (float): Как часто сбрасывать журнал контрольных точек
+                                     на диск, в секундах (None или 0 — только в конце)
+        metrics (tuple): Какие метрики считать (см. metric_utils.parse_metrics; None — все)
+        ngram_store_path (str): Папка с таблицами n-грамм файлов (см. NgramStore)
     
     Returns:
         list: Список словарей с результатами анализа
     """
+    profiler = profiler or _NO_PROFILER
+    plan = get_plan(metrics)
+    ngram_store = NgramStore(ngram_store_path)
+    
     print("=" * 60)
     print("📊 Анализ корпуса текстов")
     print("=" * 60)
     
-    # 1. Получаем список файлов
-    files = get_files_in_folder(corpus_folder, '.txt')
+    # 1. Получаем список файлов (из папки или из оглавления пакета)
+    pack = CorpusPack(corpus_folder) if is_pack(corpus_folder) else None
+    files = pack.names if pack is not None else get_files_in_folder(corpus_folder, '.txt')
     
     if not files:
         print(" Файлы не найдены!")
@@ -70,278 +453,949 @@ def analyze_corpus(corpus_folder='my_project/corpus'):
     print(f" Найдено файлов: {len(files)}")
     
     # 2. Создаем папку results, если её нет
-    if not os.path.exists('my_project/results'):
-        os.makedirs('my_project/results')
-        print("📁 Создана папка 'my_project/results/'")
+    if not os.path.exists(results_folder):
+        os.makedirs(results_folder)
+        print(f"📁 Создана папка '{results_folder}/'")
     
-    # 3. Анализируем каждый файл
+    # 3. Анализируем новые и изменённые файлы, остальное берём из манифеста
     all_results = []
+    with profiler.stage('manifest'):
+        manifest = load_manifest(manifest_path) if incremental else {}
+        new_manifest = {}
+        pending = []
+        for filename in files:
+            filepath = os.path.join(corpus_folder, filename)
+            fingerprint = pack.entry(filename) if pack is not None else None
+            entry = find_unchanged(manifest.get(filepath), filepath, fingerprint)
+            if entry is None:
+                pending.append(filename)
+                # Отпечаток снимаем до анализа: правка во время анализа попадёт в следующий запуск
+                entry = fingerprint if pack is not None else make_entry(filepath)
+            elif needs_analysis(entry, plan, ngram_store):
+                # Файл не изменился, но в прошлый раз посчитаны не все нужные метрики
+                pending.append(filename)
+            new_manifest[filepath] = entry
+        removed = sum(1 for filepath in manifest if filepath not in new_manifest)
+    if incremental:
+        print(f" Без изменений: {len(files) - len(pending)}, к анализу: {len(pending)}, удалено: {removed}")
     
-    print(f"\n🔍 Анализ файлов:")
-    for i, filename in enumerate(files, 1):
-        print(f"  {i}/{len(files)}: {filename}... ", end="")
-        
-        filepath = os.path.join(corpus_folder, filename)
-        result = analyze_single_text(filepath, filename)
-        
-        if result:
-            all_results.append(result)
-            print("✅")
-        else:
-            print("❌")
+    if workers > 1:
+        print(f"\n🔍 Анализ файлов ({workers} процессов):")
+    else:
+        print(f"\n🔍 Анализ файлов:")
+    pos_cache = PosTagCache(pos_cache_path)
+    if pending and pos_cache_path is None and plan.uses_morphology:
+        # Без дискового кэша словари понадобятся наверняка: загружаем их до анализа,
+        # процессы-обработчики получат уже загруженный анализатор
+        with profiler.stage('morph_load'):
+            warm_up_morph()
+    errors = []
+    # Готовые результаты дописываются в журнал; файлы с ошибкой и ещё
+    # не проанализированные туда не попадают и будут проанализированы снова
+    checkpoint_log = CheckpointLog(manifest_path)
     
-    # 4. Загружаем метаданные (если есть)
-    metadata = {}
-    metadata_path = 'my_project/data/metadata.csv'
+    def save_checkpoint():
+        with profiler.stage('checkpoint'):
+            checkpoint_log.flush()
     
-    if os.path.exists(metadata_path):
-        print(f"\n📄 Загружаем метаданные из {metadata_path}...")
-        metadata_list = read_csv_file(metadata_path)
-        
-        # Преобразуем в словарь для удобного доступа
-        for item in metadata_list:
-            if 'filename' in item:
-                metadata[item['filename']] = item
-        print(f" Загружено {len(metadata)} записей")
-    else:
-        print(f"\n  Файл метаданных не найден: {metadata_path}")
-        print("  Будут использованы только базовые метрики")
+    with profiler.stage('analyze'):
+        results_iter = iter_analysis_results(corpus_folder, pending, workers, pos_cache, stream_threshold,
+                                             profiler, prefetch, pack, file_timeout, errors, plan.metrics)
+        pending_set = set(pending)
+        last_checkpoint = time.monotonic()
+        try:
+            for i, filename in enumerate(files, 1):
+                print(f"  {i}/{len(files)}: {filename}... ", end="")
+                filepath = os.path.join(corpus_folder, filename)
+            
+                if filename not in pending_set:
+                    # Метрики, посчитанные сверх выбранных, в результаты не попадают
+                    all_results.append(plan.select(new_manifest[filepath]['result']))
+                    profiler.count('files_cached')
+                    print("✅ (без изменений)")
+                    continue
+            
+                result = next(results_iter)
+                if result:
+                    store_ngrams(result, new_manifest[filepath], ngram_store)
+                    all_results.append(result)
+                    if new_manifest[filepath] is not None:
+                        new_manifest[filepath]['result'] = result
+                        new_manifest[filepath]['metrics'] = list(plan.metrics)
+                        checkpoint_log.append(filepath, new_manifest[filepath])
+                    print("✅")
+                else:
+                    print(f"❌ {errors[-1]['error']}" if errors and errors[-1]['filename'] == filename else "❌")
+                
+                if checkpoint_interval and time.monotonic() - last_checkpoint >= checkpoint_interval:
+                    save_checkpoint()
+                    profiler.count('checkpoints')
+                    last_checkpoint = time.monotonic()
+        except KeyboardInterrupt:
+            # Готовые результаты сохраняются, следующий запуск продолжит с этого места
+            print("\n\n Анализ прерван")
+            save_checkpoint()
+            print(f" Готовые результаты сохранены в {checkpoint_log.path}, следующий запуск продолжит анализ")
+            raise
+        finally:
+            results_iter.close()
+            checkpoint_log.close()
+    
+    # Журнал объединяется с манифестом и удаляется
+    with profiler.stage('save_manifest'):
+        save_manifest({filepath: entry for filepath, entry in new_manifest.items()
+                       if entry is not None and 'result' in entry}, manifest_path)
+    
+    # Файлы с ошибкой пропускаются, их список — в errors.csv
+    errors_path = os.path.join(results_folder, 'errors.csv')
+    write_errors(errors, errors_path)
+    if errors:
+        print(f"\n  Не проанализировано файлов: {len(errors)}, список ошибок в {errors_path}")
+    
+    pos_stats = pos_cache.stats()
+    pos_cache.close()
+    if pack is not None:
+        pack.close()
+    print(f"\n🧠 Кэш частей речи: из памяти {pos_stats['memory_hits']:,}, "
+          f"с диска {pos_stats['disk_hits']:,}, разобрано pymorphy3 {pos_stats['misses']:,}")
+    
+    # 4. Загружаем метаданные (если есть): из оглавления пакета или из CSV
+    with profiler.stage('metadata'):
+        metadata = load_corpus_metadata(pack, metadata_path)
+    
+    # 5. Объединяем результаты с метаданными и складываем частоты слов
+    try:
+        enriched_results, table, word_frequencies, groups, vocabulary = enrich_results(
+            all_results, metadata, top_words_capacity, profiler, vocabulary_precision)
+    finally:
+        close_metadata(metadata)
+    
+    # 6-7. Сохраняем результаты в CSV и текстовый отчет; таблицы n-грамм читаются из хранилища
+    hashes = {filename: new_manifest[os.path.join(corpus_folder, filename)]['sha256']
+              for filename in files if new_manifest[os.path.join(corpus_folder, filename)] is not None}
+    save_results(enriched_results, corpus_folder, table, word_frequencies, results_folder, profiler,
+                 ngram_memory, groups, report_formats, vocabulary, duplicate_threshold,
+                 ngram_tables=lambda result: ngram_store.iter_items(hashes.get(result['filename'])))
+    if any(key in plan.metrics for key in NGRAM_TABLE_KEYS):
+        # Таблицы удалённых и изменённых файлов больше не нужны
+        ngram_store.prune(set(hashes.values()))
+    
+    # 8. Выводим сводную статистику
+    print_summary(enriched_results, table, vocabulary)
     
-    # 5. Объединяем результаты с метаданными
+    return enriched_results
+
+def apply_metadata(result, item):
+    """
+    Дополняет результат анализа полями метаданных.
+    
+    Args:
+        result (dict): Результат анализа (дополняется на месте)
+        item (dict): Строка метаданных файла (None — метаданных нет)
+    
+    Returns:
+        bool: True, если метаданные нашлись
+    """
+    if item is not None:
+        # Добавляем метаданные
+        result.update({
+            'title': item.get('title', 'Неизвестно'),
+            'author': item.get('author', 'Неизвестно'),
+            'year': item.get('year', 'Неизвестно'),
+            'genre': item.get('genre', 'Неизвестно'),
+        })
+        return True
+    # Если метаданных нет, заполняем заглушками
+    result.update({
+        'title': 'Неизвестно',
+        'author': 'Неизвестно',
+        'year': 'Неизвестно',
+        'genre': 'Неизвестно',
+    })
+    return False
+
+def update_vocabulary(author_vocabulary, result, precision=None):
+    """
+    Добавляет слова файла в словарь его автора.
+    
+    Args:
+        author_vocabulary (dict): Словари авторов {автор: счётчик}, дополняется на месте
+        result (dict): Результат с полями word_freq и stopwords_found
+        precision (int): Точность HyperLogLog (None — точный подсчёт)
+    """
+    author = result.get('author', 'Неизвестно')
+    counter = author_vocabulary.get(author)
+    if counter is None:
+        counter = author_vocabulary[author] = new_distinct_counter(precision)
+    counter.update(result['word_freq'])
+    counter.update(result.get('stopwords_found', ()))
+
+def merge_vocabulary(author_vocabulary, precision=None):
+    """
+    Объединяет словари авторов в словарь корпуса.
+    
+    Args:
+        author_vocabulary (dict): Словари авторов {автор: счётчик}
+        precision (int): Точность HyperLogLog (None — точный подсчёт)
+    
+    Returns:
+        dict: {'corpus': счётчик, 'authors': {автор: счётчик}}
+    """
+    corpus = new_distinct_counter(precision)
+    for counter in author_vocabulary.values():
+        corpus.merge(counter)
+    return {'corpus': corpus, 'authors': author_vocabulary}
+
+def count_vocabulary(results, precision=None):
+    """
+    Считает словарь корпуса и авторов — число различных слов, а не сумму
+    уникальных слов по файлам.
+    
+    Args:
+        results (list): Результаты с метаданными
+        precision (int): Точность HyperLogLog (None — точный подсчёт)
+    
+    Returns:
+        dict: {'corpus': счётчик, 'authors': {автор: счётчик}} (см. merge_vocabulary)
+    """
+    author_vocabulary = {}
+    for result in results:
+        update_vocabulary(author_vocabulary, result, precision)
+    return merge_vocabulary(author_vocabulary, precision)
+
+def enrich_results(all_results, metadata, top_words_capacity=None, profiler=None, vocabulary_precision=None):
+    """
+    Объединяет результаты с метаданными и складывает частоты слов.
+    
+    Словари результатов дополняются на месте; метрики параллельно идут
+    в колоночную таблицу и в сводки по группам (автор, год, десятилетие, жанр),
+    слова — в словари авторов и корпуса.
+    
+    Args:
+        all_results (list): Результаты analyze_single_text
+        metadata (MetadataIndex | dict): Метаданные {имя файла: строка}
+        top_words_capacity (int): Размер приближённой таблицы частот (None — точно)
+        profiler (Profiler): Профилировщик для замеров этапов (None — без замеров)
+        vocabulary_precision (int): Точность HyperLogLog для словаря (None — точно)
+    
+    Returns:
+        tuple: (список результатов, ResultsTable, частоты слов
+               {'corpus': таблица, 'authors': {автор: таблица}}, GroupStats,
+               словарь {'corpus': счётчик, 'authors': {автор: счётчик}})
+    """
+    profiler = profiler or _NO_PROFILER
     enriched_results = []
-    for result in all_results:
-        filename = result['filename']
-        enriched_result = result.copy()
-        
-        if filename in metadata:
-            # Добавляем метаданные
-            enriched_result.update({
-                'title': metadata[filename].get('title', 'Неизвестно'),
-                'author': metadata[filename].get('author', 'Неизвестно'),
-                'year': metadata[filename].get('year', 'Неизвестно'),
-                'genre': metadata[filename].get('genre', 'Неизвестно'),
-            })
-        else:
-            # Если метаданных нет, заполняем заглушками
-            enriched_result.update({
-                'title': 'Неизвестно',
-                'author': 'Неизвестно',
-                'year': 'Неизвестно',
-                'genre': 'Неизвестно',
-            })
-        
-        enriched_results.append(enriched_result)
+    table = ResultsTable(capacity=len(all_results))
+    groups = GroupStats()
+    corpus_freq = new_frequency_table(top_words_capacity)
+    author_freq = {}
+    author_vocabulary = {}
+    with profiler.stage('enrich'):
+        for result in all_results:
+            filename = result['filename']
+            enriched_result = result
+            if apply_metadata(enriched_result, metadata.get(filename)):
+                profiler.count('metadata_hits')
+            
+            enriched_results.append(enriched_result)
+            table.append(enriched_result)
+            groups.add(enriched_result)
+            
+            # Частоты файла добавляются к корпусу и автору без повторного чтения текстов
+            author = enriched_result['author']
+            if author not in author_freq:
+                author_freq[author] = new_frequency_table(top_words_capacity)
+            corpus_freq.update(result['word_freq'])
+            author_freq[author].update(result['word_freq'])
+            update_vocabulary(author_vocabulary, enriched_result, vocabulary_precision)
+        vocabulary = merge_vocabulary(author_vocabulary, vocabulary_precision)
+    return enriched_results, table, {'corpus': corpus_freq, 'authors': author_freq}, groups, vocabulary
+
+def save_results(enriched_results, corpus_folder, table=None, word_frequencies=None,
+                 results_folder=RESULTS_FOLDER, profiler=None, ngram_memory=NGRAM_MEMORY_ITEMS, groups=None,
+                 report_formats=('txt',), vocabulary=None, duplicate_threshold=DUPLICATE_THRESHOLD,
+                 ngram_tables=result_ngrams):
+    """
+    Сохраняет statistics.csv, groups.csv, ngrams.csv, duplicates.csv и отчеты.
     
-    # 6. Сохраняем результаты в CSV
+    Args:
+        enriched_results (list): Результаты с метаданными
+        corpus_folder (str): Путь к корпусу (для отчета)
+        table (ResultsTable): Колоночная таблица тех же результатов
+        word_frequencies (dict): Частоты слов (см. enrich_results)
+        results_folder (str): Папка для результатов
+        profiler (Profiler): Профилировщик для замеров этапов (None — без замеров)
+        ngram_memory (int): Сколько n-грамм держать в памяти (см. NgramCounter)
+        groups (GroupStats): Сводки по группам (см. enrich_results)
+        report_formats (tuple): Форматы отчета: 'txt', 'jsonl', 'html'
+        vocabulary (dict): Словари корпуса и авторов (см. enrich_results)
+        duplicate_threshold (float): Порог меры Жаккара для почти одинаковых текстов
+        ngram_tables (callable): Таблицы n-грамм файла по результату (см. write_ngrams);
+                                 ngrams.csv пишется, только если n-граммы считались
+    """
+    profiler = profiler or _NO_PROFILER
     print(f"\n💾 Сохранение результатов...")
     
+    # Почти одинаковые тексты: группы в duplicates.csv, номер группы — в statistics.csv
+    with profiler.stage('duplicates'):
+        duplicates_path = os.path.join(results_folder, 'duplicates.csv')
+        duplicates = write_duplicates(enriched_results, duplicates_path, duplicate_threshold)
+    if duplicates is not None:
+        print(f" Почти одинаковые тексты: групп {len(duplicates)}, сохранено в {duplicates_path}")
+    
     # Определяем заголовки для CSV
     headers = [
         'filename', 'title', 'author', 'year', 'genre',
-        'word_count', 'unique_words', 'most_common', 'ttr', 'line_count',
+        'word_count', 'unique_words', 'most_common', 'ttr', 'mattr', 'mtld', 'hdd', 'line_count',
         'avg_word_length', 'lexical_density', 'noun_density',
-        'adj_density', 'verb_density'
+        'adj_density', 'verb_density', 'duplicate_cluster'
     ]
     
     # Фильтруем заголовки, оставляем только те, что есть в данных
-    available_headers = []
-    for header in headers:
-        if any(header in result for result in enriched_results):
-            available_headers.append(header)
-    
-    # Готовим данные для записи (только доступные поля)
-    csv_data = []
+    present = set()
     for result in enriched_results:
-        row = []
-        for header in available_headers:
-            if header == 'most_common':
-                most_common = result.get('most_common', [])
-                if most_common:
-                    row.append(", ".join([f"{word}; ({count})" for word, count in most_common]))
-                else:
-                    row.append("")
-            else:
-                row.append(result.get(header, ''))
-        csv_data.append(row)
-    write_csv_file("my_project/results/statistics.csv", csv_data, available_headers)
-    print(f" Результаты сохранены в my_project/results/statistics.csv")
+        present.update(result)
+    available_headers = [header for header in headers if header in present]
     
-    # 7. Генерируем и сохраняем текстовый отчет
-    generate_report(enriched_results, corpus_folder)
+    # Строки формируются по мере записи, без промежуточной таблицы
+    with profiler.stage('statistics_csv'):
+        statistics_path = os.path.join(results_folder, 'statistics.csv')
+        write_csv_file(statistics_path, iter_statistics_rows(enriched_results, available_headers), available_headers)
+    print(f" Результаты сохранены в {statistics_path}")
     
-    # 8. Выводим сводную статистику
-    print_summary(enriched_results)
+    # Сводки метрик по авторам, годам, десятилетиям и жанрам
+    if groups is not None:
+        with profiler.stage('groups_csv'):
+            groups_path = os.path.join(results_folder, 'groups.csv')
+            write_csv_file(groups_path, groups.iter_rows(), GROUP_HEADERS)
+        print(f" Сводки по группам сохранены в {groups_path}")
+    
+    # Частые n-граммы и устойчивые сочетания по файлам, авторам и корпусу
+    with profiler.stage('ngrams_csv'):
+        ngrams_path = os.path.join(results_folder, 'ngrams.csv')
+        ngrams = write_ngrams(enriched_results, ngrams_path, max_items=ngram_memory, tables=ngram_tables)
+    if ngrams is not None:
+        print(f" N-граммы сохранены в {ngrams_path}")
+    
+    # Генерируем и сохраняем отчеты
+    with profiler.stage('report'):
+        generate_report(enriched_results, corpus_folder, word_frequencies=word_frequencies, table=table,
+                        results_folder=results_folder, ngrams=ngrams, groups=groups, formats=report_formats,
+                        vocabulary=vocabulary, duplicates=duplicates)
+
+def pack_corpus(corpus_folder='my_project/corpus', pack_path=PACK_PATH, metadata_path=METADATA_PATH):
+    """
+    Собирает тексты корпуса и метаданные в один файл пакета.
+    
+    Args:
+        corpus_folder (str): Путь к папке с текстами
+        pack_path (str): Путь к файлу пакета
+        metadata_path (str): Путь к CSV с метаданными
+    
+    Returns:
+        int: Количество текстов в пакете
+    """
+    print("=" * 60)
+    print("📦 Упаковка корпуса")
+    print("=" * 60)
     
+    count = build_pack(corpus_folder, pack_path, metadata_path)
+    print(f" Упаковано файлов: {count}")
+    print(f" Пакет сохранен в {pack_path} ({os.path.getsize(pack_path):,} байт)")
+    print(f" Анализ пакета: python main.py --corpus {pack_path}")
+    return count
+
+def map_corpus(corpus_folder='my_project/corpus', shard='0/1', file_list=None, output=None, workers=1,
+               pos_cache_path=POS_CACHE_PATH, stream_threshold=STREAM_THRESHOLD, prefetch=0, file_timeout=None,
+               metrics=None):
+    """
+    Анализирует часть корпуса и сохраняет частичный результат для reduce.
+
+    Часть задаётся номером K/N (файлы с CRC32 имени, равным K по модулю N)
+    или списком имён файлов. Метаданные не добавляются: их подставляет reduce.
+
+    Args:
+        corpus_folder (str): Путь к папке с текстами или к пакету корпуса
+        shard (str): Номер части вида 'K/N' (если не задан file_list)
+        file_list (str): Файл со списком имён файлов части
+        output (str): Файл части (по умолчанию в SHARD_FOLDER)
+        workers (int): Количество процессов для анализа
+        pos_cache_path (str): Файл дискового кэша частей речи (None — без диска)
+        stream_threshold (int): Порог потокового чтения (см. analyze_single_text)
+        prefetch (int): Сколько файлов читать заранее в потоках
+        file_timeout (float): Ограничение времени на файл в секундах (None — без ограничения)
+        metrics (tuple): Какие метрики считать (None — все)
+
+    Returns:
+        int: Количество проанализированных файлов (None, если часть задана неверно)
+    """
+    print("=" * 60)
+    print("🧩 Анализ части корпуса")
+    print("=" * 60)
+
+    pack = CorpusPack(corpus_folder) if is_pack(corpus_folder) else None
+    files = pack.names if pack is not None else get_files_in_folder(corpus_folder, '.txt')
+    # Место файла в списке всего корпуса: по нему reduce восстанавливает порядок
+    order = {filename: i for i, filename in enumerate(files)}
+
+    if file_list is not None:
+        name = os.path.basename(file_list)
+        selected = read_file_list(file_list)
+        missing = [filename for filename in selected if filename not in order]
+        if missing:
+            print(f" Нет в корпусе: {len(missing)} файлов (например, {missing[0]})")
+        selected = [filename for filename in selected if filename in order]
+    else:
+        try:
+            index, shard_count = parse_shard(shard)
+        except ValueError as e:
+            print(f" {e}")
+            return None
+        name = f'{index}/{shard_count}'
+        selected = [filename for filename in files if shard_of(filename, shard_count) == index]
+    if output is None:
+        output = os.path.join(SHARD_FOLDER, name.replace('/', '-of-') + '.json.gz')
+    print(f" Файлов в корпусе: {len(files)}, в части {name}: {len(selected)}")
+
+    pos_cache = PosTagCache(pos_cache_path)
+    if selected and pos_cache_path is None and get_plan(metrics).uses_morphology:
+        warm_up_morph()
+    results = []
+    errors = []
+    for filename, result in zip(selected, iter_analysis_results(corpus_folder, selected, workers, pos_cache,
+                                                                stream_threshold, prefetch=prefetch,
+                                                                pack=pack, timeout=file_timeout, errors=errors,
+                                                                metrics=metrics)):
+        if result:
+            result['order'] = order[filename]
+            results.append(result)
+        else:
+            print(f"  {filename} ❌ {errors[-1]['error']}" if errors and errors[-1]['filename'] == filename
+                  else f"  {filename} ❌")
+    pos_cache.close()
+    if pack is not None:
+        pack.close()
+
+    if save_shard(output, corpus_folder, name, results):
+        print(f" Проанализировано: {len(results)}, часть сохранена в {output}")
+    if errors:
+        print(f"  Не проанализировано файлов: {len(errors)}")
+    return len(results)
+
+def reduce_shards(shard_paths, results_folder=RESULTS_FOLDER, metadata_path=METADATA_PATH,
+                  top_words_capacity=None, ngram_memory=NGRAM_MEMORY_ITEMS, report_formats=('txt',),
+                  vocabulary_precision=None, duplicate_threshold=DUPLICATE_THRESHOLD):
+    """
+    Объединяет частичные результаты в statistics.csv и report.txt.
+
+    Метаданные, частоты слов по корпусу и авторам и сводка считаются так же,
+    как в analyze_corpus, поэтому результат совпадает с анализом на одном узле.
+
+    Args:
+        shard_paths (list): Файлы частей (результаты map_corpus)
+        results_folder (str): Папка для statistics.csv и report.txt
+        metadata_path (str): Путь к CSV с метаданными (если корпус не в пакете)
+        top_words_capacity (int): Размер приближённой таблицы частот (None — точно)
+        ngram_memory (int): Сколько n-грамм держать в памяти (см. NgramCounter)
+        report_formats (tuple): Форматы отчета: 'txt', 'jsonl', 'html'
+        vocabulary_precision (int): Точность HyperLogLog для словаря (None — точно)
+        duplicate_threshold (float): Порог меры Жаккара для почти одинаковых текстов
+
+    Returns:
+        list: Список словарей с результатами анализа
+    """
+    print("=" * 60)
+    print("🧩 Объединение частей")
+    print("=" * 60)
+
+    shards = []
+    for path in shard_paths:
+        try:
+            shard = load_shard(path)
+        except (OSError, ValueError) as e:
+            print(f" Часть {path} не прочитана: {e}")
+            return []
+        print(f"  {path}: часть {shard['shard']}, файлов {len(shard['results'])}")
+        shards.append(shard)
+    if not shards:
+        return []
+
+    corpus_folder = shards[0]['corpus']
+    if any(shard['corpus'] != corpus_folder for shard in shards):
+        print(f"  Части относятся к разным корпусам, в отчете будет указан {corpus_folder}")
+    all_results, duplicates = merge_shards(shards)
+    print(f" Всего файлов: {len(all_results)}" + (f", повторов пропущено: {duplicates}" if duplicates else ""))
+    if not all_results:
+        return []
+
+    os.makedirs(results_folder, exist_ok=True)
+    pack = CorpusPack(corpus_folder) if is_pack(corpus_folder) else None
+    metadata = load_corpus_metadata(pack, metadata_path)
+    try:
+        enriched_results, table, word_frequencies, groups, vocabulary = enrich_results(
+            all_results, metadata, top_words_capacity, vocabulary_precision=vocabulary_precision)
+    finally:
+        close_metadata(metadata)
+    save_results(enriched_results, corpus_folder, table, word_frequencies, results_folder,
+                 ngram_memory=ngram_memory, groups=groups, report_formats=report_formats, vocabulary=vocabulary,
+                 duplicate_threshold=duplicate_threshold)
+    if pack is not None:
+        pack.close()
+    print_summary(enriched_results, table, vocabulary)
     return enriched_results
 
-def generate_report(results, corpus_folder):
+def build_corpus_index(corpus_folder='my_project/corpus', index_path=INDEX_PATH):
     """
-    Генерирует текстовый отчет с результатами анализа.
+    Строит или обновляет инвертированный индекс корпуса.
+    
+    Args:
+        corpus_folder (str): Путь к папке с текстами
+        index_path (str): Путь к файлу индекса
+    
+    Returns:
+        dict: Счётчики update_index
+    """
+    print("=" * 60)
+    print("🗂  Индексация корпуса")
+    print("=" * 60)
+    
+    files = get_files_in_folder(corpus_folder, '.txt')
+    print(f" Найдено файлов: {len(files)}")
+    
+    metadata = load_metadata()
+    try:
+        authors = {filename: metadata.get(filename, {}).get('author', 'Неизвестно') for filename in files}
+    finally:
+        close_metadata(metadata)
+    
+    stats = update_index(corpus_folder, files, authors, index_path)
+    print(f"\n Проиндексировано: {stats['indexed']}, без изменений: {stats['unchanged']}, "
+          f"удалено: {stats['removed']}")
+    print(f" Индекс сохранен в {index_path}")
+    return stats
+
+def query_index(word, limit=20, width=40, index_path=INDEX_PATH):
+    """
+    Выводит вхождения слова в контексте, документную частоту и частоту по авторам.
+    
+    Args:
+        word (str): Искомое слово
+        limit (int): Максимальное число строк контекста
+        width (int): Ширина контекста слева и справа в символах
+        index_path (str): Путь к файлу индекса
+    """
+    try:
+        index = CorpusIndex(index_path)
+    except FileNotFoundError as e:
+        print(f" {e}. Сначала выполните: python main.py index")
+        return
+    
+    print(f"🔎 «{word}»: файлов {index.document_frequency(word)}")
+    for author, hits in index.author_hits(word).items():
+        print(f"  - {author}: {hits} вхождений")
+    
+    print()
+    for filename, line_no, left, match, right in index.concordance(word, width, limit):
+        print(f"{filename}:{line_no:<4} {left:>{width}} [{match}] {right}")
+    index.close()
+
+def find_similar(filename, k=SIMILAR_TOP, manifest_path=MANIFEST_PATH):
+    """
+    Выводит тексты, ближайшие к данному по косинусу векторов TF-IDF.
+    
+    Векторы строятся по частотам слов из манифеста прошлого анализа,
+    тексты заново не читаются.
+    
+    Args:
+        filename (str): Имя файла корпуса
+        k (int): Сколько текстов показать
+        manifest_path (str): Путь к манифесту
+    
+    Returns:
+        list: Пары (имя файла, косинус)
+    """
+    results = [entry['result'] for entry in load_manifest(manifest_path).values() if 'result' in entry]
+    if not results:
+        print(f" Нет результатов анализа в {manifest_path}. Сначала выполните: python main.py")
+        return []
+    index = TfidfIndex(results)
+    try:
+        similar = index.similar(filename, k)
+    except KeyError:
+        print(f" Файл {filename} не найден в результатах анализа")
+        return []
+    
+    print(f"🔗 Похожие на {filename} (косинус TF-IDF):")
+    for other, score in similar:
+        print(f"  {score:.4f}  {other}")
+    return similar
+
+def _vocabulary_format(counter):
+    """Формат размера словаря: точное число или оценка HyperLogLog с ошибкой."""
+    if counter.relative_error:
+        return f"≈{{:,}} (±{counter.relative_error:.1%})"
+    return "{:,}"
+
+def _report_conclusions(table, word_frequencies=None, ngrams=None, vocabulary=None, duplicates=None):
+    """
+    Собирает выводы отчета: лучшие файлы и списки по корпусу и авторам.
+    
+    Args:
+        table (ResultsTable): Колоночная таблица результатов
+        word_frequencies (dict): Частоты слов {'corpus': таблица, 'authors': {автор: таблица}}
+        ngrams (dict): Сводки n-грамм {'corpus': сводка, 'authors': {автор: сводка}}
+        vocabulary (dict): Словари {'corpus': счётчик, 'authors': {автор: счётчик}}
+        duplicates (list): Группы почти одинаковых текстов — списки имён файлов
+    
+    Returns:
+        tuple: (лучшие файлы, списки) в виде, который ждут ReportWriter.conclusions
+    """
+    highlights = []
+    
+    def add_highlight(label, column, text):
+        row = table.argmax(column)
+        value = table.value(column, row)
+        highlights.append({'label': label, 'metric': column, 'filename': table.value('filename', row),
+                           'value': value, 'text': text.format(value)})
+    
+    # Самый большой файл и самый лексически разнообразный
+    add_highlight('Самый большой файл', 'word_count', '{:,} слов')
+    if table.has('ttr'):
+        add_highlight('Самый лексически разнообразный', 'ttr', 'TTR: {:.4f}')
+    # То же без поправки на длину текста: по MATTR
+    if table.has('mattr'):
+        add_highlight('Наибольший MATTR', 'mattr', '{:.4f}')
+    if table.has('lexical_density'):
+        add_highlight('Наибольшая лексическая плотность', 'lexical_density', '{:.2%}')
+    
+    blocks = []
+    
+    # По авторам (если есть информация)
+    authors = table.group_counts('author')
+    if len(authors) > 1:
+        author_ttr = table.group_means('ttr', 'author') if table.has('ttr') else None
+        author_mattr = table.group_means('mattr', 'author') if table.has('mattr') else None
+        items = []
+        for author, files_count in authors.items():
+            text = f"{files_count} файлов"
+            if author_ttr is not None:
+                text += f", средний TTR {author_ttr[author]:.4f}"
+            if author_mattr is not None:
+                text += f", MATTR {author_mattr[author]:.4f}"
+            if vocabulary is not None and author in vocabulary['authors']:
+                counter = vocabulary['authors'][author]
+                text += ", словарь " + _vocabulary_format(counter).format(counter.count())
+            items.append((author, text))
+        blocks.append({'title': 'Всего авторов', 'text': str(len(authors)), 'items': items})
+    
+    # Самые частые слова корпуса и авторов
+    if word_frequencies:
+        words_str = ", ".join([f"{word} ({count})" for word, count in word_frequencies['corpus'].most_common(10)])
+        items = [(author, ", ".join([f"{word} ({count})" for word, count in frequencies.most_common(5)]))
+                 for author, frequencies in word_frequencies['authors'].items()]
+        blocks.append({'title': 'Самые частые слова корпуса', 'text': words_str, 'items': items})
+    
+    # Частые n-граммы и устойчивые сочетания
+    if ngrams and ngrams['corpus']:
+        corpus_ngrams = ngrams['corpus']
+        for n, label in ((2, 'биграммы'), (3, 'триграммы')):
+            if n in corpus_ngrams:
+                grams_str = ", ".join([f"{gram} ({count})" for gram, count, _, _ in corpus_ngrams[n]['frequent'][:10]])
+                blocks.append({'title': f'Частые {label} корпуса', 'text': grams_str, 'items': []})
+        if 2 in corpus_ngrams:
+            grams_str = ", ".join([f"{gram} (G² {llr:.1f})" for gram, _, _, llr in corpus_ngrams[2]['collocations'][:10]])
+            items = []
+            for author, summary in ngrams['authors'].items():
+                collocations = summary.get(2, {}).get('collocations', [])[:5]
+                items.append((author, ", ".join([f"{gram} ({count})" for gram, count, _, _ in collocations]) or 'не найдены'))
+            blocks.append({'title': 'Устойчивые сочетания корпуса', 'text': grams_str or 'не найдены', 'items': items})
+    
+    # Почти одинаковые тексты
+    if duplicates:
+        items = [(f"группа {number}", ", ".join(filenames)) for number, filenames in enumerate(duplicates, 1)]
+        blocks.append({'title': 'Групп почти одинаковых текстов', 'text': str(len(duplicates)), 'items': items})
+    
+    return highlights, blocks
+
+def generate_report(results, corpus_folder, word_frequencies=None, table=None, results_folder=RESULTS_FOLDER,
+                    ngrams=None, groups=None, formats=('txt',), vocabulary=None, duplicates=None):
+    """
+    Генерирует отчет с результатами анализа в одном или нескольких форматах.
+    
+    Разделы отчета пишутся в файлы сразу, без сборки всего отчета в памяти;
+    по результатам делается один проход, общий для всех форматов.
     
     Args:
         results (list): Список словарей с результатами
         corpus_folder (str): Путь к папке корпуса
+        word_frequencies (dict): Частоты слов {'corpus': таблица, 'authors': {автор: таблица}}
+        table (ResultsTable): Колоночная таблица тех же результатов (если уже построена)
+        results_folder (str): Папка для отчетов
+        ngrams (dict): Сводки n-грамм {'corpus': сводка, 'authors': {автор: сводка}}
+                       (см. write_ngrams)
+        groups (GroupStats): Сводки метрик по группам
+        formats (tuple): Форматы отчета из REPORT_FORMATS: 'txt', 'jsonl', 'html'
+        vocabulary (dict): Словари корпуса и авторов (см. count_vocabulary; None — посчитать точно)
+        duplicates (list): Группы почти одинаковых текстов (см. write_duplicates)
     """
     if not results:
         return
+    if table is None:
+        table = ResultsTable.from_results(results)
+    if vocabulary is None:
+        vocabulary = count_vocabulary(results)
     
-    report_lines = []
-    
-    # Заголовок отчета
-    report_lines.append("=" * 60)
-    report_lines.append("📊 ОТЧЕТ ПО АНАЛИЗУ ТЕКСТОВОГО КОРПУСА")
-    report_lines.append("=" * 60)
-    report_lines.append(f"Папка корпуса: {corpus_folder}")
-    report_lines.append(f"Дата анализа: {os.path.basename(corpus_folder)}")
-    report_lines.append("")
-    
-    # Общая статистика
-    report_lines.append("📈 ОБЩАЯ СТАТИСТИКА:")
-    report_lines.append("-" * 40)
-    
-    total_files = len(results)
-    total_words = sum(r.get('word_count', 0) for r in results)
-    total_unique = sum(r.get('unique_words', 0) for r in results)
-    avg_ttr = sum(r.get('ttr', 0) for r in results) / total_files if total_files > 0 else 0
-    
-    report_lines.append(f"  Всего файлов: {total_files}")
-    report_lines.append(f"  Всего слов: {total_words:,}")
-    report_lines.append(f"  Всего уникальных слов: {total_unique:,}")
-    report_lines.append(f"  Средний TTR: {avg_ttr:.4f}")
-    
-    # Статистика по лексической плотности (если есть)
-    if any('lexical_density' in r for r in results):
-        avg_lex = sum(r.get('lexical_density', 0) for r in results) / total_files
-        report_lines.append(f"  Средняя лексическая плотность: {avg_lex:.2%}")
-        report_lines.append("")
-    
-    # Детальная статистика по файлам
-    report_lines.append("")
-    report_lines.append("📋 ДЕТАЛЬНАЯ СТАТИСТИКА ПО ФАЙЛАМ:")
-    report_lines.append("=" * 60)
-    
-    for i, result in enumerate(results, 1):
-        report_lines.append(f"\n{i}. 📄 {result.get('filename', 'Неизвестно')}")
-        report_lines.append("-" * 40)
-        
-        if 'title' in result:
-            report_lines.append(f"   Название: {result.get('title', 'Неизвестно')}")
-        if 'author' in result:
-            report_lines.append(f"   Автор: {result.get('author', 'Неизвестно')}")
-        if 'year' in result:
-            report_lines.append(f"   Год: {result.get('year', 'Неизвестно')}")
-        
-        report_lines.append(f"   Слов: {result.get('word_count', 0):,}")
-        report_lines.append(f"   Уникальных слов: {result.get('unique_words', 0):,}")
-        most_common = result.get('most_common', [])
-        if most_common:
-            words_str = ", ".join([f"{word} ({count})" for word, count in most_common])
-            report_lines.append(f"   Самые частые слова: {words_str}")
-        else:
-            report_lines.append("   Самые частые слова: не найдены")
-        report_lines.append(f"   TTR: {result.get('ttr', 0):.4f}")
-        report_lines.append(f"   Строк: {result.get('line_count', 0):,}")
-        report_lines.append(f"   Ср. длина слова: {result.get('avg_word_length', 0):.2f}")
-        
-        if 'lexical_density' in result:
-            report_lines.append(f"   Лекс. плотность: {result.get('lexical_density', 0):.2%}")
-    
-    # Выводы
-    report_lines.append("\n" + "=" * 60)
-    report_lines.append(" РЕЗУЛЬТАТЫ:")
-    report_lines.append("=" * 60)
+    # Общая статистика: ключ, подпись, значение, формат
+    overview = [
+        ('files', 'Всего файлов', len(table), '{}'),
+        ('words', 'Всего слов', table.sum('word_count'), '{:,}'),
+        ('vocabulary', 'Словарь корпуса (уникальных слов)', vocabulary['corpus'].count(),
+         _vocabulary_format(vocabulary['corpus'])),
+    ]
+    # Метрики, которых нет в выбранном наборе (--metrics), не выводятся
+    for key, label, number_format in (('ttr', 'Средний TTR', '{:.4f}'), ('mattr', 'Средний MATTR', '{:.4f}'),
+                                      ('mtld', 'Средний MTLD', '{:.2f}'), ('hdd', 'Средний HD-D', '{:.4f}')):
+        if table.has(key):
+            overview.append((key, label, table.mean(key), number_format))
+    if table.has('lexical_density'):
+        overview.append(('lexical_density', 'Средняя лексическая плотность', table.mean('lexical_density'), '{:.2%}'))
+    columns = [column for column in FILE_COLUMNS if column[2] is None or table.has(column[0])]
     
-    if results:
-        # Самый большой файл
-        biggest_file = max(results, key=lambda x: x.get('word_count', 0))
-        report_lines.append(f"• Самый большой файл: {biggest_file.get('filename')} "
-                          f"({biggest_file.get('word_count', 0):,} слов)")
+    os.makedirs(results_folder, exist_ok=True)
+    paths = [os.path.join(results_folder, REPORT_FORMATS[name]) for name in formats]
+    with contextlib.ExitStack() as stack:
+        writers = [REPORT_WRITERS[name](stack.enter_context(open(path, 'w', encoding='utf-8')))
+                   for name, path in zip(formats, paths)]
         
-        # Самый лексически разнообразный
-        most_diverse = max(results, key=lambda x: x.get('ttr', 0))
-        report_lines.append(f"• Самый лексически разнообразный: {most_diverse.get('filename')} "
-                          f"(TTR: {most_diverse.get('ttr', 0):.4f})")
+        for writer in writers:
+            writer.header(corpus_folder)
+            writer.overview(overview)
+            writer.files_begin(columns)
         
-        # Самая высокая лексическая плотность
-        if any('lexical_density' in r for r in results):
-            most_dense = max(results, key=lambda x: x.get('lexical_density', 0))
-            report_lines.append(f"• Наибольшая лексическая плотность: {most_dense.get('filename')} "
-                              f"({most_dense.get('lexical_density', 0):.2%})")
+        # Детальная статистика по файлам: один проход для всех форматов
+        for i, result in enumerate(results, 1):
+            for writer in writers:
+                writer.file(i, result)
         
-        # По авторам (если есть информация)
-        authors = {}
-        for result in results:
-            author = result.get('author', 'Неизвестно')
-            if author not in authors:
-                authors[author] = []
-            authors[author].append(result)
-        
-        if len(authors) > 1:
-            report_lines.append(f"\n• Всего авторов: {len(authors)}")
-            for author, files in authors.items():
-                report_lines.append(f"  - {author}: {len(files)} файлов")
-    
-    report_lines.append("\n" + "=" * 60)
-    report_lines.append(" Анализ завершен успешно!")
-    report_lines.append("=" * 60)
-    
-    # Сохраняем отчет в файл
-    report_content = "\n".join(report_lines)
-    write_csv_file("my_project/results/report.txt", [{'report': report_content}], ['report'])
+        highlights, blocks = _report_conclusions(table, word_frequencies, ngrams, vocabulary, duplicates)
+        for writer in writers:
+            writer.files_end()
+            # Сводки по авторам, годам, десятилетиям и жанрам
+            if groups is not None:
+                writer.groups(groups)
+            writer.conclusions(highlights, blocks)
+            writer.footer()
     
-    # Также сохраняем как обычный текстовый файл
-    with open("my_project/results/report.txt", "w", encoding="utf-8") as f:
-        f.write(report_content)
-    
-    print(f" Отчет сохранен в my_project/results/report.txt")
+    for path in paths:
+        print(f" Отчет сохранен в {path}")
 
-def print_summary(results):
+def print_summary(results, table=None, vocabulary=None):
     """
     Выводит сводную статистику в консоль.
     
     Args:
         results (list): Список словарей с результатами
+        table (ResultsTable): Колоночная таблица тех же результатов (если уже построена)
+        vocabulary (dict): Словари корпуса и авторов (None — посчитать точно)
     """
     if not results:
         return
+    if table is None:
+        table = ResultsTable.from_results(results)
+    if vocabulary is None:
+        vocabulary = count_vocabulary(results)
     
     print("\n" + "=" * 60)
     print(" СВОДНАЯ СТАТИСТИКА")
     print("=" * 60)
     
-    total_files = len(results)
-    total_words = sum(r.get('word_count', 0) for r in results)
-    total_unique = sum(r.get('unique_words', 0) for r in results)
+    total_files = len(table)
+    total_words = table.sum('word_count')
+    corpus_vocabulary = vocabulary['corpus']
     
     print(f"📁 Всего проанализировано файлов: {total_files}")
     print(f"🔤 Общее количество слов в корпусе: {total_words:,}")
-    print(f" Уникальных слов: {total_unique:,}")
+    print(" Словарь корпуса (уникальных слов): "
+          + _vocabulary_format(corpus_vocabulary).format(corpus_vocabulary.count()))
     
     if total_files > 0:
         avg_words = total_words / total_files
         print(f" Среднее число слов в файле: {avg_words:,.2f}")
     
     # Если есть данные о лексической плотности
-    if any('lexical_density' in r for r in results):
-        total_lex = sum(r.get('lexical_density', 0) for r in results)
-        avg_lex = total_lex / total_files if total_files > 0 else 0
+    if table.has('lexical_density'):
+        avg_lex = table.mean('lexical_density')
         print(f" Средняя лексическая плотность: {avg_lex:.2%}")
 
-def main():
+def _report_formats_arg(value):
+    """Разбирает --report-format для argparse."""
+    try:
+        formats = parse_report_formats(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    if not formats:
+        raise argparse.ArgumentTypeError("нужен хотя бы один формат отчета")
+    return formats
+
+def _metrics_arg(value):
+    """Проверяет --metrics для argparse; разбор — в selected_metrics."""
+    try:
+        parse_metrics(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+def selected_metrics(args):
+    """Метрики из --metrics и --ngrams."""
+    return parse_metrics(args.metrics + (',ngrams' if args.ngrams else ''))
+
+def parse_args(argv=None):
+    """
+    Разбирает аргументы командной строки.
+    
+    Args:
+        argv (list): Аргументы (по умолчанию sys.argv)
+    
+    Returns:
+        argparse.Namespace: Разобранные аргументы
+    """
+    parser = argparse.ArgumentParser(description="Анализ текстового корпуса")
+    parser.add_argument('--corpus', default='my_project/corpus', metavar='PATH',
+                        help="папка с текстами или пакет корпуса (по умолчанию my_project/corpus)")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="количество процессов для анализа (0 — по числу ядер, по умолчанию 1)")
+    parser.add_argument('--no-pos-cache', action='store_true',
+                        help=f"не использовать дисковый кэш частей речи ({POS_CACHE_PATH})")
+    parser.add_argument('--full', action='store_true',
+                        help=f"проанализировать все файлы заново, не используя манифест ({MANIFEST_PATH})")
+    parser.add_argument('--stream-above', type=float, default=STREAM_THRESHOLD / (1024 * 1024), metavar='MB',
+                        help="читать по частям файлы от этого размера в МБ (0 — все файлы, по умолчанию 64)")
+    parser.add_argument('--metrics', type=_metrics_arg, default='default', metavar='SET',
+                        help=f"какие метрики считать, наборы или метрики через запятую: {', '.join(METRIC_SETS)} "
+                             "(по умолчанию default — всё, кроме n-грамм; basic — быстрые метрики без морфологии)")
+    parser.add_argument('--ngrams', action='store_true',
+                        help="считать n-граммы и устойчивые сочетания (ngrams.csv и разделы отчета); "
+                             "то же, что добавить набор ngrams в --metrics")
+    parser.add_argument('--approx-top-words', type=int, default=0, metavar='N',
+                        help="считать частые слова корпуса приближённо в таблице из N слов (0 — точно)")
+    parser.add_argument('--approx-vocabulary', type=int, default=0, metavar='P',
+                        help="считать словарь корпуса и авторов приближённо (HyperLogLog, 2**P байт, "
+                             "ошибка около 1.04/sqrt(2**P); P от 4 до 18, 0 — точно)")
+    parser.add_argument('--duplicate-threshold', type=float, default=DUPLICATE_THRESHOLD, metavar='J',
+                        help="доля общих слов и биграмм (мера Жаккара), с которой тексты считаются "
+                             f"почти одинаковыми (по умолчанию {DUPLICATE_THRESHOLD})")
+    parser.add_argument('--ngram-memory', type=int, default=NGRAM_MEMORY_ITEMS, metavar='N',
+                        help="сколько n-грамм держать в памяти при подсчёте по авторам и корпусу, "
+                             f"остальное сбрасывается на диск (по умолчанию {NGRAM_MEMORY_ITEMS:,})")
+    parser.add_argument('--report-format', type=_report_formats_arg, default=('txt',), metavar='FORMATS',
+                        help=f"форматы отчета через запятую: {', '.join(REPORT_FORMATS)} (по умолчанию txt)")
+    parser.add_argument('--file-timeout', type=float, default=0, metavar='SEC',
+                        help="прерывать анализ файла дольше SEC секунд и записывать его в errors.csv "
+                             "(0 — без ограничения; нужен сигнал SIGALRM, в Windows не действует)")
+    parser.add_argument('--checkpoint-every', type=float, default=CHECKPOINT_INTERVAL, metavar='SEC',
+                        help="сбрасывать журнал готовых результатов на диск каждые SEC секунд, чтобы после сбоя "
+                             f"продолжить с этого места (0 — только в конце, по умолчанию {CHECKPOINT_INTERVAL})")
+    parser.add_argument('--prefetch', type=int, default=0, metavar='N',
+                        help="читать до N файлов заранее в потоках, пока идёт анализ (0 — выключено; "
+                             "при --workers больше 1 файлы читают сами процессы)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="выводить подробности анализа каждого файла (счётчики частей речи)")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_PATH, metavar='PATH',
+                        help=f"замерить этапы анализа и сохранить трассировку в JSON (по умолчанию {PROFILE_PATH})")
+    
+    subparsers = parser.add_subparsers(dest='command', metavar='команда')
+    pack_parser = subparsers.add_parser('pack', help="собрать тексты корпуса и метаданные в один файл пакета")
+    pack_parser.add_argument('-o', '--output', default=PACK_PATH, help=f"файл пакета (по умолчанию {PACK_PATH})")
+    map_parser = subparsers.add_parser('map', help="проанализировать часть корпуса и сохранить частичный результат")
+    map_shard = map_parser.add_mutually_exclusive_group()
+    map_shard.add_argument('--shard', default='0/1', metavar='K/N',
+                           help="часть K из N по хэшу имени файла (по умолчанию 0/1 — весь корпус)")
+    map_shard.add_argument('--files', metavar='LIST', help="файл со списком имён файлов части, по одному в строке")
+    map_parser.add_argument('-o', '--output', help=f"файл части (по умолчанию в {SHARD_FOLDER})")
+    reduce_parser = subparsers.add_parser('reduce', help="объединить части в statistics.csv и report.txt")
+    reduce_parser.add_argument('shards', nargs='+', metavar='SHARD', help="файлы частей")
+    subparsers.add_parser('index', help=f"построить или обновить инвертированный индекс ({INDEX_PATH})")
+    query_parser = subparsers.add_parser('query', help="найти слово в индексе и показать его в контексте")
+    query_parser.add_argument('word', help="искомое слово")
+    query_parser.add_argument('-n', '--limit', type=int, default=20, help="сколько строк контекста показать")
+    query_parser.add_argument('-w', '--width', type=int, default=40, help="ширина контекста в символах")
+    similar_parser = subparsers.add_parser('similar', help="найти тексты, похожие на данный (по результатам анализа)")
+    similar_parser.add_argument('filename', help="имя файла корпуса")
+    similar_parser.add_argument('-k', type=int, default=SIMILAR_TOP, help=f"сколько текстов показать (по умолчанию {SIMILAR_TOP})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Главная функция программы."""
+    args = parse_args(argv)
+    set_verbose(args.verbose)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if args.approx_vocabulary and not 4 <= args.approx_vocabulary <= 18:
+        print(" --approx-vocabulary должен быть от 4 до 18 (или 0 — точный подсчёт)")
+        return
+    
+    if args.command == 'query':
+        query_index(args.word, limit=args.limit, width=args.width)
+        return
+    
+    if args.command == 'similar':
+        find_similar(args.filename, k=args.k)
+        return
+    
+    if args.command == 'reduce':
+        reduce_shards(args.shards, top_words_capacity=args.approx_top_words or None,
+                      ngram_memory=args.ngram_memory, report_formats=args.report_format,
+                      vocabulary_precision=args.approx_vocabulary or None,
+                      duplicate_threshold=args.duplicate_threshold)
+        return
+    
     print("=" * 60)
     print(" Анализ текстового корпуса")
     print("=" * 60)
 
-    # Проверяем наличие папки corpus
-    corpus_folder = 'my_project/corpus'
+    # Проверяем наличие папки corpus (или пакета корпуса)
+    corpus_folder = args.corpus
     if not os.path.exists(corpus_folder):
         print(f" Папка '{corpus_folder}' не найдена!")
         print("   Убедитесь, что папка с текстами существует.")
         return
 
+    if args.command in ('index', 'pack') and is_pack(corpus_folder):
+        print(f" '{corpus_folder}' уже пакет: команда {args.command} работает с папкой текстов")
+        return
+
+    if args.command == 'index':
+        build_corpus_index(corpus_folder)
+        return
+
+    if args.command == 'pack':
+        pack_corpus(corpus_folder, args.output)
+        return
+
+    if args.command == 'map':
+        map_corpus(corpus_folder, shard=args.shard, file_list=args.files, output=args.output, workers=workers,
+                   pos_cache_path=None if args.no_pos_cache else POS_CACHE_PATH,
+                   stream_threshold=int(args.stream_above * 1024 * 1024), prefetch=args.prefetch,
+                   file_timeout=args.file_timeout or None, metrics=selected_metrics(args))
+        return
+
     # Запускаем анализ корпуса
-    results = analyze_corpus(corpus_folder)
+    pos_cache_path = None if args.no_pos_cache else POS_CACHE_PATH
+    profiler = Profiler(enabled=args.profile is not None)
+    results = analyze_corpus(corpus_folder, workers=workers, pos_cache_path=pos_cache_path,
+                             incremental=not args.full,
+                             stream_threshold=int(args.stream_above * 1024 * 1024),
+                             top_words_capacity=args.approx_top_words or None,
+                             profiler=profiler, prefetch=args.prefetch, ngram_memory=args.ngram_memory,
+                             report_formats=args.report_format,
+                             vocabulary_precision=args.approx_vocabulary or None,
+                             duplicate_threshold=args.duplicate_threshold,
+                             file_timeout=args.file_timeout or None,
+                             checkpoint_interval=args.checkpoint_every, metrics=selected_metrics(args))
+    
+    if profiler.enabled:
+        profiler.print_summary()
+        if profiler.save(args.profile):
+            print(f" Трассировка сохранена в {args.profile}")
 
     if results:
         print("\n" + "=" * 60)
@@ -349,7 +1403,17 @@ def main():
         print("=" * 60)
         print(" Результаты сохранены в папке 'results/'")
         print("   - statistics.csv: детальные метрики по файлам")
-        print("   - report.txt: полный отчет с выводами")
+        print("   - groups.csv: метрики по авторам, годам, десятилетиям и жанрам")
+        metrics = selected_metrics(args)
+        if TOP_NGRAMS_KEY in metrics:
+            print("   - ngrams.csv: частые n-граммы и устойчивые сочетания")
+        if MINHASH_KEY in metrics:
+            print("   - duplicates.csv: группы почти одинаковых текстов")
+        print("   - errors.csv: файлы, которые не удалось проанализировать")
+        report_descriptions = {'txt': "полный отчет с выводами", 'jsonl': "отчет в JSON Lines",
+                               'html': "отчет в HTML с сортируемыми таблицами"}
+        for name in args.report_format:
+            print(f"   - {REPORT_FORMATS[name]}: {report_descriptions[name]}")
     else:
         print("\n Анализ не дал результатов. Проверьте файлы в корпусе.")
 
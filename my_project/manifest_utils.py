@@ -0,0 +1,270 @@
+import os
+import json
+import hashlib
+from morph_utils import get_dictionary_version
+
+# Манифест: размер, время изменения, хэш и результат анализа каждого файла
+MANIFEST_PATH = 'my_project/cache/manifest.json'
+
+# Версия формата результатов: при изменении метрик старый манифест сбрасывается
+MANIFEST_VERSION = 7
+
+# Журнал контрольных точек рядом с манифестом (см. CheckpointLog)
+CHECKPOINT_SUFFIX = '.log'
+
+# Размер блока при подсчёте хэша файла
+_HASH_BLOCK = 1 << 20
+
+
+def get_manifest_version():
+    """
+    Возвращает версию манифеста с учётом версии словарей pymorphy3.
+
+    Returns:
+        str: Строка версии
+    """
+    return f'{MANIFEST_VERSION}; {get_dictionary_version()}'
+
+
+def hash_file(filepath):
+    """
+    Считает SHA-256 содержимого файла, читая его блоками.
+
+    Args:
+        filepath (str): Путь к файлу
+
+    Returns:
+        str: Шестнадцатеричный хэш
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_checkpoint_log(path):
+    """
+    Читает журнал контрольных точек.
+
+    Args:
+        path (str): Путь к журналу
+
+    Returns:
+        dict: Записи {путь к файлу: запись} в порядке записи (поздние важнее).
+              Пустой словарь, если журнала нет или он записан другой версией;
+              оборванные строки (сбой во время записи) пропускаются
+    """
+    files = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            header = f.readline()
+            try:
+                if json.loads(header).get('version') != get_manifest_version():
+                    return {}
+            except ValueError:
+                return {}
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                files[record['path']] = record['entry']
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        print(f"  Журнал {path} не прочитан: {e}")
+    return files
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """
+    Загружает манифест прошлого запуска вместе с журналом контрольных точек
+    (результатами прерванного запуска, см. CheckpointLog).
+
+    Args:
+        path (str): Путь к файлу манифеста
+
+    Returns:
+        dict: Записи {путь к файлу: запись}. Пустой словарь, если манифеста нет,
+              он повреждён или записан другой версией программы
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {'version': get_manifest_version()}
+    except (OSError, ValueError) as e:
+        print(f"  Манифест {path} не прочитан, будет полный анализ: {e}")
+        return {}
+    files = manifest.get('files', {}) if manifest.get('version') == get_manifest_version() else {}
+    files.update(_read_checkpoint_log(path + CHECKPOINT_SUFFIX))
+    for entry in files.values():
+        # JSON превращает кортежи в списки — возвращаем как было
+        result = entry['result']
+        result['most_common'] = [tuple(item) for item in result.get('most_common', [])]
+    return files
+
+
+def save_manifest(entries, path=MANIFEST_PATH):
+    """
+    Сохраняет манифест. Файл заменяется целиком, поэтому прерванная запись
+    не портит предыдущий манифест. Записи журнала контрольных точек уже
+    вошли в entries, поэтому журнал после записи удаляется.
+
+    Args:
+        entries (dict): Записи {путь к файлу: запись}
+        path (str): Путь к файлу манифеста
+
+    Returns:
+        bool: True, если запись прошла успешно, иначе False
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': get_manifest_version(), 'files': entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Ошибка при записи файла {path}: {e}")
+        return False
+    try:
+        os.remove(path + CHECKPOINT_SUFFIX)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Журнал {path + CHECKPOINT_SUFFIX} не удалён: {e}")
+    return True
+
+
+class CheckpointLog:
+    """
+    Журнал контрольных точек: готовые записи манифеста дописываются в конец
+    файла по одной строке JSON, а не переписывают весь манифест.
+
+    Журнал лежит рядом с манифестом (путь + CHECKPOINT_SUFFIX). Первая строка —
+    версия формата. load_manifest добавляет записи журнала к манифесту,
+    save_manifest в конце запуска записывает объединённый манифест и удаляет журнал.
+
+    Args:
+        path (str): Путь к файлу манифеста
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path + CHECKPOINT_SUFFIX
+        self.file = None
+
+    def _open(self):
+        """Открывает журнал для дописывания; журнал другой версии начинается заново."""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        mode = 'a'
+        complete = True
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                header = f.readline()
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    complete = f.read(1) == b'\n'
+            try:
+                if json.loads(header).get('version') != get_manifest_version():
+                    mode = 'w'
+            except ValueError:
+                mode = 'w'
+        self.file = open(self.path, mode, encoding='utf-8')
+        if self.file.tell() == 0:
+            self.file.write(json.dumps({'version': get_manifest_version()}) + '\n')
+        elif not complete:
+            # Оборванная строка прошлого запуска остаётся отдельной строкой
+            self.file.write('\n')
+
+    def append(self, filepath, entry):
+        """
+        Дописывает готовую запись манифеста.
+
+        Args:
+            filepath (str): Путь к файлу
+            entry (dict): Запись манифеста с результатом
+        """
+        if self.file is None:
+            self._open()
+        self.file.write(json.dumps({'path': filepath, 'entry': entry}, ensure_ascii=False) + '\n')
+
+    def flush(self):
+        """Сбрасывает дописанные записи на диск."""
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        """Сбрасывает записи на диск и закрывает журнал."""
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+def make_entry(filepath):
+    """
+    Снимает отпечаток файла: размер, время изменения и хэш содержимого.
+
+    Args:
+        filepath (str): Путь к файлу
+
+    Returns:
+        dict: Запись манифеста без результата (None, если файл недоступен)
+    """
+    try:
+        stat = os.stat(filepath)
+        return {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'sha256': hash_file(filepath),
+        }
+    except OSError:
+        return None
+
+
+def find_unchanged(entry, filepath, fingerprint=None):
+    """
+    Проверяет, что файл не изменился с момента создания записи манифеста.
+
+    Сначала сравниваются размер и время изменения; если изменилось только
+    время, файл перечитывается и сравнивается хэш содержимого.
+
+    Args:
+        entry (dict): Запись манифеста (или None)
+        filepath (str): Путь к файлу
+        fingerprint (dict): Готовый отпечаток (size, mtime, sha256), например
+                            из оглавления пакета; тогда файл не проверяется
+
+    Returns:
+        dict: Актуальная запись (с обновлённым временем), либо None,
+              если файл новый или изменился
+    """
+    if entry is None:
+        return None
+    if fingerprint is not None:
+        if (entry['size'], entry['sha256']) != (fingerprint['size'], fingerprint['sha256']):
+            return None
+        entry['mtime'] = fingerprint['mtime']
+        return entry
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    if entry['size'] != stat.st_size:
+        return None
+    if entry['mtime'] == stat.st_mtime_ns:
+        return entry
+    try:
+        if hash_file(filepath) != entry['sha256']:
+            return None
+    except OSError:
+        return None
+    entry['mtime'] = stat.st_mtime_ns
+    return entry
@@ -0,0 +1,251 @@
+import functools
+import itertools
+from operator import attrgetter, itemgetter
+from text_utils import count_words, count_unique_words, calculate_ttr, calculate_mattr, calculate_mtld, calculate_hdd, count_word_frequencies, find_stopwords, count_ngrams, top_words, count_lines, average_word_length, calculate_lexical_density
+from ngram_utils import NGRAM_SIZES, NGRAM_TABLE_KEYS, TOP_NGRAMS_KEY, ngram_key, top_ngrams
+from similarity_utils import MINHASH_KEY, minhash_signature
+
+# Исходные данные, которые analyze_single_text передаёт планировщику:
+# разобранный текст (EncodedText или StreamingTextStats — слова, их формы
+# в нижнем регистре и строки) и кэш частей речи
+SOURCES = ('tokens', 'pos_cache')
+
+
+class Metric:
+    """
+    Узел графа метрик: что считается, из каких данных и на каком этапе.
+
+    Args:
+        name (str): Название — ключ в результате анализа
+        inputs (tuple): Исходные данные (SOURCES) и другие узлы, нужные для подсчёта
+        compute (callable): Функция от значений inputs в том же порядке
+        stage (str): Этап профилировщика
+        intermediate (bool): Промежуточные данные: считаются для других метрик,
+                             в результат не попадают
+    """
+
+    __slots__ = ('name', 'inputs', 'compute', 'stage', 'intermediate')
+
+    def __init__(self, name, inputs, compute, stage='metrics', intermediate=False):
+        self.name = name
+        self.inputs = inputs
+        self.compute = compute
+        self.stage = stage
+        self.intermediate = intermediate
+
+
+# Реестр метрик в порядке подсчёта и ключей результата
+METRICS = {}
+
+
+def register_metric(name, inputs, compute, stage='metrics', intermediate=False):
+    """
+    Добавляет метрику в реестр.
+
+    Args:
+        name (str): Название метрики
+        inputs (tuple): Исходные данные и метрики, от которых она зависит
+        compute (callable): Функция подсчёта
+        stage (str): Этап профилировщика
+        intermediate (bool): Не записывать значение в результат
+
+    Returns:
+        Metric: Зарегистрированная метрика
+    """
+    metric = Metric(name, tuple(inputs), compute, stage, intermediate)
+    METRICS[name] = metric
+    return metric
+
+
+# Частоты слов без стоп-слов: из них берутся самые частые слова файла,
+# а в analyze_corpus они складываются в частоты по авторам и корпусу.
+# Здесь же впервые разбирается текст, поэтому этап называется tokenize
+register_metric('word_freq', ('tokens',), count_word_frequencies, stage='tokenize')
+register_metric('word_count', ('tokens',), count_words)
+register_metric('unique_words', ('tokens',), count_unique_words)
+register_metric('most_common', ('word_freq',), functools.partial(top_words, n=1))
+register_metric('ttr', ('tokens',), calculate_ttr)
+# TTR зависит от длины текста; эти метрики сравнимы для текстов разной длины
+register_metric('mattr', ('tokens',), calculate_mattr)
+register_metric('mtld', ('tokens',), calculate_mtld)
+register_metric('hdd', ('tokens',), calculate_hdd)
+register_metric('line_count', ('tokens',), count_lines)
+register_metric('avg_word_length', ('tokens',), average_word_length)
+# Вместе с word_freq — весь словарь файла для словаря корпуса
+register_metric('stopwords_found', ('tokens',), find_stopwords)
+# Биграммы и триграммы: складываются в частоты по авторам и корпусу при записи ngrams.csv.
+# Сами таблицы в результате не остаются (см. main.store_ngrams), остаётся сводка файла
+for _n in NGRAM_SIZES:
+    register_metric(ngram_key(_n), ('tokens',), functools.partial(count_ngrams, n=_n), stage='ngrams')
+register_metric(TOP_NGRAMS_KEY, ('word_freq',) + NGRAM_TABLE_KEYS, top_ngrams, stage='ngrams')
+# Подпись MinHash по словам и биграммам для поиска почти одинаковых текстов:
+# хранится в манифесте, чтобы не хэшировать файлы заново при каждом запуске.
+# Биграммы берутся из текста порциями, таблица биграмм для неё не строится
+register_metric(MINHASH_KEY, ('tokens', 'word_freq'), minhash_signature, stage='minhash')
+# Части речи всех слов текста (pymorphy3): один разбор на все плотности
+register_metric('pos_densities', ('tokens', 'pos_cache'),
+                lambda tokens, pos_cache: calculate_lexical_density(tokens, pos_cache=pos_cache),
+                stage='morph', intermediate=True)
+for _key in ('lexical_density', 'noun_density', 'adj_density', 'verb_density'):
+    register_metric(_key, ('pos_densities',), itemgetter(_key), stage='morph')
+
+# Все метрики результата (так считались результаты до выбора наборов)
+ALL_METRICS = tuple(name for name, metric in METRICS.items() if not metric.intermediate)
+
+# Считаются всегда: на них держатся словарь корпуса, частые слова,
+# поиск похожих текстов и замеры профилировщика
+REQUIRED_METRICS = ('word_count', 'word_freq', 'stopwords_found')
+
+# Наборы метрик для --metrics
+METRIC_SETS = {
+    # Дешёвые метрики по словам и строкам, без морфологии
+    'basic': ('word_count', 'unique_words', 'most_common', 'ttr', 'line_count', 'avg_word_length'),
+    'diversity': ('mattr', 'mtld', 'hdd'),
+    # N-граммы и ngrams.csv: самый дорогой этап, включается отдельно (--ngrams)
+    'ngrams': NGRAM_TABLE_KEYS + (TOP_NGRAMS_KEY,),
+    # Лексическая плотность: нужен разбор частей речи pymorphy3
+    'morph': ('lexical_density', 'noun_density', 'adj_density', 'verb_density'),
+    # Почти одинаковые тексты (duplicates.csv)
+    'duplicates': (MINHASH_KEY,),
+    'all': ALL_METRICS,
+}
+
+# Набор по умолчанию для командной строки: всё, кроме n-грамм
+METRIC_SETS['default'] = (METRIC_SETS['basic'] + METRIC_SETS['diversity'] + METRIC_SETS['morph']
+                          + METRIC_SETS['duplicates'])
+
+
+def parse_metrics(value):
+    """
+    Разбирает список наборов и метрик через запятую, например 'basic,mattr'.
+
+    Args:
+        value (str): Названия из METRIC_SETS и ALL_METRICS
+
+    Returns:
+        tuple: Метрики в порядке реестра вместе с REQUIRED_METRICS
+
+    Raises:
+        ValueError: Если название неизвестно
+    """
+    selected = set(REQUIRED_METRICS)
+    for name in (part.strip() for part in value.split(',')):
+        if not name:
+            continue
+        if name in METRIC_SETS:
+            selected.update(METRIC_SETS[name])
+        elif name in ALL_METRICS:
+            selected.add(name)
+        else:
+            raise ValueError(f"неизвестная метрика или набор: {name} "
+                             f"(наборы: {', '.join(METRIC_SETS)})")
+    return tuple(name for name in ALL_METRICS if name in selected)
+
+
+class MetricPlan:
+    """
+    План подсчёта: выбранные метрики и все промежуточные данные, от которых
+    они зависят, — каждое ровно один раз и в порядке зависимостей.
+
+    Метрики, которые не нужны выбранным, не считаются вовсе: например,
+    без набора morph не загружаются словари pymorphy3 и не разбираются
+    части речи.
+
+    Args:
+        metrics (tuple): Названия метрик (None — все, см. ALL_METRICS)
+
+    Raises:
+        ValueError: Если метрика неизвестна или зависит от неизвестных данных
+    """
+
+    def __init__(self, metrics=None):
+        wanted = set(ALL_METRICS if metrics is None else metrics) | set(REQUIRED_METRICS)
+        unknown = wanted - set(ALL_METRICS)
+        if unknown:
+            raise ValueError(f"неизвестные метрики: {', '.join(sorted(unknown))}")
+        self.metrics = tuple(name for name in ALL_METRICS if name in wanted)
+        self.steps = []
+        planned = set()
+
+        def visit(name):
+            if name in planned:
+                return
+            metric = METRICS.get(name)
+            if metric is None:
+                raise ValueError(f"метрика зависит от неизвестных данных: {name}")
+            for source in metric.inputs:
+                if source not in SOURCES:
+                    visit(source)
+            planned.add(name)
+            self.steps.append(metric)
+
+        for name in METRICS:
+            if name in wanted:
+                visit(name)
+        self.sources = {source for metric in self.steps for source in metric.inputs if source in SOURCES}
+
+    @property
+    def uses_morphology(self):
+        """bool: Нужен ли разбор частей речи (pymorphy3)"""
+        return 'pos_cache' in self.sources
+
+    def covers(self, metrics):
+        """
+        Проверяет, что среди уже посчитанных метрик есть все метрики плана.
+
+        Args:
+            metrics (iterable): Метрики готового результата (None — все)
+
+        Returns:
+            bool: True, если пересчитывать не нужно
+        """
+        return metrics is None or set(self.metrics) <= set(metrics)
+
+    def select(self, result):
+        """
+        Оставляет в готовом результате только метрики плана
+        (остальные поля, например filename, сохраняются).
+
+        Args:
+            result (dict): Результат, посчитанный, возможно, с другим набором метрик
+
+        Returns:
+            dict: Тот же словарь, если лишних метрик нет, иначе новый
+        """
+        if len(self.metrics) == len(ALL_METRICS):
+            return result
+        return {key: value for key, value in result.items() if key not in METRICS or key in self.metrics}
+
+    def compute(self, profiler, **sources):
+        """
+        Считает метрики плана.
+
+        Соседние шаги одного этапа замеряются вместе, как один этап.
+
+        Args:
+            profiler (Profiler): Профилировщик для замеров этапов
+            **sources: Исходные данные из SOURCES (tokens, pos_cache)
+
+        Returns:
+            dict: {метрика: значение} в порядке реестра
+        """
+        values = dict(sources)
+        for stage, steps in itertools.groupby(self.steps, key=attrgetter('stage')):
+            with profiler.stage(stage):
+                for metric in steps:
+                    values[metric.name] = metric.compute(*[values[name] for name in metric.inputs])
+        return {name: values[name] for name in self.metrics}
+
+
+@functools.lru_cache(maxsize=None)
+def get_plan(metrics=None):
+    """
+    Возвращает план для набора метрик; план строится один раз на процесс.
+
+    Args:
+        metrics (tuple): Названия метрик (None — все)
+
+    Returns:
+        MetricPlan: План подсчёта
+    """
+    return MetricPlan(metrics)
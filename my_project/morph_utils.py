@@ -0,0 +1,268 @@
+import os
+import time
+import sqlite3
+from collections import OrderedDict
+
+# Файл дискового кэша частей речи (переживает перезапуски программы)
+POS_CACHE_PATH = 'my_project/cache/pos_tags.sqlite'
+
+# Версия правил get_pos_tag: при изменении правил кэш нужно сбросить
+POS_RULES_VERSION = 1
+
+# Сколько слов держать в памяти (LRU)
+POS_CACHE_MEMORY_SIZE = 200_000
+
+# SQLite не принимает слишком много параметров в одном запросе
+_SQL_BATCH = 500
+
+# Общий анализатор процесса: словари pymorphy3 загружаются один раз
+_shared_morph = None
+
+
+def create_morph_analyzer():
+    """
+    Создаёт морфологический анализатор pymorphy3 для русского языка.
+
+    Returns:
+        pymorphy3.MorphAnalyzer: Анализатор
+
+    Raises:
+        ImportError: Если pymorphy3 не установлен
+    """
+    import pymorphy3
+    try:
+        return pymorphy3.MorphAnalyzer(lang='ru')
+    except:
+        return pymorphy3.MorphAnalyzer()
+
+
+def get_morph_analyzer():
+    """
+    Возвращает общий для процесса анализатор pymorphy3, создавая его при первом вызове.
+
+    pymorphy3 импортируется только здесь, поэтому команды, которым не нужна
+    морфология, не тратят время на загрузку словарей.
+
+    Returns:
+        pymorphy3.MorphAnalyzer: Анализатор
+
+    Raises:
+        ImportError: Если pymorphy3 не установлен
+    """
+    global _shared_morph
+    if _shared_morph is None:
+        _shared_morph = create_morph_analyzer()
+    return _shared_morph
+
+
+def warm_up_morph():
+    """
+    Загружает словари pymorphy3 заранее и разбирает пробное слово, чтобы
+    первый файл не платил за загрузку. Процессы, запущенные после прогрева
+    через fork, получают уже загруженные словари.
+
+    Returns:
+        float: Время прогрева в секундах (0.0, если pymorphy3 не установлен)
+    """
+    start = time.perf_counter()
+    try:
+        get_morph_analyzer().parse('слово')
+    except ImportError:
+        return 0.0
+    return time.perf_counter() - start
+
+
+def get_pos_tag(word, morph):
+    """
+    Определяет часть речи для слова.
+
+    Args:
+        word (str): Слово в нижнем регистре
+        morph (pymorphy3.MorphAnalyzer): Анализатор
+
+    Returns:
+        str: 'NOUN', 'ADJ', 'VERB' или 'OTHER'
+    """
+    try:
+        if len(word) < 2:  # Слишком короткие слова пропускаем
+            return 'OTHER'
+
+        parsed = morph.parse(word)[0]
+        pos = parsed.tag.POS
+
+        # Существительные
+        if pos in ['NOUN', 'NPRO']:
+            return 'NOUN'
+        # Прилагательные
+        elif pos in ['ADJF', 'ADJS', 'COMP']:
+            return 'ADJ'
+        # Глаголы и их формы
+        elif pos in ['VERB', 'INFN', 'GRND', 'PRTF', 'PRTS']:
+            return 'VERB'
+        else:
+            return 'OTHER'
+    except:
+        return 'OTHER'
+
+
+def get_dictionary_version():
+    """
+    Возвращает строку версии словарей pymorphy3 и правил get_pos_tag.
+
+    Версия определяется по установленным пакетам, поэтому словари
+    для этого загружать не нужно.
+
+    Returns:
+        str: Версия, например 'rules 1; pymorphy3 2.0.6; pymorphy3-dicts-ru 2.4...'
+    """
+    from importlib import metadata
+    parts = [f'rules {POS_RULES_VERSION}']
+    for package in ('pymorphy3', 'pymorphy3-dicts-ru'):
+        try:
+            parts.append(f'{package} {metadata.version(package)}')
+        except metadata.PackageNotFoundError:
+            parts.append(f'{package} -')
+    return '; '.join(parts)
+
+
+class PosTagCache:
+    """
+    Двухуровневый кэш частей речи: LRU в памяти и SQLite на диске.
+
+    Анализатор pymorphy3 создаётся только при первом промахе, поэтому
+    повторный запуск по тем же словам вообще не загружает словари.
+    При смене версии словарей дисковый кэш очищается.
+
+    Args:
+        path (str): Путь к файлу SQLite (None — только кэш в памяти)
+        morph (pymorphy3.MorphAnalyzer): Готовый анализатор (иначе берётся общий
+                                         анализатор процесса при первом промахе)
+        maxsize (int): Сколько слов хранить в памяти
+    """
+
+    def __init__(self, path=POS_CACHE_PATH, morph=None, maxsize=POS_CACHE_MEMORY_SIZE):
+        self.path = path
+        self.morph = morph
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+        self._db_failed = path is None
+
+    def _connect(self):
+        """Открывает дисковый кэш; при ошибке продолжает работу только в памяти."""
+        if self._db is not None or self._db_failed:
+            return self._db
+        try:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS tags (word TEXT PRIMARY KEY, pos TEXT) WITHOUT ROWID")
+            version = get_dictionary_version()
+            row = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != version:
+                # Словари или правила изменились — старые теги недействительны
+                with db:
+                    db.execute("DELETE FROM tags")
+                    db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+            self._db = db
+        except (sqlite3.Error, OSError) as e:
+            print(f"  Дисковый кэш частей речи недоступен ({self.path}): {e}")
+            self._db_failed = True
+        return self._db
+
+    def _remember(self, word, pos):
+        """Кладёт слово в LRU, вытесняя самое давнее."""
+        self.memory[word] = pos
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def tag_many(self, words):
+        """
+        Определяет части речи для набора слов.
+
+        Args:
+            words (iterable): Слова в нижнем регистре (повторы допустимы)
+
+        Returns:
+            dict: Словарь {слово: часть речи} для всех различных слов
+        """
+        tags = {}
+        missing = []
+        for word in dict.fromkeys(words):
+            pos = self.memory.get(word)
+            if pos is None:
+                missing.append(word)
+            else:
+                self.memory.move_to_end(word)
+                self.memory_hits += 1
+                tags[word] = pos
+        if not missing:
+            return tags
+
+        db = self._connect()
+        if db is not None:
+            for start in range(0, len(missing), _SQL_BATCH):
+                batch = missing[start:start + _SQL_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = db.execute(f"SELECT word, pos FROM tags WHERE word IN ({placeholders})", batch)
+                for word, pos in rows:
+                    tags[word] = pos
+                    self._remember(word, pos)
+                    self.disk_hits += 1
+
+        parsed = []
+        for word in missing:
+            if word in tags:
+                continue
+            if self.morph is None:
+                self.morph = get_morph_analyzer()
+            pos = get_pos_tag(word, self.morph)
+            tags[word] = pos
+            self._remember(word, pos)
+            parsed.append((word, pos))
+        self.misses += len(parsed)
+
+        if parsed and db is not None:
+            try:
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO tags VALUES (?, ?)", parsed)
+            except sqlite3.Error as e:
+                # Например, база занята другим процессом слишком долго
+                print(f"  Не удалось сохранить кэш частей речи: {e}")
+        return tags
+
+    def stats(self):
+        """
+        Возвращает счётчики попаданий и промахов.
+
+        Returns:
+            dict: memory_hits, disk_hits, misses (вызовы pymorphy3)
+        """
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
+
+    def add_stats(self, stats):
+        """
+        Прибавляет счётчики другого кэша (например, из процесса-обработчика).
+
+        Args:
+            stats (dict): Результат stats() другого кэша
+        """
+        self.memory_hits += stats.get('memory_hits', 0)
+        self.disk_hits += stats.get('disk_hits', 0)
+        self.misses += stats.get('misses', 0)
+
+    def close(self):
+        """Закрывает соединение с дисковым кэшем."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,478 @@
+import os
+import math
+import heapq
+import tempfile
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+from file_utils import write_csv_file
+
+# Длины n-грамм, которые считаются для каждого текста
+NGRAM_SIZES = (2, 3)
+
+# Сколько n-грамм держать в памяти, прежде чем сбросить отсортированную серию на диск
+NGRAM_MEMORY_ITEMS = 1_000_000
+
+# Сколько n-грамм каждого списка сохранять для файла, автора и корпуса
+NGRAM_TOP = 20
+
+# Минимальная частота для списка устойчивых сочетаний: у единичных пар PMI случайно высок
+MIN_COLLOCATION_COUNT = 2
+
+# Колонки ngrams.csv
+NGRAM_HEADERS = ['level', 'name', 'n', 'list', 'ngram', 'count', 'pmi', 'llr']
+
+# Ключ результата анализа с частыми n-граммами и сочетаниями файла (готовые строки ngrams.csv)
+TOP_NGRAMS_KEY = 'top_ngrams'
+
+# Папка, где хранятся таблицы n-грамм проанализированных файлов (по файлу на текст)
+NGRAM_STORE_PATH = 'my_project/cache/ngrams'
+
+
+def ngram_key(n):
+    """Ключ таблицы частот n-грамм в результате анализа, например 'bigram_freq'."""
+    return {2: 'bigram_freq', 3: 'trigram_freq'}.get(n, f'{n}gram_freq')
+
+
+# Ключи таблиц частот n-грамм в результате анализа
+NGRAM_TABLE_KEYS = tuple(ngram_key(n) for n in NGRAM_SIZES)
+
+
+def pmi(count, words, word_counts, total):
+    """
+    Поточечная взаимная информация n-граммы (PMI):
+    log2(P(w1..wn) / (P(w1)·...·P(wn))), вероятности — по числу слов total.
+
+    Args:
+        count (int): Частота n-граммы
+        words (list): Слова n-граммы
+        word_counts (dict): Частоты слов
+        total (int): Число слов
+
+    Returns:
+        float: PMI в битах (None, если частота какого-то слова неизвестна)
+    """
+    score = math.log2(count) + (len(words) - 1) * math.log2(total)
+    for word in words:
+        word_count = word_counts.get(word, 0)
+        if word_count <= 0:
+            return None
+        score -= math.log2(word_count)
+    return score
+
+
+def log_likelihood(count, first, second, total):
+    """
+    Логарифмическое отношение правдоподобия (G², Dunning, 1993) для биграммы
+    по таблице сопряжённости 2×2.
+
+    Args:
+        count (int): Частота биграммы
+        first (int): Частота первого слова
+        second (int): Частота второго слова
+        total (int): Число слов
+
+    Returns:
+        float: G²; чем больше, тем менее случайно сочетание
+    """
+    cells = (count, first - count, second - count, total - first - second + count)
+    rows = (first, total - first)
+    columns = (second, total - second)
+    score = 0.0
+    for i, observed in enumerate(cells):
+        expected = rows[i // 2] * columns[i % 2] / total
+        if observed > 0 and expected > 0:
+            score += observed * math.log(observed / expected)
+    return 2 * score
+
+
+class _Top:
+    """Хранит size лучших элементов по оценке; при равной оценке — добавленные раньше."""
+
+    def __init__(self, size):
+        self.size = size
+        self.heap = []
+        self.added = 0
+
+    def accepts(self, score):
+        """Проверяет, попадёт ли в список элемент с такой оценкой."""
+        return len(self.heap) < self.size or score > self.heap[0][0]
+
+    def add(self, score, item):
+        self.added += 1
+        entry = (score, -self.added, item)
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self):
+        return [item for _, _, item in sorted(self.heap, reverse=True)]
+
+
+class NgramSummary:
+    """
+    Частые n-граммы и устойчивые сочетания одной области (файла, автора,
+    корпуса), которые копятся по мере поступления n-грамм.
+
+    Сочетания ранжируются по G² для биграмм и по PMI для триграмм
+    (для G² триграммы нужны частоты входящих в неё биграмм) и берутся
+    только с частотой от MIN_COLLOCATION_COUNT. При равной оценке в списке
+    остаётся n-грамма, пришедшая раньше.
+
+    Args:
+        word_counts (dict): Частоты слов той же области (без стоп-слов)
+        top (int): Сколько n-грамм в каждом списке
+    """
+
+    def __init__(self, word_counts, top=NGRAM_TOP):
+        self.word_counts = word_counts
+        self.total = sum(word_counts.values())
+        self.top = top
+        self.frequent = {}
+        self.collocations = {}
+
+    def add(self, gram, count):
+        """
+        Учитывает n-грамму.
+
+        Args:
+            gram (str): Слова n-граммы через пробел
+            count (int): Её частота в области
+        """
+        n = gram.count(' ') + 1
+        frequent = self.frequent.get(n)
+        if frequent is None:
+            frequent = self.frequent[n] = _Top(self.top)
+            self.collocations[n] = _Top(self.top)
+        if count < MIN_COLLOCATION_COUNT and len(frequent.heap) >= frequent.size and count <= frequent.heap[0][0]:
+            # Редкая n-грамма не попадёт ни в один список (самая частая проверка — без вызовов)
+            return
+        is_frequent = frequent.accepts(count)
+        if not is_frequent and count < MIN_COLLOCATION_COUNT:
+            # Оценки считаются только для n-грамм, которые могут попасть в списки
+            return
+        words = gram.split(' ')
+        total = self.total
+        score = pmi(count, words, self.word_counts, total) if total else None
+        llr = None
+        if n == 2 and score is not None:
+            llr = log_likelihood(count, self.word_counts[words[0]], self.word_counts[words[1]], total)
+        item = (gram, count, score, llr)
+        if is_frequent:
+            frequent.add(count, item)
+        if count >= MIN_COLLOCATION_COUNT and score is not None:
+            self.collocations[n].add(llr if llr is not None else score, item)
+
+    def result(self):
+        """
+        Returns:
+            dict: {n: {'frequent': [...], 'collocations': [...]}}, элементы списков —
+                  кортежи (n-грамма, частота, PMI, G² или None)
+        """
+        return {n: {'frequent': self.frequent[n].items(), 'collocations': self.collocations[n].items()}
+                for n in sorted(self.frequent)}
+
+
+def summarize_ngrams(items, word_counts, top=NGRAM_TOP):
+    """
+    Выбирает частые n-граммы и устойчивые сочетания за один проход (см. NgramSummary).
+
+    Args:
+        items (iterable): Пары (n-грамма, частота)
+        word_counts (dict): Частоты слов той же области (без стоп-слов)
+        top (int): Сколько n-грамм в каждом списке
+
+    Returns:
+        dict: {n: {'frequent': [...], 'collocations': [...]}}
+    """
+    summary = NgramSummary(word_counts, top)
+    for gram, count in items:
+        summary.add(gram, count)
+    return summary.result()
+
+
+def summary_rows(summary):
+    """
+    Строки сводки без уровня и имени области: [n, список, n-грамма, частота, PMI, G²].
+
+    Args:
+        summary (dict): Сводка summarize_ngrams
+
+    Returns:
+        list: Строки в порядке ngrams.csv (JSON-совместимые, для манифеста)
+    """
+    rows = []
+    for n, lists in summary.items():
+        for list_name in ('frequent', 'collocations'):
+            for gram, count, score, llr in lists[list_name]:
+                rows.append([n, list_name, gram, count,
+                             round(score, 4) if score is not None else '',
+                             round(llr, 4) if llr is not None else ''])
+    return rows
+
+
+def top_ngrams(word_freq, *tables, top=NGRAM_TOP):
+    """
+    Частые n-граммы и сочетания одного файла — строки для ngrams.csv.
+
+    Считаются сразу при анализе файла, поэтому сами таблицы n-грамм
+    в результате хранить не нужно.
+
+    Args:
+        word_freq (dict): Частоты слов файла
+        *tables (dict): Таблицы частот n-грамм файла
+        top (int): Сколько n-грамм в каждом списке
+
+    Returns:
+        list: Строки summary_rows
+    """
+    items = (item for table in tables for item in table.items())
+    return summary_rows(summarize_ngrams(items, word_freq, top))
+
+
+class NgramStore:
+    """
+    Таблицы n-грамм проанализированных файлов на диске: по файлу на текст,
+    имя — хэш содержимого текста (sha256 из манифеста).
+
+    Таблицы нужны только для сводок по авторам и корпусу, поэтому в результатах
+    и в манифесте они не хранятся; при повторном запуске таблицы неизменённых
+    файлов читаются отсюда, а не пересчитываются.
+
+    Args:
+        folder (str): Папка хранилища
+    """
+
+    def __init__(self, folder=NGRAM_STORE_PATH):
+        self.folder = folder
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + '.tsv')
+
+    def has(self, key):
+        """Проверяет, сохранены ли таблицы текста с хэшем key."""
+        return key is not None and os.path.exists(self._path(key))
+
+    def save(self, key, tables):
+        """
+        Сохраняет таблицы текста. Файл заменяется целиком.
+
+        Args:
+            key (str): Хэш содержимого текста
+            tables (iterable): Таблицы частот {n-грамма: частота}
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(key)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            for table in tables:
+                for gram, count in table.items():
+                    f.write(f'{gram}\t{count}\n')
+        os.replace(path + '.tmp', path)
+
+    def iter_items(self, key):
+        """
+        Читает таблицы текста.
+
+        Args:
+            key (str): Хэш содержимого текста (None — таблиц нет)
+
+        Yields:
+            tuple: (n-грамма, частота)
+        """
+        if key is None:
+            return
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                for line in f:
+                    gram, _, count = line.rstrip('\n').rpartition('\t')
+                    yield gram, int(count)
+        except FileNotFoundError:
+            return
+
+    def prune(self, keep):
+        """
+        Удаляет таблицы текстов, которых больше нет в манифесте.
+
+        Args:
+            keep (set): Хэши, таблицы которых нужно оставить
+        """
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.tsv') and name[:-len('.tsv')] not in keep:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+
+
+def result_ngrams(result):
+    """Пары (n-грамма, частота) из таблиц, которые лежат в самом результате (например, в частях map)."""
+    for key in NGRAM_TABLE_KEYS:
+        yield from result.get(key, {}).items()
+
+
+class NgramCounter:
+    """
+    Частоты n-грамм по областям (авторам) в ограниченной памяти.
+
+    Частоты копятся в словаре с ключами «n-грамма, область»; когда в нём
+    max_items ключей, он сортируется и сбрасывается на диск отдельной серией.
+    При чтении серии сливаются (heapq.merge), одинаковые ключи складываются.
+    Поэтому в памяти не больше max_items n-грамм, сколько бы их ни было
+    в корпусе. Ключи упорядочены сначала по n-грамме, так что за один проход
+    слияния видны частоты n-граммы во всех областях сразу — из них же
+    складывается частота по корпусу. Частоты отдельных слов по областям
+    хранятся в памяти: их число ограничено словарём корпуса.
+
+    Args:
+        max_items (int): Сколько n-грамм держать в памяти
+        folder (str): Папка для серий (None — системная временная папка)
+    """
+
+    def __init__(self, max_items=NGRAM_MEMORY_ITEMS, folder=None):
+        self.max_items = max(1, max_items)
+        self.folder = folder
+        self.counts = Counter()
+        self.word_counts = {}
+        self.runs = []
+
+    def add(self, scope, ngrams, word_counts):
+        """
+        Учитывает таблицы частот одного текста в области scope.
+
+        Args:
+            scope (str): Область (без табуляций и переводов строк)
+            ngrams (iterable): Пары (n-грамма, частота)
+            word_counts (dict): Частоты слов текста
+        """
+        self.word_counts.setdefault(scope, Counter()).update(word_counts)
+        suffix = '\t' + scope
+        counts = self.counts
+        for gram, count in ngrams:
+            counts[gram + suffix] += count
+            if len(counts) >= self.max_items:
+                self._spill()
+                counts = self.counts
+
+    def _spill(self):
+        """Сбрасывает накопленные частоты на диск отсортированной серией."""
+        fd, path = tempfile.mkstemp(prefix='ngrams-', suffix='.run', dir=self.folder)
+        self.runs.append(path)
+        with open(fd, 'w', encoding='utf-8') as f:
+            for key in sorted(self.counts):
+                f.write(f'{key}\t{self.counts[key]}\n')
+        self.counts = Counter()
+
+    @staticmethod
+    def _iter_run(path):
+        """Читает серию: пары (ключ, частота) по порядку ключей."""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                key, _, count = line.rstrip('\n').rpartition('\t')
+                yield key, int(count)
+
+    def iter_ngrams(self):
+        """
+        Перебирает n-граммы по алфавиту.
+
+        Yields:
+            tuple: (n-грамма, список пар (область, частота))
+        """
+        if self.runs:
+            if self.counts:
+                self._spill()
+            merged = heapq.merge(*(self._iter_run(path) for path in self.runs), key=itemgetter(0))
+            items = ((key, sum(count for _, count in group))
+                     for key, group in groupby(merged, key=itemgetter(0)))
+        else:
+            items = iter(sorted(self.counts.items()))
+        # Табуляция меньше любого символа n-граммы, поэтому порядок n-грамм
+        # тот же, что при сортировке их самих
+        split = ((key.rpartition('\t'), count) for key, count in items)
+        for gram, group in groupby(split, key=lambda item: item[0][0]):
+            yield gram, [(parts[2], count) for parts, count in group]
+
+    def close(self):
+        """Удаляет серии с диска."""
+        for path in self.runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.runs = []
+        self.counts = Counter()
+
+
+def _scope_name(value):
+    """Имя области без табуляций и переводов строк."""
+    return ' '.join(str(value).split())
+
+
+def write_ngrams(results, path, top=NGRAM_TOP, max_items=NGRAM_MEMORY_ITEMS, folder=None, tables=result_ngrams):
+    """
+    Считает частые n-граммы и сочетания по авторам и корпусу и записывает
+    их в CSV вместе со сводками файлов.
+
+    Сводки файлов берутся готовыми из результатов (TOP_NGRAMS_KEY). Таблицы
+    файлов складываются в NgramCounter, поэтому частоты по авторам и корпусу
+    занимают в памяти не больше max_items n-грамм; сводки всех областей
+    строятся за один проход слияния.
+
+    Args:
+        results (list): Результаты с метаданными и сводками n-грамм
+        path (str): Путь к ngrams.csv
+        top (int): Сколько n-грамм в каждом списке
+        max_items (int): Сколько n-грамм держать в памяти (см. NgramCounter)
+        folder (str): Папка для серий (None — системная временная папка)
+        tables (callable): Таблицы файла по результату — пары (n-грамма, частота),
+                           например из NgramStore (по умолчанию — из самого результата)
+
+    Returns:
+        dict: Сводки для отчета {'corpus': сводка, 'authors': {автор: сводка}}
+              (см. summarize_ngrams); None, если в результатах нет n-грамм
+    """
+    if not any(TOP_NGRAMS_KEY in result for result in results):
+        return None
+
+    counter = NgramCounter(max_items, folder)
+    authors = {}
+    try:
+        for result in results:
+            author = result.get('author', 'Неизвестно')
+            scope = _scope_name(author)
+            authors.setdefault(scope, author)
+            counter.add(scope, tables(result), result.get('word_freq', {}))
+
+        corpus_words = Counter()
+        for word_counts in counter.word_counts.values():
+            corpus_words.update(word_counts)
+        corpus = NgramSummary(corpus_words, top)
+        scopes = {scope: NgramSummary(counter.word_counts[scope], top) for scope in authors}
+        for gram, counts in counter.iter_ngrams():
+            corpus.add(gram, sum(count for _, count in counts))
+            for scope, count in counts:
+                scopes[scope].add(gram, count)
+    finally:
+        counter.close()
+    author_summaries = {scope: scopes[scope].result() for scope in authors}
+    summaries = {'corpus': corpus.result(),
+                 # Авторы — в порядке первого появления, как в остальном отчете; без n-грамм — не входят
+                 'authors': {author: author_summaries[scope] for scope, author in authors.items()
+                             if author_summaries[scope]}}
+
+    def iter_rows():
+        for result in results:
+            for row in result.get(TOP_NGRAMS_KEY, []):
+                yield ['file', result['filename'], *row]
+        for scope in sorted(authors):
+            for row in summary_rows(author_summaries[scope]):
+                yield ['author', authors[scope], *row]
+        for row in summary_rows(summaries['corpus']):
+            yield ['corpus', '', *row]
+
+    write_csv_file(path, iter_rows(), NGRAM_HEADERS)
+    return summaries
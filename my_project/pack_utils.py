@@ -0,0 +1,212 @@
+import os
+import json
+import mmap
+import codecs
+import struct
+import hashlib
+from file_utils import get_files_in_folder, iter_csv_rows
+
+# Пакет корпуса по умолчанию
+PACK_PATH = 'my_project/cache/corpus.pack'
+
+# Заголовок пакета: сигнатура, смещение и длина оглавления
+PACK_MAGIC = b'NKPACK\x00\x01'
+_HEADER = struct.Struct('<8sQQ')
+
+# Версия формата оглавления
+PACK_VERSION = 1
+
+
+def is_pack(path):
+    """
+    Проверяет, является ли путь пакетом корпуса (а не папкой).
+
+    Args:
+        path (str): Путь к папке или файлу
+
+    Returns:
+        bool: True, если это файл пакета
+    """
+    if not os.path.isfile(path):
+        return False
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(PACK_MAGIC)) == PACK_MAGIC
+    except OSError:
+        return False
+
+
+def build_pack(corpus_folder, pack_path=PACK_PATH, metadata_path=None, extension='.txt'):
+    """
+    Собирает тексты папки в один файл пакета.
+
+    Тексты записываются подряд как байты UTF-8, за ними — оглавление в JSON:
+    имя, смещение и длина каждого текста, время изменения и хэш исходного
+    файла (для манифеста), а также строки метаданных. Пакет пишется во
+    временный файл и заменяет старый целиком.
+
+    Args:
+        corpus_folder (str): Папка с текстами
+        pack_path (str): Путь к файлу пакета
+        metadata_path (str): CSV с метаданными для оглавления (None — без метаданных)
+        extension (str): Расширение файлов текстов
+
+    Returns:
+        int: Количество текстов в пакете
+    """
+    metadata = {}
+    if metadata_path is not None and os.path.exists(metadata_path):
+        metadata = {row.get('filename'): row for row in iter_csv_rows(metadata_path)}
+
+    folder = os.path.dirname(pack_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = pack_path + '.tmp'
+    files = []
+    with open(tmp_path, 'wb') as out:
+        out.write(_HEADER.pack(PACK_MAGIC, 0, 0))
+        for filename in get_files_in_folder(corpus_folder, extension):
+            filepath = os.path.join(corpus_folder, filename)
+            with open(filepath, 'rb') as f:
+                data = f.read()
+            files.append([filename, out.tell(), len(data), os.stat(filepath).st_mtime_ns,
+                          hashlib.sha256(data).hexdigest()])
+            out.write(data)
+        index = json.dumps({
+            'version': PACK_VERSION,
+            'files': files,
+            'metadata': {filename: metadata[filename] for filename, *_ in files if filename in metadata},
+        }, ensure_ascii=False).encode('utf-8')
+        index_offset = out.tell()
+        out.write(index)
+        out.seek(0)
+        out.write(_HEADER.pack(PACK_MAGIC, index_offset, len(index)))
+    os.replace(tmp_path, pack_path)
+    return len(files)
+
+
+class CorpusPack:
+    """
+    Чтение пакета корпуса через отображение файла в память (mmap).
+
+    Тексты не копируются при открытии: get_bytes() отдаёт срез отображения
+    без копирования, read_text() декодирует UTF-8 прямо из него.
+    Ошибки чтения возвращаются строкой, как в read_text_file.
+
+    Args:
+        path (str): Путь к файлу пакета
+
+    Raises:
+        ValueError: Если файл не является пакетом корпуса
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_offset, index_length = _HEADER.unpack_from(self._map)
+            if magic != PACK_MAGIC:
+                raise ValueError(f"Не пакет корпуса: {path}")
+            index = json.loads(self._map[index_offset:index_offset + index_length].decode('utf-8'))
+        except (ValueError, struct.error, OSError):
+            self._file.close()
+            raise
+        if index.get('version') != PACK_VERSION:
+            self.close()
+            raise ValueError(f"Неподдерживаемая версия пакета: {index.get('version')}")
+        self.names = [row[0] for row in index['files']]
+        self._entries = {name: (offset, length, mtime, sha256)
+                         for name, offset, length, mtime, sha256 in index['files']}
+        self.metadata = index.get('metadata', {})
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def size(self, name):
+        """Размер текста в байтах (None, если текста нет в пакете)."""
+        entry = self._entries.get(name)
+        return entry[1] if entry is not None else None
+
+    def entry(self, name):
+        """
+        Отпечаток исходного файла текста для манифеста.
+
+        Args:
+            name (str): Имя файла
+
+        Returns:
+            dict: size, mtime, sha256 (None, если текста нет в пакете)
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        _, length, mtime, sha256 = entry
+        return {'size': length, 'mtime': mtime, 'sha256': sha256}
+
+    def get_bytes(self, name):
+        """
+        Возвращает байты текста без копирования.
+
+        Пока срез не освобождён (memoryview.release), пакет нельзя закрыть.
+
+        Args:
+            name (str): Имя файла
+
+        Returns:
+            memoryview: Байты UTF-8 текста
+
+        Raises:
+            KeyError: Если текста нет в пакете
+        """
+        offset, length, _, _ = self._entries[name]
+        return memoryview(self._map)[offset:offset + length]
+
+    def read_text(self, name):
+        """
+        Читает текст из пакета.
+
+        Args:
+            name (str): Имя файла
+
+        Returns:
+            str: Текст или сообщение об ошибке
+        """
+        if name not in self._entries:
+            return "Ошибка: Файл не найден"
+        with self.get_bytes(name) as data:
+            return str(data, 'utf-8')
+
+    def iter_text_chunks(self, name, chunk_size=1 << 20):
+        """
+        Читает текст по частям (для очень больших текстов).
+
+        Args:
+            name (str): Имя файла
+            chunk_size (int): Размер части в байтах
+
+        Yields:
+            str: Очередная часть текста
+
+        Raises:
+            FileNotFoundError: Если текста нет в пакете
+        """
+        if name not in self._entries:
+            raise FileNotFoundError(name)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        with self.get_bytes(name) as data:
+            for start in range(0, len(data), chunk_size):
+                chunk = decoder.decode(data[start:start + chunk_size])
+                if chunk:
+                    yield chunk
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    def close(self):
+        """Закрывает отображение и файл пакета."""
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import heapq
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+# Границы корзин гистограммы времени обработки файла, в миллисекундах
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Сколько самых медленных файлов запоминать
+SLOWEST_FILES = 10
+
+# Сколько событий этапов хранить для трассировки (итоги считаются по всем)
+MAX_TRACE_EVENTS = 100_000
+
+# Файл трассировки по умолчанию
+PROFILE_PATH = 'my_project/cache/profile.json'
+
+# Пустой контекст для выключенного профилировщика
+_NO_STAGE = nullcontext()
+
+
+class Profiler:
+    """
+    Замеры этапов анализа: время этапов, счётчики (байты, слова, обращения
+    к pymorphy3), гистограмма времени обработки файлов и самые медленные файлы.
+
+    Выключенный профилировщик ничего не замеряет: stage() возвращает пустой
+    контекст, а count() и add_file() сразу выходят, поэтому его можно
+    передавать всегда.
+
+    Args:
+        enabled (bool): Включены ли замеры
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.slowest = []
+        self.events = []
+
+    def stage(self, name):
+        """
+        Замеряет время блока with как этапа name.
+
+        Args:
+            name (str): Название этапа, например 'read' или 'report'
+
+        Returns:
+            contextmanager: Контекст замера
+        """
+        if not self.enabled:
+            return _NO_STAGE
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add_stage(name, elapsed)
+            if len(self.events) < MAX_TRACE_EVENTS:
+                self.events.append((name, start - self.started, elapsed))
+
+    def add_stage(self, name, seconds, calls=1):
+        """Добавляет время этапа (например, замеренное в другом процессе)."""
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [seconds, calls]
+        else:
+            stage[0] += seconds
+            stage[1] += calls
+
+    def count(self, name, value=1):
+        """
+        Увеличивает счётчик.
+
+        Args:
+            name (str): Название счётчика, например 'bytes_read'
+            value (int): Приращение
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_file(self, filename, seconds):
+        """
+        Учитывает время обработки одного файла.
+
+        Args:
+            filename (str): Имя файла
+            seconds (float): Время обработки в секундах
+        """
+        if not self.enabled:
+            return
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+        self._keep_slowest(seconds, filename)
+
+    def _keep_slowest(self, seconds, filename):
+        """Оставляет в куче SLOWEST_FILES самых медленных файлов."""
+        item = (seconds, filename)
+        if len(self.slowest) < SLOWEST_FILES:
+            heapq.heappush(self.slowest, item)
+        elif item > self.slowest[0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def snapshot(self):
+        """
+        Возвращает накопленные замеры в виде, пригодном для пересылки между процессами.
+
+        Returns:
+            dict: Этапы, счётчики, гистограмма и медленные файлы
+        """
+        return {
+            'stages': self.stages,
+            'counters': self.counters,
+            'histogram': self.histogram,
+            'slowest': self.slowest,
+        }
+
+    def merge(self, snapshot):
+        """
+        Добавляет замеры другого профилировщика (например, из процесса-обработчика).
+
+        Args:
+            snapshot (dict): Результат snapshot()
+        """
+        if not self.enabled:
+            return
+        for name, (seconds, calls) in snapshot['stages'].items():
+            self.add_stage(name, seconds, calls)
+        for name, value in snapshot['counters'].items():
+            self.count(name, value)
+        for i, value in enumerate(snapshot['histogram']):
+            self.histogram[i] += value
+        for seconds, filename in snapshot['slowest']:
+            self._keep_slowest(seconds, filename)
+
+    def _histogram_labels(self):
+        """Подписи корзин гистограммы."""
+        labels = []
+        low = 0
+        for high in LATENCY_BUCKETS_MS:
+            labels.append(f'{low}-{high} мс')
+            low = high
+        labels.append(f'>{low} мс')
+        return labels
+
+    def to_dict(self):
+        """
+        Собирает трассировку в формате Chrome Trace (открывается в
+        chrome://tracing и Perfetto) с итогами в дополнительных полях.
+
+        Returns:
+            dict: Трассировка
+        """
+        pid = os.getpid()
+        return {
+            'traceEvents': [
+                {'name': name, 'ph': 'X', 'pid': pid, 'tid': 0,
+                 'ts': round(start * 1e6), 'dur': round(elapsed * 1e6)}
+                for name, start, elapsed in self.events
+            ],
+            'displayTimeUnit': 'ms',
+            'wall_seconds': round(time.perf_counter() - self.started, 6),
+            'stages': {name: {'seconds': round(seconds, 6), 'calls': calls}
+                       for name, (seconds, calls) in self.stages.items()},
+            'counters': self.counters,
+            'latency_histogram': dict(zip(self._histogram_labels(), self.histogram)),
+            'slowest_files': [{'filename': filename, 'seconds': round(seconds, 6)}
+                              for seconds, filename in sorted(self.slowest, reverse=True)],
+        }
+
+    def save(self, path=PROFILE_PATH):
+        """
+        Сохраняет трассировку в JSON.
+
+        Args:
+            path (str): Путь к файлу
+
+        Returns:
+            bool: True, если запись прошла успешно, иначе False
+        """
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+            return True
+        except Exception as e:
+            print(f"Ошибка при записи файла {path}: {e}")
+            return False
+
+    def print_summary(self):
+        """Выводит итоги замеров в консоль."""
+        if not self.enabled:
+            return
+        print("\n" + "=" * 60)
+        print("⏱  ПРОФИЛЬ ЗАПУСКА")
+        print("=" * 60)
+        print(f" Общее время: {time.perf_counter() - self.started:.3f} с")
+        print(" Этапы (в параллельном режиме время файлов суммируется по процессам):")
+        for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0]):
+            print(f"  {name:<20} {seconds:>10.3f} с  ({calls:,} раз)")
+        if self.counters:
+            print(" Счётчики:")
+            for name, value in self.counters.items():
+                print(f"  {name:<20} {value:>14,}")
+        if any(self.histogram):
+            print(" Время обработки файла:")
+            for label, value in zip(self._histogram_labels(), self.histogram):
+                if value:
+                    print(f"  {label:<14} {value:>10,}")
+        if self.slowest:
+            print(" Самые медленные файлы:")
+            for seconds, filename in sorted(self.slowest, reverse=True):
+                print(f"  {filename:<40} {seconds * 1000:>10.1f} мс")
@@ -0,0 +1,388 @@
+import os
+import json
+from html import escape
+from ngram_utils import TOP_NGRAMS_KEY
+from similarity_utils import MINHASH_KEY
+
+# Форматы отчета и расширения файлов
+REPORT_FORMATS = {'txt': 'report.txt', 'jsonl': 'report.jsonl', 'html': 'report.html'}
+
+# Подписи признаков группировки в отчете
+GROUP_TITLES = {'author': 'Авторы', 'year': 'Годы', 'decade': 'Десятилетия', 'genre': 'Жанры'}
+
+# Метрики в сводке по группам: подпись и формат значения
+GROUP_REPORT_METRICS = (
+    ('word_count', 'слов', '{:,.1f}'),
+    ('ttr', 'TTR', '{:.4f}'),
+    ('mattr', 'MATTR', '{:.4f}'),
+    ('lexical_density', 'лекс. плотность', '{:.2%}'),
+)
+
+# Колонки таблицы файлов в HTML: ключ результата, подпись, формат (None — строка)
+FILE_COLUMNS = (
+    ('filename', 'Файл', None),
+    ('title', 'Название', None),
+    ('author', 'Автор', None),
+    ('year', 'Год', None),
+    ('word_count', 'Слов', '{:,}'),
+    ('unique_words', 'Уникальных', '{:,}'),
+    ('ttr', 'TTR', '{:.4f}'),
+    ('mattr', 'MATTR', '{:.4f}'),
+    ('mtld', 'MTLD', '{:.2f}'),
+    ('hdd', 'HD-D', '{:.4f}'),
+    ('line_count', 'Строк', '{:,}'),
+    ('avg_word_length', 'Ср. длина слова', '{:.2f}'),
+    ('lexical_density', 'Лекс. плотность', '{:.2%}'),
+)
+
+
+def sorted_group_values(field, values):
+    """Значения группы в порядке отчета: годы по возрастанию (неизвестные в конце), остальные — как есть."""
+    names = list(values)
+    if field in ('year', 'decade'):
+        names.sort(key=lambda name: (not name[:4].isdigit(), name))
+    return names
+
+
+class ReportWriter:
+    """
+    Базовый класс формата отчета.
+
+    generate_report один раз проходит по разделам и результатам и вызывает
+    методы всех выбранных форматов, каждый пишет свою часть сразу в файл.
+    Порядок вызовов: header, overview, files_begin, file (для каждого
+    результата), files_end, groups (если есть), conclusions, footer.
+
+    Args:
+        f (file): Открытый на запись текстовый файл
+    """
+
+    def __init__(self, f):
+        self.f = f
+
+    def header(self, corpus_folder):
+        """Заголовок отчета."""
+
+    def overview(self, items):
+        """
+        Общая статистика.
+
+        Args:
+            items (list): Кортежи (ключ, подпись, значение, формат)
+        """
+
+    def files_begin(self, columns):
+        """
+        Начало раздела по файлам.
+
+        Args:
+            columns (list): Колонки FILE_COLUMNS, которые есть в результатах
+        """
+
+    def file(self, index, result):
+        """Результат одного файла (index — номер с 1)."""
+
+    def files_end(self):
+        """Конец раздела по файлам."""
+
+    def groups(self, groups):
+        """Сводки по группам (GroupStats)."""
+
+    def conclusions(self, highlights, blocks):
+        """
+        Выводы.
+
+        Args:
+            highlights (list): Словари {'label', 'filename', 'value', 'text'} — лучшие файлы
+            blocks (list): Словари {'title', 'text', 'items': [(имя, текст)]} — списки
+                           по корпусу и авторам
+        """
+
+    def footer(self):
+        """Конец отчета."""
+
+
+class TextReportWriter(ReportWriter):
+    """Текстовый отчет report.txt."""
+
+    def __init__(self, f):
+        super().__init__(f)
+        self._started = False
+
+    def _line(self, line):
+        # Строки разделяются переводом строки, после последней его нет
+        if self._started:
+            self.f.write('\n')
+        self._started = True
+        self.f.write(line)
+
+    def header(self, corpus_folder):
+        self._line("=" * 60)
+        self._line("📊 ОТЧЕТ ПО АНАЛИЗУ ТЕКСТОВОГО КОРПУСА")
+        self._line("=" * 60)
+        self._line(f"Папка корпуса: {corpus_folder}")
+        self._line(f"Дата анализа: {os.path.basename(corpus_folder)}")
+        self._line("")
+
+    def overview(self, items):
+        self._line("📈 ОБЩАЯ СТАТИСТИКА:")
+        self._line("-" * 40)
+        for key, label, value, number_format in items:
+            self._line(f"  {label}: {number_format.format(value)}")
+            if key == 'lexical_density':
+                self._line("")
+
+    def files_begin(self, columns):
+        self._line("")
+        self._line("📋 ДЕТАЛЬНАЯ СТАТИСТИКА ПО ФАЙЛАМ:")
+        self._line("=" * 60)
+
+    def file(self, index, result):
+        self._line(f"\n{index}. 📄 {result.get('filename', 'Неизвестно')}")
+        self._line("-" * 40)
+
+        if 'title' in result:
+            self._line(f"   Название: {result.get('title', 'Неизвестно')}")
+        if 'author' in result:
+            self._line(f"   Автор: {result.get('author', 'Неизвестно')}")
+        if 'year' in result:
+            self._line(f"   Год: {result.get('year', 'Неизвестно')}")
+
+        # Метрики, которых нет в выбранном наборе (--metrics), пропускаются
+        self._line(f"   Слов: {result.get('word_count', 0):,}")
+        if 'unique_words' in result:
+            self._line(f"   Уникальных слов: {result['unique_words']:,}")
+        if 'most_common' in result:
+            most_common = result['most_common']
+            if most_common:
+                words_str = ", ".join([f"{word} ({count})" for word, count in most_common])
+                self._line(f"   Самые частые слова: {words_str}")
+            else:
+                self._line("   Самые частые слова: не найдены")
+        if 'ttr' in result:
+            self._line(f"   TTR: {result['ttr']:.4f}")
+        diversity = ", ".join(f"{label}: {number_format.format(result[key])}"
+                              for key, label, number_format in (('mattr', 'MATTR', '{:.4f}'), ('mtld', 'MTLD', '{:.2f}'),
+                                                                ('hdd', 'HD-D', '{:.4f}'))
+                              if key in result)
+        if diversity:
+            self._line(f"   {diversity}")
+        if 'line_count' in result:
+            self._line(f"   Строк: {result['line_count']:,}")
+        if 'avg_word_length' in result:
+            self._line(f"   Ср. длина слова: {result['avg_word_length']:.2f}")
+
+        if 'lexical_density' in result:
+            self._line(f"   Лекс. плотность: {result.get('lexical_density', 0):.2%}")
+
+    def groups(self, groups):
+        self._line("\n" + "=" * 60)
+        self._line("📊 СВОДКА ПО ГРУППАМ (среднее ± ст. отклонение, мин.–макс.):")
+        self._line("=" * 60)
+        for field in groups.fields:
+            values = groups.groups[field]
+            if not values:
+                continue
+            self._line(f"\n{GROUP_TITLES.get(field, field)}:")
+            for name in sorted_group_values(field, values):
+                group = values[name]
+                parts = []
+                for metric, label, number_format in GROUP_REPORT_METRICS:
+                    stats = group.get(metric)
+                    if stats is None:
+                        continue
+                    parts.append(f"{label} {number_format.format(stats.mean)} ± {number_format.format(stats.std)} "
+                                 f"({number_format.format(stats.min)}–{number_format.format(stats.max)})")
+                self._line(f"  - {name} ({groups.count(field, name)} файлов): " + "; ".join(parts))
+
+    def conclusions(self, highlights, blocks):
+        self._line("\n" + "=" * 60)
+        self._line(" РЕЗУЛЬТАТЫ:")
+        self._line("=" * 60)
+        for item in highlights:
+            self._line(f"• {item['label']}: {item['filename']} ({item['text']})")
+        for block in blocks:
+            self._line(f"\n• {block['title']}: {block['text']}")
+            for name, text in block['items']:
+                self._line(f"  - {name}: {text}")
+
+    def footer(self):
+        self._line("\n" + "=" * 60)
+        self._line(" Анализ завершен успешно!")
+        self._line("=" * 60)
+
+
+class JsonLinesReportWriter(ReportWriter):
+    """
+    Отчет в JSON Lines (report.jsonl): по объекту на строку, поле type
+    задаёт вид записи (header, overview, file, group, highlight, list).
+    Таблицы частот и сводки n-грамм файлов не записываются.
+    """
+
+    def _record(self, record):
+        self.f.write(json.dumps(record, ensure_ascii=False))
+        self.f.write('\n')
+
+    def header(self, corpus_folder):
+        self._record({'type': 'header', 'corpus': corpus_folder})
+
+    def overview(self, items):
+        self._record({'type': 'overview', **{key: value for key, _, value, _ in items}})
+
+    def file(self, index, result):
+        self._record({'type': 'file', 'index': index,
+                      **{key: value for key, value in result.items()
+                         if not key.endswith('_freq') and key not in (TOP_NGRAMS_KEY, MINHASH_KEY)}})
+
+    def groups(self, groups):
+        for field, value, metric, count, mean, std, minimum, maximum in groups.iter_rows():
+            self._record({'type': 'group', 'group': field, 'value': value, 'metric': metric, 'count': count,
+                          'mean': mean, 'std': std, 'min': minimum, 'max': maximum})
+
+    def conclusions(self, highlights, blocks):
+        for item in highlights:
+            self._record({'type': 'highlight', **item})
+        for block in blocks:
+            self._record({'type': 'list', 'title': block['title'], 'text': block['text'],
+                          'items': [{'name': name, 'text': text} for name, text in block['items']]})
+
+
+# Сортировка таблиц HTML по щелчку на заголовке колонки
+_HTML_SORT_SCRIPT = """
+document.querySelectorAll('table.sortable th').forEach(function (th, column) {
+  th.addEventListener('click', function () {
+    var tbody = th.closest('table').tBodies[0];
+    var ascending = th.dataset.order !== 'asc';
+    th.closest('tr').querySelectorAll('th').forEach(function (other) { delete other.dataset.order; });
+    th.dataset.order = ascending ? 'asc' : 'desc';
+    var key = function (row) {
+      var cell = row.cells[column];
+      var value = cell.dataset.value !== undefined ? cell.dataset.value : cell.textContent;
+      var number = parseFloat(value);
+      return isNaN(number) ? value.toLowerCase() : number;
+    };
+    Array.from(tbody.rows).sort(function (a, b) {
+      var x = key(a), y = key(b);
+      return (x < y ? -1 : x > y ? 1 : 0) * (ascending ? 1 : -1);
+    }).forEach(function (row) { tbody.appendChild(row); });
+  });
+});
+"""
+
+_HTML_STYLE = """
+body { font-family: sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; margin: 1em 0; }
+th, td { border: 1px solid #ccc; padding: 0.3em 0.6em; text-align: left; }
+td.number { text-align: right; }
+table.sortable th { cursor: pointer; background: #f0f0f0; }
+table.sortable th[data-order=asc]::after { content: ' ▲'; }
+table.sortable th[data-order=desc]::after { content: ' ▼'; }
+"""
+
+
+class HtmlReportWriter(ReportWriter):
+    """Статическая страница report.html; таблицы сортируются щелчком по заголовку."""
+
+    def _write(self, *parts):
+        self.f.write(''.join(parts))
+
+    def _cell(self, value, number_format):
+        if number_format is None or not isinstance(value, (int, float)):
+            return f'<td>{escape(str(value))}</td>'
+        return f'<td class="number" data-value="{value}">{escape(number_format.format(value))}</td>'
+
+    def header(self, corpus_folder):
+        title = f'Отчет по анализу корпуса {corpus_folder}'
+        self._write('<!DOCTYPE html>\n<html lang="ru">\n<head>\n<meta charset="utf-8">\n',
+                    f'<title>{escape(title)}</title>\n<style>{_HTML_STYLE}</style>\n</head>\n<body>\n',
+                    f'<h1>Отчет по анализу текстового корпуса</h1>\n<p>Папка корпуса: {escape(corpus_folder)}</p>\n')
+
+    def overview(self, items):
+        self._write('<h2>Общая статистика</h2>\n<table>\n')
+        for _, label, value, number_format in items:
+            self._write(f'<tr><th>{escape(label)}</th>{self._cell(value, number_format)}</tr>\n')
+        self._write('</table>\n')
+
+    def files_begin(self, columns):
+        self.columns = columns
+        self._write('<h2>Файлы</h2>\n<table class="sortable">\n<thead><tr><th>№</th>',
+                    ''.join(f'<th>{escape(label)}</th>' for _, label, _ in columns),
+                    '<th>Самые частые слова</th></tr></thead>\n<tbody>\n')
+
+    def file(self, index, result):
+        most_common = ", ".join(f"{word} ({count})" for word, count in result.get('most_common', []))
+        self._write(f'<tr>{self._cell(index, "{}")}',
+                    ''.join(self._cell(result.get(key, ''), number_format) for key, _, number_format in self.columns),
+                    f'<td>{escape(most_common)}</td></tr>\n')
+
+    def files_end(self):
+        self._write('</tbody>\n</table>\n')
+
+    def groups(self, groups):
+        self._write('<h2>Сводка по группам</h2>\n<p>Среднее ± стандартное отклонение</p>\n')
+        for field in groups.fields:
+            values = groups.groups[field]
+            if not values:
+                continue
+            metrics = [(metric, label, number_format) for metric, label, number_format in GROUP_REPORT_METRICS
+                       if any(metric in group for group in values.values())]
+            self._write(f'<h3>{escape(GROUP_TITLES.get(field, field))}</h3>\n<table class="sortable">\n',
+                        '<thead><tr><th>Группа</th><th>Файлов</th>',
+                        ''.join(f'<th>{escape(label)}</th>' for _, label, _ in metrics),
+                        '</tr></thead>\n<tbody>\n')
+            for name in sorted_group_values(field, values):
+                group = values[name]
+                cells = []
+                for metric, _, number_format in metrics:
+                    stats = group.get(metric)
+                    if stats is None:
+                        cells.append('<td></td>')
+                    else:
+                        text = f'{number_format.format(stats.mean)} ± {number_format.format(stats.std)}'
+                        cells.append(f'<td class="number" data-value="{stats.mean}">{escape(text)}</td>')
+                self._write(f'<tr><td>{escape(name)}</td>{self._cell(groups.count(field, name), "{}")}',
+                            ''.join(cells), '</tr>\n')
+            self._write('</tbody>\n</table>\n')
+
+    def conclusions(self, highlights, blocks):
+        self._write('<h2>Результаты</h2>\n<ul>\n')
+        for item in highlights:
+            self._write(f'<li>{escape(item["label"])}: <b>{escape(item["filename"])}</b> ({escape(item["text"])})</li>\n')
+        self._write('</ul>\n')
+        for block in blocks:
+            self._write(f'<p><b>{escape(block["title"])}:</b> {escape(str(block["text"]))}</p>\n')
+            if block['items']:
+                self._write('<ul>\n', ''.join(f'<li>{escape(str(name))}: {escape(text)}</li>\n'
+                                              for name, text in block['items']), '</ul>\n')
+
+    def footer(self):
+        self._write(f'<script>{_HTML_SORT_SCRIPT}</script>\n</body>\n</html>\n')
+
+
+# Классы форматов отчета
+REPORT_WRITERS = {'txt': TextReportWriter, 'jsonl': JsonLinesReportWriter, 'html': HtmlReportWriter}
+
+
+def parse_report_formats(value):
+    """
+    Разбирает список форматов через запятую, например 'txt,html'.
+
+    Args:
+        value (str): Форматы через запятую
+
+    Returns:
+        tuple: Форматы без повторов в порядке перечисления
+
+    Raises:
+        ValueError: Если формат неизвестен
+    """
+    formats = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in REPORT_WRITERS:
+            raise ValueError(f"Неизвестный формат отчета: {name!r} (доступны: {', '.join(REPORT_WRITERS)})")
+        if name not in formats:
+            formats.append(name)
+    return tuple(formats)
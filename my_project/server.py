@@ -0,0 +1,549 @@
+"""
+Резидентный режим анализа корпуса.
+
+Держит анализатор pymorphy3 и результаты по файлам в памяти, раз в несколько
+секунд проверяет папку корпуса и анализирует заново только новые и изменённые
+файлы. Отвечает на запросы в JSON по HTTP или через Unix-сокет:
+
+    GET  /health          состояние сервиса
+    GET  /files           список файлов с основными метриками
+    GET  /files/<имя>     метрики одного файла
+    GET  /summary         сводка по корпусу
+    GET  /similar/<имя>   похожие тексты по косинусу TF-IDF (?k=число, по умолчанию 5)
+    POST /refresh         проверить папку сейчас, не дожидаясь опроса
+    POST /report          перезаписать statistics.csv, groups.csv, ngrams.csv, duplicates.csv и отчеты
+
+Пример:
+    python my_project/server.py --port 8765
+    curl http://127.0.0.1:8765/summary
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from urllib.parse import unquote, urlparse, parse_qs
+from socketserver import ThreadingMixIn, UnixStreamServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from file_utils import get_files_in_folder
+from text_utils import set_verbose
+from table_utils import ResultsTable
+from morph_utils import PosTagCache, POS_CACHE_PATH, warm_up_morph
+from ngram_utils import NGRAM_SIZES, NGRAM_STORE_PATH, NgramStore, ngram_key
+from report_utils import REPORT_FORMATS
+from similarity_utils import MINHASH_KEY, SIMILAR_TOP, TfidfIndex
+from metric_utils import get_plan
+from manifest_utils import MANIFEST_PATH, load_manifest, save_manifest, make_entry, find_unchanged
+import main
+
+# Как часто проверять папку корпуса, в секундах
+POLL_INTERVAL = 2.0
+
+# Адрес HTTP по умолчанию (только локальные подключения)
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Таблицы частот и подпись MinHash в результате файла: в ответ /files/<имя> не входят
+_FREQUENCY_KEYS = frozenset(['word_freq', MINHASH_KEY] + [ngram_key(n) for n in NGRAM_SIZES])
+
+# Метрики в списке файлов /files
+_LISTED_METRICS = ('author', 'title', 'word_count', 'unique_words', 'ttr', 'mattr', 'lexical_density')
+
+
+class CorpusService:
+    """
+    Результаты анализа корпуса, которые поддерживаются в актуальном состоянии.
+
+    Папку опрашивает один фоновый поток: он же владеет кэшем частей речи
+    (соединение SQLite нельзя делить между потоками). Обработчики запросов
+    читают готовое состояние под блокировкой; сводка считается один раз
+    после каждого изменения.
+
+    Args:
+        corpus_folder (str): Путь к папке с текстами
+        pos_cache_path (str): Файл дискового кэша частей речи (None — без диска)
+        metadata_path (str): Путь к CSV с метаданными
+        manifest_path (str): Манифест: с него начинается работа и в него
+                             сохраняются результаты после изменений
+        results_folder (str): Папка для statistics.csv и report.txt
+        stream_threshold (int): Порог потокового чтения (см. analyze_single_text)
+        report_formats (tuple): Форматы отчета для POST /report: 'txt', 'jsonl', 'html'
+        metrics (tuple): Какие метрики считать (см. metric_utils.parse_metrics; None — все)
+    """
+
+    def __init__(self, corpus_folder, pos_cache_path=POS_CACHE_PATH, metadata_path=main.METADATA_PATH,
+                 manifest_path=MANIFEST_PATH, results_folder=main.RESULTS_FOLDER,
+                 stream_threshold=main.STREAM_THRESHOLD, report_formats=('txt',), metrics=None):
+        self.corpus_folder = corpus_folder
+        self.pos_cache_path = pos_cache_path
+        self.metadata_path = metadata_path
+        self.manifest_path = manifest_path
+        self.results_folder = results_folder
+        self.stream_threshold = stream_threshold
+        self.report_formats = report_formats
+        self.plan = get_plan(metrics)
+        self.ngram_store = NgramStore(NGRAM_STORE_PATH)
+
+        self.lock = threading.Lock()
+        self._scanned = threading.Condition(self.lock)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        self.entries = {}
+        self.results = {}
+        # Файлы с ошибкой анализа: {путь: отпечаток с полем 'error'}; повторно
+        # анализируются, только когда изменятся
+        self.failed = {}
+        self.metadata = {}
+        # Отличается от любого времени изменения и от None (файла нет)
+        self._metadata_mtime = -1
+        self.corpus_freq = Counter()
+        self.author_freq = {}
+        self._summary = None
+        self._similarity = None
+        self.scans = 0
+        self.last_scan = None
+        self.last_changes = {'analyzed': 0, 'removed': 0}
+        self.started = time.time()
+
+    def _load_metadata(self):
+        """Перечитывает метаданные, если файл изменился. Возвращает True при изменении."""
+        try:
+            mtime = os.stat(self.metadata_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._metadata_mtime:
+            return False
+        self._metadata_mtime = mtime
+        metadata = main.load_metadata(self.metadata_path) if mtime is not None else {}
+        # Метаданные читаются сразу: запросы к ним идут из разных потоков
+        try:
+            self.metadata = {filename: metadata.get(filename) for filename in metadata}
+        finally:
+            main.close_metadata(metadata)
+        return True
+
+    def _count_words(self, result, sign):
+        """Добавляет (sign=1) или вычитает (sign=-1) частоты слов файла из частот корпуса и автора."""
+        author = result['author']
+        word_freq = result['word_freq']
+        tables = (self.corpus_freq, self.author_freq.setdefault(author, Counter()))
+        for table in tables:
+            if sign > 0:
+                table.update(word_freq)
+                continue
+            table.subtract(word_freq)
+            for word in word_freq:
+                if table[word] <= 0:
+                    del table[word]
+        if not self.author_freq[author]:
+            del self.author_freq[author]
+
+    def refresh(self, pos_cache):
+        """
+        Проверяет папку и анализирует новые и изменённые файлы.
+
+        Args:
+            pos_cache (PosTagCache): Кэш частей речи потока опроса
+
+        Returns:
+            dict: Сколько файлов проанализировано ('analyzed') и удалено ('removed')
+        """
+        metadata_changed = self._load_metadata()
+        try:
+            files = get_files_in_folder(self.corpus_folder, '.txt')
+        except OSError as e:
+            print(f" Папка корпуса недоступна: {e}")
+            files = []
+
+        # Анализ идёт без блокировки: запросы пока получают прежнее состояние
+        entries = {}
+        analyzed = {}
+        failed = {}
+        for filename in files:
+            filepath = os.path.join(self.corpus_folder, filename)
+            entry = find_unchanged(self.entries.get(filepath), filepath)
+            if entry is not None and main.needs_analysis(entry, self.plan, self.ngram_store):
+                # В манифесте результат с другим набором метрик: считаем заново
+                entry = None
+            if entry is None:
+                quarantined = find_unchanged(self.failed.get(filepath), filepath)
+                if quarantined is not None:
+                    failed[filepath] = quarantined
+                    continue
+                entry = make_entry(filepath)
+                if entry is None:
+                    continue
+                result, error = main.analyze_file_guarded(filepath, filename, pos_cache=pos_cache,
+                                                          stream_threshold=self.stream_threshold,
+                                                          metrics=self.plan.metrics)
+                if result is None:
+                    print(f" Ошибка в {filename}: {error}")
+                    entry['error'] = error
+                    failed[filepath] = entry
+                    continue
+                # Таблицы n-грамм — в хранилище, в памяти и манифесте только сводка файла
+                main.store_ngrams(result, entry, self.ngram_store)
+                entry['result'] = result
+                entry['metrics'] = list(self.plan.metrics)
+                analyzed[filename] = result
+            entries[filepath] = entry
+        removed = [filepath for filepath in self.entries if filepath not in entries]
+
+        with self.lock:
+            if metadata_changed:
+                # Авторы могли измениться: частоты по авторам собираются заново
+                self.corpus_freq = Counter()
+                self.author_freq = {}
+                for filepath, entry in entries.items():
+                    result = entry['result']
+                    main.apply_metadata(result, self.metadata.get(result['filename']))
+                    self._count_words(result, 1)
+            else:
+                for filepath in removed:
+                    self._count_words(self.entries[filepath]['result'], -1)
+                for filename, result in analyzed.items():
+                    old = self.results.get(filename)
+                    if old is not None:
+                        self._count_words(old, -1)
+                    main.apply_metadata(result, self.metadata.get(filename))
+                    self._count_words(result, 1)
+            self.entries = entries
+            self.failed = failed
+            self.results = {entry['result']['filename']: entry['result'] for entry in entries.values()}
+            if analyzed or removed or metadata_changed:
+                self._summary = None
+                self._similarity = None
+            self.scans += 1
+            self.last_scan = time.time()
+            self.last_changes = {'analyzed': len(analyzed), 'removed': len(removed)}
+            self._scanned.notify_all()
+
+        if analyzed or removed:
+            save_manifest(entries, self.manifest_path)
+        return self.last_changes
+
+    def watch(self, interval=POLL_INTERVAL):
+        """
+        Опрашивает папку, пока не вызван stop(). Выполняется в отдельном потоке.
+
+        Args:
+            interval (float): Пауза между проверками в секундах
+        """
+        pos_cache = PosTagCache(self.pos_cache_path)
+        try:
+            # Начинаем с результатов прошлого запуска, словари загружаем сразу
+            self.entries = {filepath: entry for filepath, entry in load_manifest(self.manifest_path).items()
+                            if entry.get('result') is not None}
+            if self.plan.uses_morphology:
+                warm_up_morph()
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                changes = self.refresh(pos_cache)
+                if any(changes.values()):
+                    print(f" Проанализировано: {changes['analyzed']}, удалено: {changes['removed']} "
+                          f"({time.perf_counter() - start:.2f} с)")
+                self._wake.wait(interval)
+                self._wake.clear()
+        finally:
+            pos_cache.close()
+
+    def request_refresh(self, timeout=60):
+        """
+        Просит поток опроса проверить папку сейчас и ждёт окончания проверки.
+
+        Args:
+            timeout (float): Сколько ждать в секундах
+
+        Returns:
+            bool: True, если проверка завершилась за отведённое время
+        """
+        with self.lock:
+            target = self.scans + 1
+            self._wake.set()
+            return self._scanned.wait_for(lambda: self.scans >= target, timeout)
+
+    def stop(self):
+        """Останавливает опрос папки."""
+        self._stop.set()
+        self._wake.set()
+
+    def health(self):
+        """Состояние сервиса."""
+        with self.lock:
+            return {
+                'status': 'ok' if self.scans else 'starting',
+                'corpus': self.corpus_folder,
+                'files': len(self.results),
+                'scans': self.scans,
+                'last_scan': self.last_scan,
+                'last_changes': self.last_changes,
+                'errors': {os.path.basename(filepath): entry['error'] for filepath, entry in self.failed.items()},
+                'uptime_seconds': round(time.time() - self.started, 1),
+            }
+
+    def list_files(self):
+        """Список файлов с основными метриками."""
+        with self.lock:
+            return [{'filename': filename, **{name: result.get(name) for name in _LISTED_METRICS}}
+                    for filename, result in self.results.items()]
+
+    def file_stats(self, filename):
+        """
+        Метрики одного файла.
+
+        Args:
+            filename (str): Имя файла
+
+        Returns:
+            dict: Результат анализа без таблиц частот (None, если файла нет)
+        """
+        with self.lock:
+            result = self.results.get(filename)
+            if result is None:
+                return None
+            return {key: value for key, value in result.items() if key not in _FREQUENCY_KEYS}
+
+    def summary(self):
+        """Сводка по корпусу; пересчитывается только после изменений."""
+        with self.lock:
+            if self._summary is None:
+                self._summary = self._build_summary()
+            return self._summary
+
+    def similar(self, filename, k=SIMILAR_TOP):
+        """
+        Тексты, ближайшие к данному по косинусу TF-IDF; индекс строится
+        один раз после каждого изменения.
+
+        Args:
+            filename (str): Имя файла
+            k (int): Сколько текстов вернуть
+
+        Returns:
+            list: [{'filename', 'cosine'}] (None, если файла нет)
+        """
+        with self.lock:
+            if filename not in self.results:
+                return None
+            if self._similarity is None:
+                self._similarity = TfidfIndex(list(self.results.values()))
+            return [{'filename': other, 'cosine': score} for other, score in self._similarity.similar(filename, k)]
+
+    def _build_summary(self):
+        """Считает сводку по текущим результатам (вызывается под блокировкой)."""
+        results = list(self.results.values())
+        if not results:
+            return {'files': 0}
+        table = ResultsTable.from_results(results)
+        author_counts = table.group_counts('author')
+        author_ttr = table.group_means('ttr', 'author')
+        biggest = table.argmax('word_count')
+        most_diverse = table.argmax('ttr')
+        vocabulary = main.count_vocabulary(results)
+        summary = {
+            'files': len(table),
+            'words': table.sum('word_count'),
+            'vocabulary': vocabulary['corpus'].count(),
+            'avg_ttr': table.mean('ttr'),
+            'avg_mattr': table.mean('mattr'),
+            'avg_mtld': table.mean('mtld'),
+            'avg_hdd': table.mean('hdd'),
+            'biggest_file': {'filename': table.value('filename', biggest),
+                             'word_count': table.value('word_count', biggest)},
+            'most_diverse_file': {'filename': table.value('filename', most_diverse),
+                                  'ttr': table.value('ttr', most_diverse)},
+            'authors': {author: {'files': count, 'avg_ttr': author_ttr[author],
+                                 'vocabulary': vocabulary['authors'][author].count(),
+                                 'top_words': self.author_freq.get(author, Counter()).most_common(5)}
+                        for author, count in author_counts.items()},
+            'top_words': self.corpus_freq.most_common(10),
+        }
+        # Метрик, которых нет в выбранном наборе (--metrics), в сводке нет
+        for name in ('ttr', 'mattr', 'mtld', 'hdd'):
+            if not table.has(name):
+                del summary['avg_' + name]
+        if not table.has('ttr'):
+            del summary['most_diverse_file']
+            for author_summary in summary['authors'].values():
+                del author_summary['avg_ttr']
+        if table.has('lexical_density'):
+            summary['avg_lexical_density'] = table.mean('lexical_density')
+        return summary
+
+    def write_report(self):
+        """
+        Перезаписывает statistics.csv, groups.csv, ngrams.csv, duplicates.csv и отчеты по текущим результатам.
+
+        Returns:
+            dict: Пути к файлам и число файлов в отчете
+        """
+        with self.lock:
+            results = list(self.results.values())
+            if results:
+                os.makedirs(self.results_folder, exist_ok=True)
+                hashes = {entry['result']['filename']: entry['sha256'] for entry in self.entries.values()}
+
+                def ngram_tables(result):
+                    return self.ngram_store.iter_items(hashes.get(result['filename']))
+
+                enriched_results, table, word_frequencies, groups, vocabulary = main.enrich_results(
+                    results, self.metadata)
+                main.save_results(enriched_results, self.corpus_folder, table, word_frequencies,
+                                  self.results_folder, groups=groups, report_formats=self.report_formats,
+                                  vocabulary=vocabulary, ngram_tables=ngram_tables)
+        return {
+            'files': len(results),
+            'statistics': os.path.join(self.results_folder, 'statistics.csv'),
+            'groups': os.path.join(self.results_folder, 'groups.csv'),
+            'ngrams': os.path.join(self.results_folder, 'ngrams.csv'),
+            'duplicates': os.path.join(self.results_folder, 'duplicates.csv'),
+            'reports': [os.path.join(self.results_folder, REPORT_FORMATS[name]) for name in self.report_formats],
+        }
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к CorpusService (атрибут service задаёт make_server)."""
+
+    service = None
+
+    def address_string(self):
+        # У Unix-сокета нет адреса клиента
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def _send(self, status, payload):
+        """Отправляет ответ в JSON."""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path(self):
+        return unquote(urlparse(self.path).path).rstrip('/') or '/'
+
+    def do_GET(self):
+        path = self._path()
+        if path == '/health':
+            self._send(200, self.service.health())
+        elif path == '/files':
+            self._send(200, self.service.list_files())
+        elif path.startswith('/files/'):
+            stats = self.service.file_stats(path[len('/files/'):])
+            if stats is None:
+                self._send(404, {'error': 'Файл не найден'})
+            else:
+                self._send(200, stats)
+        elif path == '/summary':
+            self._send(200, self.service.summary())
+        elif path.startswith('/similar/'):
+            try:
+                k = int(parse_qs(urlparse(self.path).query).get('k', [SIMILAR_TOP])[0])
+            except ValueError:
+                self._send(400, {'error': 'k должно быть числом'})
+                return
+            similar = self.service.similar(path[len('/similar/'):], k)
+            if similar is None:
+                self._send(404, {'error': 'Файл не найден'})
+            else:
+                self._send(200, similar)
+        else:
+            self._send(404, {'error': 'Неизвестный адрес'})
+
+    def do_POST(self):
+        path = self._path()
+        if path == '/refresh':
+            if self.service.request_refresh():
+                self._send(200, self.service.health())
+            else:
+                self._send(503, {'error': 'Проверка папки не завершилась вовремя'})
+        elif path == '/report':
+            self._send(200, self.service.write_report())
+        else:
+            self._send(404, {'error': 'Неизвестный адрес'})
+
+
+class _ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """HTTP-сервер на Unix-сокете, по потоку на подключение."""
+
+    daemon_threads = True
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """
+    Создаёт HTTP-сервер для сервиса.
+
+    Args:
+        service (CorpusService): Сервис
+        host (str): Адрес для TCP
+        port (int): Порт для TCP
+        socket_path (str): Путь к Unix-сокету (если задан, TCP не используется)
+
+    Returns:
+        socketserver.BaseServer: Сервер (запуск — serve_forever())
+    """
+    handler = type('RequestHandler', (_RequestHandler,), {'service': service})
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return _ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def parse_args(argv=None):
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Резидентный анализ корпуса с HTTP-запросами")
+    parser.add_argument('--corpus', default='my_project/corpus', help="папка с текстами")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"адрес (по умолчанию {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"порт (по умолчанию {DEFAULT_PORT})")
+    parser.add_argument('--socket', metavar='PATH', help="слушать Unix-сокет вместо TCP")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help=f"пауза между проверками папки в секундах (по умолчанию {POLL_INTERVAL:g})")
+    parser.add_argument('--no-pos-cache', action='store_true',
+                        help=f"не использовать дисковый кэш частей речи ({POS_CACHE_PATH})")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="выводить подробности анализа каждого файла")
+    parser.add_argument('--report-format', type=main._report_formats_arg, default=('txt',), metavar='FORMATS',
+                        help=f"форматы отчета для POST /report через запятую: {', '.join(REPORT_FORMATS)}")
+    parser.add_argument('--metrics', type=main._metrics_arg, default='default', metavar='SET',
+                        help="какие метрики считать, наборы или метрики через запятую (по умолчанию default — "
+                             "всё, кроме n-грамм; basic — быстрые метрики без морфологии)")
+    parser.add_argument('--ngrams', action='store_true', help="считать n-граммы для ngrams.csv (POST /report)")
+    return parser.parse_args(argv)
+
+
+def run_cli(argv=None):
+    """Запускает сервис и обслуживает запросы до Ctrl+C."""
+    args = parse_args(argv)
+    set_verbose(args.verbose)
+    if not os.path.isdir(args.corpus):
+        print(f" Папка '{args.corpus}' не найдена!")
+        return 1
+
+    service = CorpusService(args.corpus, pos_cache_path=None if args.no_pos_cache else POS_CACHE_PATH,
+                            report_formats=args.report_format, metrics=main.selected_metrics(args))
+    server = make_server(service, args.host, args.port, args.socket)
+    watcher = threading.Thread(target=service.watch, args=(args.interval,), daemon=True)
+    watcher.start()
+
+    address = args.socket or f"http://{args.host}:{args.port}"
+    print(f"🛰  Сервис анализа корпуса: {address} (папка {args.corpus}, опрос каждые {args.interval:g} с)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n Остановка...")
+    finally:
+        service.stop()
+        server.server_close()
+        watcher.join(timeout=10)
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
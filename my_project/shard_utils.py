@@ -0,0 +1,155 @@
+import os
+import gzip
+import json
+import zlib
+from manifest_utils import get_manifest_version
+
+# Папка для частичных результатов по умолчанию
+SHARD_FOLDER = 'my_project/cache/shards'
+
+
+def shard_of(filename, shard_count):
+    """
+    Номер части, к которой относится файл.
+
+    Используется CRC32 имени: на всех узлах файл попадает в одну и ту же
+    часть, независимо от порядка файлов в папке.
+
+    Args:
+        filename (str): Имя файла
+        shard_count (int): Количество частей
+
+    Returns:
+        int: Номер части от 0 до shard_count - 1
+    """
+    return zlib.crc32(filename.encode('utf-8')) % shard_count
+
+
+def parse_shard(spec):
+    """
+    Разбирает номер части вида 'K/N'.
+
+    Args:
+        spec (str): Номер части и количество частей, например '2/8'
+
+    Returns:
+        tuple: (номер части, количество частей)
+
+    Raises:
+        ValueError: Если строка записана неверно
+    """
+    try:
+        shard, shard_count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Часть задаётся как K/N, например 0/4: {spec!r}")
+    if shard_count < 1 or not 0 <= shard < shard_count:
+        raise ValueError(f"Номер части должен быть от 0 до N-1: {spec!r}")
+    return shard, shard_count
+
+
+def read_file_list(path):
+    """
+    Читает список имён файлов: по одному в строке, пустые строки и строки с # пропускаются.
+
+    Args:
+        path (str): Путь к списку
+
+    Returns:
+        list: Имена файлов
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def _open(path, mode, compressed):
+    """Открывает файл части, сжатый gzip или обычный."""
+    if compressed:
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def save_shard(path, corpus_folder, name, results):
+    """
+    Сохраняет частичный результат анализа.
+
+    Часть — это JSON (сжатый, если путь оканчивается на .gz): версия формата
+    результатов, исходный корпус и результаты analyze_single_text по файлам
+    вместе с частотами слов. У каждого результата есть поле 'order' — место
+    файла в списке всего корпуса, по нему reduce восстанавливает порядок.
+
+    Args:
+        path (str): Путь к файлу части
+        corpus_folder (str): Путь к корпусу (для отчета)
+        name (str): Описание части, например '2/8' или имя списка файлов
+        results (list): Результаты анализа с полем 'order'
+
+    Returns:
+        bool: True, если запись прошла успешно, иначе False
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = path + '.tmp'
+    try:
+        with _open(tmp_path, 'w', path.endswith('.gz')) as f:
+            json.dump({
+                'version': get_manifest_version(),
+                'corpus': corpus_folder,
+                'shard': name,
+                'results': results,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Ошибка при записи файла {path}: {e}")
+        return False
+
+
+def load_shard(path):
+    """
+    Загружает частичный результат.
+
+    Args:
+        path (str): Путь к файлу части
+
+    Returns:
+        dict: Содержимое части (version, corpus, shard, results)
+
+    Raises:
+        ValueError: Если часть записана другой версией программы или словарей
+    """
+    with _open(path, 'r', path.endswith('.gz')) as f:
+        shard = json.load(f)
+    if shard.get('version') != get_manifest_version():
+        raise ValueError(f"Часть {path} записана другой версией: {shard.get('version')!r}, "
+                         f"ожидается {get_manifest_version()!r}")
+    for result in shard['results']:
+        # JSON превращает кортежи в списки — возвращаем как было
+        result['most_common'] = [tuple(item) for item in result.get('most_common', [])]
+    return shard
+
+
+def merge_shards(shards):
+    """
+    Объединяет результаты частей в порядке файлов исходного корпуса.
+
+    Если файл встречается в нескольких частях, берётся первый.
+
+    Args:
+        shards (list): Загруженные части (см. load_shard)
+
+    Returns:
+        tuple: (список результатов без поля 'order', число повторов)
+    """
+    merged = {}
+    duplicates = 0
+    for shard in shards:
+        for result in shard['results']:
+            if result['filename'] in merged:
+                duplicates += 1
+                continue
+            merged[result['filename']] = result
+    results = sorted(merged.values(), key=lambda result: (result.get('order', 0), result['filename']))
+    for result in results:
+        result.pop('order', None)
+    return results, duplicates
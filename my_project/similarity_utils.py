@@ -0,0 +1,311 @@
+import math
+import heapq
+import random
+import hashlib
+import functools
+from collections import Counter
+from operator import itemgetter
+from itertools import chain, islice
+from file_utils import write_csv_file
+from table_utils import _load_numpy
+from text_utils import iter_ngram_batches
+
+# Сколько похожих текстов возвращать по умолчанию
+SIMILAR_TOP = 5
+
+# Число хэш-функций MinHash (длина подписи)
+MINHASH_PERMUTATIONS = 128
+
+# Сколько признаков хэшируется за раз: с NumPy это матрица MINHASH_PERMUTATIONS × MINHASH_CHUNK
+MINHASH_CHUNK = 1 << 12
+
+# Число полос LSH: подпись делится на полосы по MINHASH_PERMUTATIONS / LSH_BANDS значений
+LSH_BANDS = 32
+
+# Доля общих признаков (мера Жаккара), начиная с которой тексты считаются почти одинаковыми
+DUPLICATE_THRESHOLD = 0.8
+
+# Ключ подписи MinHash в результате анализа (и в манифесте)
+MINHASH_KEY = 'minhash'
+
+# Колонки duplicates.csv
+DUPLICATE_HEADERS = ['cluster', 'filename', 'size', 'nearest', 'jaccard']
+
+# Простое число для хэш-функций вида (a·x + b) mod p
+_PRIME = (1 << 31) - 1
+
+
+class TfidfIndex:
+    """
+    Разреженные векторы TF-IDF текстов и поиск похожих по косинусу.
+
+    Вес слова — (1 + log tf) · idf, idf = log((1 + N) / (1 + df)) + 1,
+    векторы нормированы. Для поиска хранится инвертированный индекс
+    {слово: [(номер текста, вес)]}: косинус считается только с текстами,
+    у которых есть общие с запросом слова.
+
+    Args:
+        results (list): Результаты анализа с word_freq
+    """
+
+    def __init__(self, results):
+        self.names = [result['filename'] for result in results]
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        document_frequency = Counter()
+        for result in results:
+            document_frequency.update(result.get('word_freq', {}).keys())
+        total = len(results)
+        idf = {word: math.log((1 + total) / (1 + count)) + 1 for word, count in document_frequency.items()}
+
+        self.vectors = []
+        self.postings = {}
+        for i, result in enumerate(results):
+            vector = {word: (1 + math.log(count)) * idf[word]
+                      for word, count in result.get('word_freq', {}).items() if count > 0}
+            norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+            if norm:
+                vector = {word: weight / norm for word, weight in vector.items()}
+            self.vectors.append(vector)
+            for word, weight in vector.items():
+                self.postings.setdefault(word, []).append((i, weight))
+
+    def similar(self, filename, k=SIMILAR_TOP):
+        """
+        Находит k текстов, ближайших к данному по косинусу векторов TF-IDF.
+
+        Args:
+            filename (str): Имя файла из индекса
+            k (int): Сколько текстов вернуть
+
+        Returns:
+            list: Пары (имя файла, косинус) по убыванию сходства
+
+        Raises:
+            KeyError: Если файла нет в индексе
+        """
+        position = self.positions[filename]
+        scores = Counter()
+        for word, weight in self.vectors[position].items():
+            for other, other_weight in self.postings[word]:
+                if other != position:
+                    scores[other] += weight * other_weight
+        return [(self.names[i], score) for i, score in heapq.nlargest(k, scores.items(), key=itemgetter(1))]
+
+
+class MinHasher:
+    """
+    Подписи MinHash: для каждой из num_perm хэш-функций — минимум по
+    признакам текста. Доля совпадающих позиций двух подписей оценивает
+    меру Жаккара их множеств признаков. Если установлен NumPy, все
+    хэш-функции считаются одной матричной операцией (результат тот же).
+
+    Args:
+        num_perm (int): Длина подписи
+        seed (int): Зерно для коэффициентов хэш-функций (одинаковое — сравнимые подписи)
+    """
+
+    def __init__(self, num_perm=MINHASH_PERMUTATIONS, seed=1):
+        rng = random.Random(seed)
+        self.coefficients = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self.np = _load_numpy()
+        if self.np is not None:
+            # a, b и хэши меньше 2**31, поэтому a·x + b помещается в uint64
+            self.a = self.np.array([a for a, _ in self.coefficients], dtype=self.np.uint64)[:, None]
+            self.b = self.np.array([b for _, b in self.coefficients], dtype=self.np.uint64)[:, None]
+
+    @staticmethod
+    def _base_hash(item):
+        """Хэш признака, одинаковый во всех процессах."""
+        return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big') % _PRIME
+
+    def signature(self, items):
+        """
+        Строит подпись множества.
+
+        Args:
+            items (iterable): Признаки текста
+
+        Returns:
+            tuple: Подпись из num_perm чисел (None для пустого множества)
+        """
+        return self.signature_batches([items])
+
+    def signature_batches(self, batches):
+        """
+        Строит подпись объединения порций признаков.
+
+        Минимум по объединению — минимум из минимумов порций, поэтому
+        в памяти нужна только текущая порция, а признак, попавший в
+        несколько порций, подпись не меняет. Порция хэшируется частями
+        по MINHASH_CHUNK признаков.
+
+        Args:
+            batches (iterable): Порции признаков (множества строк)
+
+        Returns:
+            tuple: Подпись из num_perm чисел (None, если признаков нет)
+        """
+        minimums = None
+        for batch in batches:
+            batch = iter(batch)
+            while True:
+                hashes = [self._base_hash(item) for item in islice(batch, MINHASH_CHUNK)]
+                if not hashes:
+                    break
+                if self.np is not None:
+                    # Одна матрица на часть: сложение и остаток — на месте
+                    values = self.a * self.np.array(hashes, dtype=self.np.uint64)
+                    values += self.b
+                    values %= self.np.uint64(_PRIME)
+                    values = values.min(axis=1)
+                    minimums = values if minimums is None else self.np.minimum(minimums, values)
+                else:
+                    values = [min((a * x + b) % _PRIME for x in hashes) for a, b in self.coefficients]
+                    minimums = values if minimums is None else list(map(min, minimums, values))
+        if minimums is None:
+            return None
+        return tuple(minimums.tolist() if self.np is not None else minimums)
+
+
+@functools.lru_cache(maxsize=None)
+def get_minhasher(num_perm=MINHASH_PERMUTATIONS):
+    """
+    Возвращает MinHasher процесса; коэффициенты считаются один раз.
+
+    Args:
+        num_perm (int): Длина подписи
+
+    Returns:
+        MinHasher: Хэшер с зерном по умолчанию (подписи всех процессов сравнимы)
+    """
+    return MinHasher(num_perm)
+
+
+def minhash_signature(tokens, word_freq):
+    """
+    Подпись MinHash признаков текста: слов и биграмм без стоп-слов.
+
+    Считается при анализе файла и хранится в результате, поэтому при поиске
+    почти одинаковых текстов файлы заново не хэшируются. Биграммы берутся
+    порциями из iter_ngram_batches, а их таблица частот не строится: для
+    потокового разбора память не зависит от размера файла.
+
+    Args:
+        tokens (TokenizedText | EncodedText | StreamingTextStats): Разобранный текст
+        word_freq (dict): Частоты слов
+
+    Returns:
+        tuple: Подпись из MINHASH_PERMUTATIONS чисел (None для текста без признаков)
+    """
+    return get_minhasher().signature_batches(chain([word_freq.keys()], iter_ngram_batches(tokens, 2)))
+
+
+def signature_similarity(first, second):
+    """Оценка меры Жаккара по двум подписям: доля совпадающих позиций."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def lsh_candidates(signatures, bands=LSH_BANDS):
+    """
+    Пары текстов-кандидатов по схеме LSH с полосами.
+
+    Подпись делится на bands полос; тексты, у которых совпала хотя бы одна
+    полоса целиком, становятся кандидатами. Сравниваются только тексты
+    из одной корзины, а не все пары.
+
+    Args:
+        signatures (list): Подписи MinHash (None — текст без признаков)
+        bands (int): Число полос
+
+    Returns:
+        set: Пары номеров текстов (i, j), i < j
+    """
+    pairs = set()
+    size = next((len(signature) for signature in signatures if signature is not None), 0)
+    rows = max(1, size // bands)
+    for band in range(0, size, rows):
+        buckets = {}
+        for i, signature in enumerate(signatures):
+            if signature is not None:
+                # Подпись из манифеста — список, ключом корзины служит кортеж
+                buckets.setdefault(tuple(signature[band:band + rows]), []).append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def find_duplicates(results, threshold=DUPLICATE_THRESHOLD, bands=LSH_BANDS):
+    """
+    Находит группы почти одинаковых текстов.
+
+    Кандидаты отбираются по подписям MinHash из результатов (MINHASH_KEY)
+    и LSH, затем для каждой пары мера Жаккара оценивается по подписям
+    (см. signature_similarity). Пары не ниже порога объединяются в группы
+    (система непересекающихся множеств).
+
+    Args:
+        results (list): Результаты анализа
+        threshold (float): Порог меры Жаккара
+        bands (int): Число полос LSH
+
+    Returns:
+        list: Группы в порядке файлов корпуса; группа — список кортежей
+              (номер результата, ближайший файл группы, мера Жаккара с ним)
+    """
+    signatures = [result.get(MINHASH_KEY) for result in results]
+
+    parent = list(range(len(results)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    nearest = {}
+    for i, j in sorted(lsh_candidates(signatures, bands)):
+        score = signature_similarity(signatures[i], signatures[j])
+        if score < threshold:
+            continue
+        for one, other in ((i, j), (j, i)):
+            if one not in nearest or score > nearest[one][1]:
+                nearest[one] = (other, score)
+        parent[find(j)] = find(i)
+
+    clusters = {}
+    for i in sorted(nearest):
+        clusters.setdefault(find(i), []).append(i)
+    return [[(i, results[nearest[i][0]]['filename'], nearest[i][1]) for i in members]
+            for members in sorted(clusters.values())]
+
+
+def write_duplicates(results, path, threshold=DUPLICATE_THRESHOLD):
+    """
+    Находит почти одинаковые тексты, отмечает их в результатах и записывает группы в CSV.
+
+    В каждый результат записывается поле duplicate_cluster: номер группы
+    (с 1) или пустая строка, если похожих текстов нет.
+
+    Args:
+        results (list): Результаты анализа (дополняются на месте)
+        path (str): Путь к duplicates.csv
+        threshold (float): Порог меры Жаккара
+
+    Returns:
+        list: Группы — списки имён файлов (None, если подписи MinHash не считались
+              и файл не записан)
+    """
+    if not any(MINHASH_KEY in result for result in results):
+        return None
+    clusters = find_duplicates(results, threshold)
+    for result in results:
+        result['duplicate_cluster'] = ''
+    rows = []
+    for number, members in enumerate(clusters, 1):
+        for i, nearest, score in members:
+            results[i]['duplicate_cluster'] = number
+            rows.append([number, results[i]['filename'], len(members), nearest, round(score, 4)])
+    write_csv_file(path, rows, DUPLICATE_HEADERS)
+    return [[results[i]['filename'] for i, _, _ in members] for members in clusters]
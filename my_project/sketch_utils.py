@@ -0,0 +1,266 @@
+import math
+import heapq
+import hashlib
+from collections import Counter
+from operator import itemgetter
+
+# Поправочный коэффициент HyperLogLog для 16, 32 и 64 регистров (Flajolet и др., 2007);
+# от 128 регистров — 0.7213 / (1 + 1.079 / m)
+_HLL_ALPHA = {16: 0.673, 32: 0.697, 64: 0.709}
+
+
+class SpaceSaving:
+    """
+    Приближённый подсчёт самых частых элементов в памяти фиксированного размера
+    (алгоритм Space-Saving, Metwally и др., 2005).
+
+    Хранится не больше capacity элементов. Новый элемент вытесняет самый
+    редкий и наследует его счётчик, поэтому счётчики могут быть завышены,
+    но не больше чем на сохранённую ошибку. Любой элемент с частотой выше
+    N / capacity гарантированно остаётся в таблице.
+
+    Args:
+        capacity (int): Сколько элементов хранить
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity должен быть положительным")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+    def add(self, item, count=1):
+        """
+        Учитывает count вхождений элемента.
+
+        Args:
+            item (str): Элемент
+            count (int): Число вхождений
+        """
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            # Ищем самый редкий элемент; устаревшие записи кучи пропускаем
+            while True:
+                smallest, victim = heapq.heappop(self._heap)
+                if counts.get(victim) == smallest:
+                    break
+            del counts[victim]
+            del self.errors[victim]
+            counts[item] = smallest + count
+            self.errors[item] = smallest
+        heapq.heappush(self._heap, (counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        """Убирает устаревшие записи из кучи."""
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def update(self, counts):
+        """
+        Учитывает таблицу частот.
+
+        Args:
+            counts (dict): Словарь {элемент: число вхождений}
+        """
+        for item, count in counts.items():
+            self.add(item, count)
+
+    def _floor(self):
+        """
+        Наибольшая возможная частота элемента, которого нет в таблице.
+
+        Пока таблица не заполнена, вытеснений не было и отсутствующий
+        элемент не встречался; после заполнения он мог встретиться
+        столько раз, сколько у самого редкого сохранённого элемента.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other):
+        """
+        Объединяет с другой таблицей (например, из другого процесса или узла).
+
+        Счётчики и ошибки складываются. Элементу, которого нет в одной из
+        таблиц, от неё добавляется её наименьший счётчик (см. _floor) и к
+        ошибке, и к счётчику: как и в add, счётчик остаётся верхней
+        оценкой частоты, а счётчик минус ошибка — нижней. Затем остаются
+        capacity самых частых.
+
+        Args:
+            other (SpaceSaving): Другая таблица
+        """
+        own_floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        # Порядок — как при подсчёте: при равных счётчиках остаётся элемент, встреченный раньше
+        for item in list(self.counts) + [item for item in other.counts if item not in self.counts]:
+            counts[item] = self.counts.get(item, own_floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, own_floor) + other.errors.get(item, other_floor)
+        self.counts = dict(heapq.nlargest(self.capacity, counts.items(), key=itemgetter(1)))
+        self.errors = {item: errors[item] for item in self.counts}
+        self._rebuild_heap()
+
+    def most_common(self, n=None):
+        """
+        Возвращает самые частые элементы (как Counter.most_common).
+
+        Args:
+            n (int): Сколько элементов вернуть (None — все)
+
+        Returns:
+            list of tuples: Список (элемент, оценка частоты) по убыванию частоты
+        """
+        if n is None:
+            return sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
+
+
+def new_frequency_table(capacity=None):
+    """
+    Создаёт таблицу частот, которую можно пополнять через update().
+
+    Args:
+        capacity (int): Размер приближённой таблицы (None или 0 — точный подсчёт)
+
+    Returns:
+        Counter | SpaceSaving: Пустая таблица
+    """
+    if capacity:
+        return SpaceSaving(capacity)
+    return Counter()
+
+
+class DistinctSet:
+    """
+    Точный подсчёт различных элементов: множество строк.
+
+    Интерфейс тот же, что у HyperLogLog, поэтому код подсчёта не зависит
+    от выбранного режима.
+    """
+
+    # Точный подсчёт без ошибки
+    relative_error = 0.0
+
+    def __init__(self):
+        self.items = set()
+
+    def add(self, item):
+        """Учитывает элемент."""
+        self.items.add(item)
+
+    def update(self, items):
+        """Учитывает элементы последовательности или ключи словаря."""
+        self.items.update(items)
+
+    def merge(self, other):
+        """
+        Объединяет с другим множеством.
+
+        Args:
+            other (DistinctSet): Другое множество
+        """
+        self.items |= other.items
+
+    def count(self):
+        """int: Число различных элементов"""
+        return len(self.items)
+
+
+class HyperLogLog:
+    """
+    Приближённый подсчёт различных элементов в памяти фиксированного размера
+    (HyperLogLog, Flajolet и др., 2007).
+
+    Элемент хэшируется в 64 бита: первые precision бит выбирают регистр,
+    в регистре хранится наибольшая позиция первой единицы в остальных битах.
+    Память — 2 ** precision байт при любом числе элементов, относительная
+    ошибка около 1.04 / sqrt(2 ** precision) (0.8% при precision=14).
+    Хэш не зависит от процесса, поэтому сводки разных процессов и узлов
+    можно объединять (merge) — это поразрядный максимум регистров.
+
+    Args:
+        precision (int): Число бит номера регистра, от 4 до 18
+    """
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision должен быть от 4 до 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def relative_error(self):
+        """float: Стандартная относительная ошибка оценки"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, item):
+        """
+        Учитывает элемент.
+
+        Args:
+            item (str): Элемент
+        """
+        value = int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+        bits = 64 - self.precision
+        index = value >> bits
+        rank = bits - (value & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items):
+        """Учитывает элементы последовательности или ключи словаря."""
+        for item in items:
+            self.add(item)
+
+    def merge(self, other):
+        """
+        Объединяет со сводкой другого процесса или узла.
+
+        Args:
+            other (HyperLogLog): Сводка с той же точностью
+
+        Raises:
+            ValueError: Если точность сводок различается
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Нельзя объединить сводки с точностью {self.precision} и {other.precision}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        """
+        Оценивает число различных элементов.
+
+        Returns:
+            int: Оценка (для малых чисел — по доле пустых регистров)
+        """
+        size = len(self.registers)
+        alpha = _HLL_ALPHA.get(size, 0.7213 / (1 + 1.079 / size))
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+
+def new_distinct_counter(precision=None):
+    """
+    Создаёт счётчик различных элементов.
+
+    Args:
+        precision (int): Точность HyperLogLog (None или 0 — точный подсчёт)
+
+    Returns:
+        DistinctSet | HyperLogLog: Пустой счётчик
+    """
+    if precision:
+        return HyperLogLog(precision)
+    return DistinctSet()
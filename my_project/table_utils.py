@@ -0,0 +1,241 @@
+from array import array
+
+# NumPy импортируется при создании первой таблицы, чтобы команды без таблицы
+# (index, query) запускались быстрее. None — NumPy не установлен
+np = None
+_numpy_loaded = False
+
+# Числовые метрики таблицы результатов и их типы
+NUMERIC_COLUMNS = {
+    'word_count': 'i8',
+    'unique_words': 'i8',
+    'ttr': 'f8',
+    'mattr': 'f8',
+    'mtld': 'f8',
+    'hdd': 'f8',
+    'line_count': 'i8',
+    'avg_word_length': 'f8',
+    'lexical_density': 'f8',
+    'noun_density': 'f8',
+    'adj_density': 'f8',
+    'verb_density': 'f8',
+}
+
+# Строковые колонки хранятся словарным кодированием: номер значения в списке
+STRING_COLUMNS = ('filename', 'title', 'author', 'year', 'genre')
+
+# Типы array.array, если NumPy не установлен
+_ARRAY_TYPECODES = {'i8': 'q', 'f8': 'd', 'i4': 'l'}
+
+# Сколько строк копить в буфере перед переносом в массив NumPy
+_FLUSH_ROWS = 65536
+
+
+def _load_numpy():
+    """Импортирует NumPy при первом вызове."""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+        _numpy_loaded = True
+    return np
+
+
+class ResultsTable:
+    """
+    Колоночная таблица результатов анализа.
+
+    Метрики лежат в структурированном массиве NumPy (по колонке на метрику),
+    строки вроде автора или года закодированы номерами в словаре значений.
+    Итоги, поиск максимума и группировка по автору считаются векторно,
+    без проходов интерпретатора по списку словарей. Новые строки копятся
+    по колонкам в array.array и переносятся в массив NumPy блоками.
+    Без NumPy таблица работает на array.array с теми же методами.
+
+    Args:
+        capacity (int): Ожидаемое число строк (таблица растёт сама)
+    """
+
+    def __init__(self, capacity=1024):
+        _load_numpy()
+        self.size = 0
+        self.present = set()
+        self.dictionaries = {name: [] for name in STRING_COLUMNS}
+        self._codes = {name: {} for name in STRING_COLUMNS}
+        self._dtype = list(NUMERIC_COLUMNS.items()) + [(name, 'i4') for name in STRING_COLUMNS]
+        self._buffers = self._new_buffers()
+        self._data = np.zeros(max(capacity, 1), dtype=self._dtype) if np is not None else None
+        self._stored = 0
+
+    def _new_buffers(self):
+        """Создаёт пустые буферы колонок."""
+        return {name: array(_ARRAY_TYPECODES[kind]) for name, kind in self._dtype}
+
+    def _flush(self):
+        """Переносит накопленные строки из буферов в массив NumPy."""
+        count = self.size - self._stored
+        if np is None or not count:
+            return
+        if self.size > len(self._data):
+            # Удваиваем ёмкость: добавление строки в среднем O(1)
+            self._data = np.resize(self._data, max(self.size, 2 * len(self._data)))
+        block = self._data[self._stored:self.size]
+        for name, buffer in self._buffers.items():
+            block[name] = np.frombuffer(buffer, dtype=buffer.typecode)
+        self._buffers = self._new_buffers()
+        self._stored = self.size
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Строит таблицу из списка словарей с результатами.
+
+        Args:
+            results (list): Список словарей с результатами
+
+        Returns:
+            ResultsTable: Заполненная таблица
+        """
+        table = cls(capacity=len(results))
+        for result in results:
+            table.append(result)
+        return table
+
+    def __len__(self):
+        return self.size
+
+    def _encode(self, name, value):
+        """Возвращает номер строкового значения в словаре колонки."""
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.dictionaries[name])
+            self.dictionaries[name].append(value)
+        return code
+
+    def append(self, result):
+        """
+        Добавляет строку; отсутствующие метрики записываются как 0.
+
+        Args:
+            result (dict): Результат анализа одного файла
+        """
+        if len(self.present) < len(NUMERIC_COLUMNS):
+            self.present.update(name for name in NUMERIC_COLUMNS if name in result)
+        get = result.get
+        buffers = self._buffers
+        for name in NUMERIC_COLUMNS:
+            buffers[name].append(get(name, 0))
+        for name in STRING_COLUMNS:
+            buffers[name].append(self._encode(name, str(get(name, 'Неизвестно'))))
+        self.size += 1
+        if np is not None and self.size - self._stored >= _FLUSH_ROWS:
+            self._flush()
+
+    def has(self, name):
+        """Проверяет, была ли метрика хотя бы в одной строке."""
+        return name in self.present
+
+    def column(self, name):
+        """
+        Возвращает колонку метрики (для строковых колонок — коды значений).
+
+        Args:
+            name (str): Название колонки
+
+        Returns:
+            numpy.ndarray | array.array: Значения заполненных строк
+        """
+        if np is not None:
+            self._flush()
+            return self._data[name][:self.size]
+        return self._buffers[name]
+
+    def value(self, name, index):
+        """
+        Возвращает значение ячейки (строки — раскодированными).
+
+        Args:
+            name (str): Название колонки
+            index (int): Номер строки
+
+        Returns:
+            int | float | str: Значение
+        """
+        value = self.column(name)[index]
+        if name in self.dictionaries:
+            return self.dictionaries[name][value]
+        return value.item() if np is not None else value
+
+    def sum(self, name):
+        """Сумма колонки."""
+        if np is not None:
+            return self.column(name).sum().item()
+        return sum(self.column(name))
+
+    def mean(self, name):
+        """Среднее по колонке (0 для пустой таблицы)."""
+        if not self.size:
+            return 0
+        return self.sum(name) / self.size
+
+    def argmax(self, name):
+        """
+        Номер строки с максимальным значением (первой из равных, как max()).
+
+        Args:
+            name (str): Название колонки
+
+        Returns:
+            int: Номер строки
+        """
+        if np is not None:
+            return int(self.column(name).argmax())
+        column = self.column(name)
+        return max(range(self.size), key=column.__getitem__)
+
+    def group_counts(self, by):
+        """
+        Считает строки в каждой группе строковой колонки.
+
+        Args:
+            by (str): Строковая колонка, например 'author'
+
+        Returns:
+            dict: Словарь {значение: число строк} в порядке первого появления
+        """
+        labels = self.dictionaries[by]
+        if np is not None:
+            counts = np.bincount(self.column(by), minlength=len(labels))
+            return dict(zip(labels, counts.tolist()))
+        counts = [0] * len(labels)
+        for code in self.column(by):
+            counts[code] += 1
+        return dict(zip(labels, counts))
+
+    def group_means(self, name, by):
+        """
+        Среднее значение метрики в каждой группе.
+
+        Args:
+            name (str): Числовая колонка
+            by (str): Строковая колонка
+
+        Returns:
+            dict: Словарь {значение группы: среднее}
+        """
+        labels = self.dictionaries[by]
+        if np is not None:
+            codes = self.column(by)
+            sums = np.bincount(codes, weights=self.column(name), minlength=len(labels))
+            counts = np.bincount(codes, minlength=len(labels))
+            return dict(zip(labels, (sums / np.maximum(counts, 1)).tolist()))
+        sums = [0.0] * len(labels)
+        counts = [0] * len(labels)
+        for code, value in zip(self.column(by), self.column(name)):
+            sums[code] += value
+            counts[code] += 1
+        return {label: sums[i] / max(counts[i], 1) for i, label in enumerate(labels)}
@@ -1,124 +1,940 @@
 import os
+import re
+import math
+import heapq
+import tempfile
+from array import array
+from collections import Counter, deque
+from operator import itemgetter, mul
+from itertools import chain, islice, tee
+from functools import cached_property
 from file_utils import read_text_file
+from morph_utils import PosTagCache
+
+# Слова, которые не учитываются при поиске самых частых слов
+STOPWORDS = frozenset(('в', "—", "и","на", "с", "(", ")", "-"))
+
+# Слова для морфологического анализа: только русские буквы
+MORPH_WORD_RE = re.compile(r'[а-яё]+')
+
+# Символы, на которых str.splitlines() разрывает строку
+LINE_BREAKS = frozenset('\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029')
+
+# Окно MATTR в словах
+MATTR_WINDOW = 50
+
+# Порог TTR, на котором заканчивается фактор MTLD (McCarthy, Jarvis, 2010)
+MTLD_THRESHOLD = 0.72
+
+# Размер выборки HD-D в словах
+HDD_SAMPLE = 42
+
+# Сколько номеров слов StreamingTextStats держит в памяти, прежде чем
+# дописать их во временный файл (4 байта на слово)
+STREAM_SPILL_IDS = 1 << 20
+
+# Сколько различных n-грамм iter_ngram_batches собирает в одну порцию
+NGRAM_BATCH = 1 << 14
+
+# Выводить ли отладочные подробности по каждому тексту (см. set_verbose)
+VERBOSE = False
+
+# Общий кэш частей речи процесса для вызовов без своего кэша
+_default_pos_cache = None
+
+# Общий словарь словоформ процесса для EncodedText без своего словаря
+_default_vocabulary = None
+
+
+class TokenizedText:
+    """
+    Текст, разбитый на слова один раз для всех метрик.
+
+    Все производные данные (слова в нижнем регистре, частоты, суммарная
+    длина слов, слова для морфологии) вычисляются лениво при первом
+    обращении и затем переиспользуются.
+
+    Args:
+        text (str): Исходный текст
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    @cached_property
+    def tokens(self):
+        """list: Слова текста в исходном регистре"""
+        return self.text.split()
+
+    @cached_property
+    def lower_tokens(self):
+        """list: Слова текста в нижнем регистре"""
+        return self.text.lower().split()
+
+    @property
+    def sequence(self):
+        """list: Слова в нижнем регистре по порядку (для MATTR и MTLD)"""
+        return self.lower_tokens
+
+    @cached_property
+    def counts(self):
+        """Counter: Частоты слов в нижнем регистре"""
+        return Counter(self.lower_tokens)
+
+    @cached_property
+    def word_count(self):
+        """int: Количество слов"""
+        return len(self.tokens)
+
+    @cached_property
+    def total_length(self):
+        """int: Суммарная длина всех слов"""
+        return sum(map(len, self.tokens))
+
+    @cached_property
+    def line_count(self):
+        """int: Количество строк (включая пустые)"""
+        return len(self.text.splitlines())
+
+    @cached_property
+    def morph_words(self):
+        """list: Слова из русских букв длиной от 2 символов для морфологии"""
+        return [w for w in MORPH_WORD_RE.findall(self.text.lower()) if len(w) >= 2]
+
+    @cached_property
+    def morph_counts(self):
+        """Counter: Частоты слов для морфологии"""
+        return Counter(self.morph_words)
+
+
+class _WordIds(dict):
+    """Словарь {словоформа: номер}, который сам добавляет новые формы в Vocabulary."""
+
+    def __init__(self, vocabulary):
+        super().__init__()
+        self.vocabulary = vocabulary
+
+    def __missing__(self, word):
+        return self.vocabulary.add(word)
+
+
+class Vocabulary:
+    """
+    Словарь словоформ корпуса: каждая форма в нижнем регистре получает целый номер.
+
+    Для каждого номера хранятся длина формы и слова для морфологии. Они
+    вычисляются один раз на форму за запуск, а не для каждого вхождения.
+
+    Словарь только растёт: его размер — число различных форм корпуса.
+    """
+
+    def __init__(self):
+        self.words = []
+        self.lengths = array('I')
+        self.morph_words = []
+        self.ids = _WordIds(self)
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word):
+        """
+        Добавляет словоформу (если её ещё нет) и возвращает её номер.
+
+        Args:
+            word (str): Словоформа в нижнем регистре
+
+        Returns:
+            int: Номер формы
+        """
+        word_id = dict.get(self.ids, word)
+        if word_id is None:
+            word_id = len(self.words)
+            dict.__setitem__(self.ids, word, word_id)
+            self.words.append(word)
+            self.lengths.append(len(word))
+            self.morph_words.append(tuple(w for w in MORPH_WORD_RE.findall(word) if len(w) >= 2))
+        return word_id
+
+    def find_ids(self, words):
+        """
+        Возвращает номера уже известных словоформ, не добавляя новые.
+
+        Args:
+            words (iterable): Словоформы в нижнем регистре
+
+        Returns:
+            set: Номера форм, которые есть в словаре
+        """
+        ids = {dict.get(self.ids, word) for word in words}
+        ids.discard(None)
+        return ids
+
+    def encode(self, tokens):
+        """
+        Переводит слова в номера, добавляя новые формы в словарь.
+
+        Args:
+            tokens (iterable): Слова в нижнем регистре
+
+        Returns:
+            array.array: Номера слов (array('I'), 4 байта на слово)
+        """
+        return array('I', map(self.ids.__getitem__, tokens))
+
+
+def get_default_vocabulary():
+    """
+    Возвращает общий словарь словоформ процесса.
+
+    Returns:
+        Vocabulary: Словарь
+    """
+    global _default_vocabulary
+    if _default_vocabulary is None:
+        _default_vocabulary = Vocabulary()
+    return _default_vocabulary
+
+
+class EncodedText:
+    """
+    Текст, сохранённый как массив номеров словоформ из общего словаря.
+
+    Даёт метрикам те же атрибуты, что и TokenizedText (word_count, counts,
+    total_length, line_count, morph_counts), но сам текст и списки строк
+    не хранит: на слово приходится 4 байта вместо объекта str. Частоты
+    считаются по номерам, длина слов — по таблице длин словаря, слова для
+    морфологии — по его таблице слов. Уникальные слова, TTR и HD-D считаются
+    прямо по частотам номеров, а в строки номера переводятся только для
+    выходных таблиц (частоты слов, стоп-слова, n-граммы).
+
+    Args:
+        text (str): Исходный текст
+        vocabulary (Vocabulary): Словарь словоформ (None — общий словарь процесса)
+    """
+
+    def __init__(self, text, vocabulary=None):
+        self.vocabulary = vocabulary if vocabulary is not None else get_default_vocabulary()
+        lower = text.lower()
+        self.ids = self.vocabulary.encode(lower.split())
+        if len(lower) != len(text):
+            # У редких букв (İ) нижний регистр длиннее: длина считается по исходным словам
+            self.total_length = sum(map(len, text.split()))
+        self.line_count = len(text.splitlines())
+
+    @property
+    def word_count(self):
+        """int: Количество слов"""
+        return len(self.ids)
+
+    @property
+    def sequence(self):
+        """array.array: Номера слов по порядку (для MATTR и MTLD)"""
+        return self.ids
+
+    @cached_property
+    def id_counts(self):
+        """Counter: Частоты номеров словоформ (в порядке первого появления)"""
+        return Counter(self.ids)
+
+    @cached_property
+    def counts(self):
+        """Counter: Частоты слов в нижнем регистре (номера переводятся в строки)"""
+        id_counts = self.id_counts
+        return Counter(dict(zip(map(self.vocabulary.words.__getitem__, id_counts), id_counts.values())))
+
+    @cached_property
+    def total_length(self):
+        """int: Суммарная длина всех слов (по таблице длин словаря, одно умножение на словоформу)"""
+        id_counts = self.id_counts
+        return sum(map(mul, map(self.vocabulary.lengths.__getitem__, id_counts), id_counts.values()))
+
+    @cached_property
+    def morph_counts(self):
+        """Counter: Частоты слов для морфологии"""
+        return Counter(chain.from_iterable(map(self.vocabulary.morph_words.__getitem__, self.ids)))
+
+
+class _MattrWindow:
+    """
+    MATTR по словам, поступающим частями: скользящее окно из window
+    последних слов и частоты слов в нём. Память — O(window), а не O(n).
+
+    Args:
+        window (int): Размер окна в словах
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.recent = deque()
+        self.counts = {}
+        # Сумма числа различных слов по всем полным окнам
+        self.total = 0
+
+    def update(self, sequence):
+        """
+        Сдвигает окно по очередным словам.
+
+        Args:
+            sequence (iterable): Номера слов по порядку
+        """
+        window, recent, counts = self.window, self.recent, self.counts
+        total = self.total
+        for word in sequence:
+            recent.append(word)
+            counts[word] = counts.get(word, 0) + 1
+            if len(recent) > window:
+                old = recent.popleft()
+                if counts[old] == 1:
+                    del counts[old]
+                else:
+                    counts[old] -= 1
+            if len(recent) == window:
+                total += len(counts)
+        self.total = total
+
+    def result(self, word_count, unique_words):
+        """
+        Возвращает MATTR, как calculate_mattr для всего текста.
+
+        Args:
+            word_count (int): Число слов текста
+            unique_words (int): Число различных слов текста
+
+        Returns:
+            float: MATTR (от 0 до 1)
+        """
+        if not word_count:
+            return 0
+        if word_count <= self.window:
+            return unique_words / word_count
+        return self.total / ((word_count - self.window + 1) * self.window)
+
+
+class _MtldFactors:
+    """
+    Факторы MTLD по словам, поступающим частями (один проход).
+
+    Args:
+        threshold (float): Порог TTR
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.factors = 0.0
+        self.seen = set()
+        self.count = 0
+
+    def update(self, sequence):
+        """
+        Учитывает очередные слова.
+
+        Args:
+            sequence (iterable): Номера или формы слов по порядку
+        """
+        threshold, factors, seen, count = self.threshold, self.factors, self.seen, self.count
+        for word in sequence:
+            seen.add(word)
+            count += 1
+            if len(seen) <= threshold * count:
+                factors += 1
+                seen = set()
+                count = 0
+        self.factors, self.seen, self.count = factors, seen, count
+
+    def result(self):
+        """
+        Returns:
+            float: Число факторов вместе с дробным фактором остатка
+        """
+        if self.count:
+            return self.factors + (1 - len(self.seen) / self.count) / (1 - self.threshold)
+        return self.factors
+
+
+class StreamingTextStats:
+    """
+    Счётчики текста, накапливаемые по частям, для очень больших файлов.
+
+    Даёт метрикам те же атрибуты, что и TokenizedText (word_count, counts,
+    total_length, line_count, morph_counts), но без списков слов и без
+    самого текста. Слово, разрезанное границей частей, дочитывается из
+    следующей части.
+
+    MATTR (скользящее окно) и прямой проход MTLD считаются по мере
+    поступления частей, HD-D — по частотам. Порядок слов нужен ещё только
+    обратному проходу MTLD и n-граммам: номера слов в общем словаре
+    процесса (4 байта на слово) копятся в памяти до STREAM_SPILL_IDS и
+    затем дописываются во временный файл, откуда читаются блоками.
+    Память ограничена словарём и окнами, а не длиной файла.
+
+    Args:
+        vocabulary (Vocabulary): Словарь словоформ (None — общий словарь процесса)
+        mattr_window (int): Окно MATTR, которое считается по ходу чтения
+        mtld_threshold (float): Порог MTLD, с которым идёт прямой проход
+        spill_ids (int): Сколько номеров слов держать в памяти
+    """
+
+    def __init__(self, vocabulary=None, mattr_window=MATTR_WINDOW, mtld_threshold=MTLD_THRESHOLD,
+                 spill_ids=STREAM_SPILL_IDS):
+        self.vocabulary = vocabulary if vocabulary is not None else get_default_vocabulary()
+        self.word_count = 0
+        self.total_length = 0
+        self.line_count = 0
+        self.counts = Counter()
+        self.morph_counts = Counter()
+        self._mattr = _MattrWindow(mattr_window)
+        self._mtld = _MtldFactors(mtld_threshold)
+        self._ids = array('I')
+        self._spill_ids = spill_ids
+        self._spill = None
+        self._spilled = 0
+        self._tail = ''
+        self._line_breaks = 0
+        self._last_char = ''
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        Собирает счётчики по последовательности частей текста.
+
+        Args:
+            chunks (iterable): Части текста (например, из iter_text_chunks)
+
+        Returns:
+            StreamingTextStats: Готовые счётчики
+        """
+        stats = cls()
+        for chunk in chunks:
+            stats.feed(chunk)
+        stats.finish()
+        return stats
+
+    def feed(self, chunk):
+        """
+        Добавляет очередную часть текста.
+
+        Args:
+            chunk (str): Часть текста
+        """
+        # Обрабатываем всё до последнего пробельного символа, остаток ждёт следующей части
+        cut = len(chunk)
+        while cut > 0 and not chunk[cut - 1].isspace():
+            cut -= 1
+        if cut == 0:
+            self._tail += chunk
+            return
+        segment = self._tail + chunk[:cut]
+        self._tail = chunk[cut:]
+        self._consume(segment)
+
+    def finish(self):
+        """Обрабатывает остаток текста и подсчитывает строки."""
+        if self._tail:
+            self._consume(self._tail)
+            self._tail = ''
+        # Как str.splitlines(): последняя строка без перевода строки тоже считается
+        self.line_count = self._line_breaks
+        if self._last_char and self._last_char not in LINE_BREAKS:
+            self.line_count += 1
+
+    def close(self):
+        """Удаляет временный файл с номерами слов (если он был создан)."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            self._spilled = 0
+
+    def _consume(self, segment):
+        """Учитывает фрагмент, который заканчивается на границе слова."""
+        tokens = segment.split()
+        self.word_count += len(tokens)
+        self.total_length += sum(map(len, tokens))
+        lower = segment.lower()
+        lower_tokens = lower.split()
+        self.counts.update(lower_tokens)
+        ids = self.vocabulary.encode(lower_tokens)
+        self._mattr.update(ids)
+        self._mtld.update(ids)
+        self._ids.extend(ids)
+        if len(self._ids) >= self._spill_ids:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(prefix='stream-', suffix='.ids')
+            self._ids.tofile(self._spill)
+            self._spilled += len(self._ids)
+            self._ids = array('I')
+        self.morph_counts.update(w for w in MORPH_WORD_RE.findall(lower) if len(w) >= 2)
+
+        lines = segment.splitlines(True)
+        breaks = len(lines) if lines[-1][-1] in LINE_BREAKS else len(lines) - 1
+        # \r\n, разрезанный границей частей, — это один перевод строки
+        if self._last_char == '\r' and segment[0] == '\n':
+            breaks -= 1
+        self._line_breaks += breaks
+        self._last_char = segment[-1]
+
+    def iter_ids(self, reverse=False):
+        """
+        Перебирает номера слов текста, читая временный файл блоками.
+
+        Args:
+            reverse (bool): С конца текста к началу
+
+        Yields:
+            int: Номер слова
+        """
+        itemsize = self._ids.itemsize
+        blocks = []
+        if self._spill is not None:
+            self._spill.flush()
+            blocks = [(start, min(self._spill_ids, self._spilled - start))
+                      for start in range(0, self._spilled, self._spill_ids)]
+        if reverse:
+            yield from reversed(self._ids)
+            blocks.reverse()
+        for start, size in blocks:
+            block = array('I')
+            self._spill.seek(start * itemsize)
+            block.fromfile(self._spill, size)
+            yield from (reversed(block) if reverse else block)
+        if not reverse:
+            yield from self._ids
+
+    def mattr(self, window=MATTR_WINDOW):
+        """
+        Возвращает MATTR: готовый, если окно то же, что при чтении,
+        иначе пересчитывает по номерам слов.
+
+        Args:
+            window (int): Размер окна в словах
+
+        Returns:
+            float: MATTR (см. calculate_mattr)
+        """
+        moving = self._mattr
+        if window != moving.window:
+            moving = _MattrWindow(window)
+            moving.update(self.iter_ids())
+        return moving.result(self.word_count, len(self.counts))
+
+    def mtld_factors(self, threshold=MTLD_THRESHOLD):
+        """
+        Считает факторы MTLD в прямом и обратном порядке слов.
+
+        Прямой проход готов после чтения (если порог тот же), обратный
+        читает номера слов с конца.
+
+        Args:
+            threshold (float): Порог TTR
+
+        Returns:
+            tuple: (факторы прямого прохода, факторы обратного прохода)
+        """
+        forward = self._mtld
+        if threshold != forward.threshold:
+            forward = _MtldFactors(threshold)
+            forward.update(self.iter_ids())
+        backward = _MtldFactors(threshold)
+        backward.update(self.iter_ids(reverse=True))
+        return forward.result(), backward.result()
+
+
+def tokenize(text):
+    """
+    Возвращает TokenizedText для текста (или сам объект, если он уже разобран).
+
+    Args:
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Текст для анализа
+
+    Returns:
+        TokenizedText | EncodedText | StreamingTextStats: Разобранный текст
+    """
+    if isinstance(text, str):
+        return TokenizedText(text)
+    return text
+
+def _type_counts(tokens):
+    """
+    Возвращает частоты словоформ для метрик, которым не нужны сами слова.
+
+    У EncodedText это частоты номеров: строки для них не собираются.
+
+    Args:
+        tokens (TokenizedText | EncodedText | StreamingTextStats): Разобранный текст
+
+    Returns:
+        Counter: Частоты {словоформа или её номер: количество}
+    """
+    if isinstance(tokens, EncodedText):
+        return tokens.id_counts
+    return tokens.counts
 
 def count_words(text):
     """
     Подсчитывает количество слов в тексте
 
     Args:
-        text (str): Текст для анализа
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Текст для анализа
 
     Returns:
         int: Количество слов
     """
-    text = text.split()
-    count = len(text)
-    return count
+    return tokenize(text).word_count
     
 def count_unique_words(text):
     """
     Подсчитывает количество уникальных слов в тексте
 
     Args:
-        text (str): Входной текст
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
 
     Returns:
         int: Количество уникальных слов
     """
-    words = text.lower().split()
-    return len(set(words))
+    return len(_type_counts(tokenize(text)))
 
 def calculate_ttr(text):
     """
     Вычисляет TTR = количество уникальных слов / общее количество слов
 
     Args:
-        text (str): Входной текст
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
 
     Returns:
         float: TTR текста (от 0 до 1). Если слов нет, возвращает 0
     """
-    words = text.lower().split()
+    tokens = tokenize(text)
     
-    if not words:
+    if not tokens.word_count:
         return 0
     
-    unique_words = set(words)
-    return len(unique_words) / len(words)
+    return len(_type_counts(tokens)) / tokens.word_count
+
+def calculate_mattr(text, window=MATTR_WINDOW):
+    """
+    Вычисляет MATTR — средний TTR по всем окнам из window слов подряд.
+
+    Окна не перебираются: вхождение слова добавляет единицу к числу
+    различных слов тех окон, где оно первое, то есть окон, начинающихся
+    после его прошлого вхождения. Время O(n), а не O(n·window).
+
+    Args:
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
+        window (int): Размер окна в словах
+
+    Returns:
+        float: MATTR (от 0 до 1); для текста короче окна — TTR всего текста.
+               Если слов нет, возвращает 0
+    """
+    tokens = tokenize(text)
+    if isinstance(tokens, StreamingTextStats):
+        # Текст не хранится: окно уже прошло по нему при чтении
+        return tokens.mattr(window)
+    sequence = tokens.sequence
+    n = len(sequence)
+    if not n:
+        return 0
+    if n <= window:
+        return len(set(sequence)) / n
+
+    last_seen = {}
+    last_start = n - window
+    total = 0
+    for i, word in enumerate(sequence):
+        # Окна [start, start + window) с этим вхождением, где слово ещё не встречалось
+        first = last_seen.get(word, -1) + 1
+        last_seen[word] = i
+        if first < i - window + 1:
+            first = i - window + 1
+        last = i if i < last_start else last_start
+        if last >= first:
+            total += last - first + 1
+    return total / ((last_start + 1) * window)
+
+def _mtld_factors(sequence, threshold):
+    """Считает факторы MTLD за один проход (остаток — дробный фактор)."""
+    factors = _MtldFactors(threshold)
+    factors.update(sequence)
+    return factors.result()
+
+def calculate_mtld(text, threshold=MTLD_THRESHOLD):
+    """
+    Вычисляет MTLD — среднюю длину отрезка текста, на котором TTR
+    опускается до порога threshold.
+
+    Проходы в прямом и обратном порядке идут за O(n) каждый; результат —
+    их среднее.
+
+    Args:
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
+        threshold (float): Порог TTR
+
+    Returns:
+        float: MTLD в словах. Если TTR текста так и не опустился до порога
+               (все слова разные), возвращает число слов; если слов нет — 0
+    """
+    tokens = tokenize(text)
+    n = tokens.word_count
+    if not n:
+        return 0
+    if isinstance(tokens, StreamingTextStats):
+        passes = tokens.mtld_factors(threshold)
+    else:
+        sequence = tokens.sequence
+        passes = [_mtld_factors(ordered, threshold) for ordered in (sequence, reversed(sequence))]
+    values = [n / factors if factors else n for factors in passes]
+    return sum(values) / 2
+
+def calculate_hdd(text, sample=HDD_SAMPLE):
+    """
+    Вычисляет HD-D — ожидаемый TTR случайной выборки из sample слов текста
+    (по гипергеометрическому распределению).
+
+    Вероятность встретить слово в выборке зависит только от его частоты,
+    поэтому она считается один раз для каждой различной частоты.
+
+    Args:
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
+        sample (int): Размер выборки в словах
+
+    Returns:
+        float: HD-D (от 0 до 1); для текста короче выборки — TTR всего текста.
+               Если слов нет, возвращает 0
+    """
+    tokens = tokenize(text)
+    n = tokens.word_count
+    if not n:
+        return 0
+    sample = min(sample, n)
+    total = 0.0
+    for frequency, types in Counter(_type_counts(tokens).values()).items():
+        # P(слово не попало в выборку) = C(n - f, s) / C(n, s)
+        if n - frequency >= sample:
+            missing = math.exp(math.lgamma(n - frequency + 1) - math.lgamma(n - frequency - sample + 1)
+                               - math.lgamma(n + 1) + math.lgamma(n - sample + 1))
+        else:
+            missing = 0.0
+        total += types * (1 - missing)
+    return total / sample
 
 def get_most_common_words(text, n=10):
     """
     Находит n самых часто встречающихся слов
 
     Args:
-        text (str): Входной текст.
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст.
         n (int): Количество самых частых слов для возврата (10)
 
     Returns:
         list of tuples: Список кортежей вида (слово, количество), 
                         отсортированных по убыванию частоты
     """
-    words = text.lower().split()
-    stopwords = ('в', "—", "и","на", "с", "(", ")", "-")
-    for wordy in stopwords:
-        for l in words:
-            if wordy == l:
-                words.remove(wordy)
-    result = {}
+    return top_words(count_word_frequencies(text), n)
 
-    for word in words:
-        result[word] = result.get(word, 0) + 1
-    
-    return sorted(result.items(), key=lambda x: x[1], reverse=True)[:n]
+def count_word_frequencies(text):
+    """
+    Строит таблицу частот слов без стоп-слов.
+
+    Таблицы разных текстов можно складывать (Counter.update), чтобы
+    получить частоты по автору или по всему корпусу.
+
+    Args:
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
+
+    Returns:
+        Counter: Частоты слов в нижнем регистре
+    """
+    tokens = tokenize(text)
+    if isinstance(tokens, EncodedText):
+        # Стоп-слова отсеиваются по номерам, строки собираются только для оставшихся слов
+        stop_ids = tokens.vocabulary.find_ids(STOPWORDS)
+        words = tokens.vocabulary.words
+        return Counter({words[word_id]: count for word_id, count in tokens.id_counts.items()
+                        if word_id not in stop_ids})
+    return Counter({word: count for word, count in tokens.counts.items() if word not in STOPWORDS})
+
+def find_stopwords(text):
+    """
+    Находит стоп-слова, которые встречаются в тексте.
+
+    Вместе с ключами таблицы count_word_frequencies это весь словарь
+    текста: так словари файлов можно объединять в словарь корпуса.
+
+    Args:
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
+
+    Returns:
+        list: Стоп-слова текста по алфавиту
+    """
+    tokens = tokenize(text)
+    if isinstance(tokens, EncodedText):
+        id_counts = tokens.id_counts
+        return sorted(tokens.vocabulary.words[word_id] for word_id in tokens.vocabulary.find_ids(STOPWORDS)
+                      if word_id in id_counts)
+    return sorted(word for word in tokens.counts if word in STOPWORDS)
+
+def count_ngrams(text, n=2):
+    """
+    Строит таблицу частот n-грамм (n слов подряд) без стоп-слов.
+
+    N-граммы, в которые входит стоп-слово, пропускаются. Ключ таблицы — слова
+    n-граммы в нижнем регистре через пробел, поэтому таблицы разных текстов
+    можно складывать, как частоты слов.
+
+    Args:
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
+        n (int): Длина n-граммы в словах
+
+    Returns:
+        Counter: Частоты n-грамм {'слово слово': количество} в порядке первого появления
+    """
+    tokens = tokenize(text)
+    # Сначала считаем кортежи (номеров или слов), строки собираем по одной на n-грамму
+    grams = Counter(_ngram_tuples(tokens, n))
+    vocabulary = getattr(tokens, 'vocabulary', None)
+    if vocabulary is None:
+        return Counter({' '.join(gram): count for gram, count in grams.items() if STOPWORDS.isdisjoint(gram)})
+    # Стоп-слова отсеиваются по номерам, строки собираются только для оставшихся n-грамм
+    stop_ids = vocabulary.find_ids(STOPWORDS)
+    words = vocabulary.words
+    return Counter({' '.join(map(words.__getitem__, gram)): count
+                    for gram, count in grams.items() if stop_ids.isdisjoint(gram)})
+
+def iter_ngram_batches(text, n=2, batch=NGRAM_BATCH):
+    """
+    Перебирает различные n-граммы текста без стоп-слов порциями.
+
+    В отличие от count_ngrams, частоты не считаются и вся таблица n-грамм
+    в памяти не собирается: в порции не больше batch различных n-грамм.
+    Для StreamingTextStats память не зависит от размера файла. Одна
+    n-грамма может попасть в несколько порций.
+
+    Args:
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
+        n (int): Длина n-граммы в словах
+        batch (int): Наибольшее число n-грамм в порции
+
+    Yields:
+        set: N-граммы порции ('слово слово')
+    """
+    tokens = tokenize(text)
+    vocabulary = getattr(tokens, 'vocabulary', None)
+    if vocabulary is None:
+        stop, join = STOPWORDS, ' '.join
+    else:
+        # Стоп-слова отсеиваются по номерам, как в count_ngrams
+        stop, words = vocabulary.find_ids(STOPWORDS), vocabulary.words
+        join = lambda gram: ' '.join(map(words.__getitem__, gram))
+    grams = set()
+    for gram in _ngram_tuples(tokens, n):
+        grams.add(gram)
+        if len(grams) >= batch:
+            yield {join(gram) for gram in grams if stop.isdisjoint(gram)}
+            grams = set()
+    if grams:
+        yield {join(gram) for gram in grams if stop.isdisjoint(gram)}
+
+def _ngram_tuples(tokens, n):
+    """
+    Перебирает n-граммы текста кортежами номеров (или слов) по порядку.
+
+    Args:
+        tokens (TokenizedText | EncodedText | StreamingTextStats): Разобранный текст
+        n (int): Длина n-граммы в словах
+
+    Returns:
+        iterator: Кортежи из n номеров или слов
+    """
+    if isinstance(tokens, StreamingTextStats):
+        # Номера слов читаются блоками; tee держит в памяти только n - 1 последних
+        shifted = (islice(ids, i, None) for i, ids in enumerate(tee(tokens.iter_ids(), n)))
+    else:
+        sequence = tokens.sequence
+        shifted = (islice(sequence, i, None) for i in range(n))
+    return zip(*shifted)
+
+def top_words(counts, n=10):
+    """
+    Выбирает n самых частых слов из таблицы частот за O(V log n).
+
+    При равной частоте порядок тот же, что при полной сортировке:
+    раньше идёт слово, которое раньше встретилось в тексте.
+
+    Args:
+        counts (dict): Таблица частот {слово: количество}
+        n (int): Сколько слов вернуть
+
+    Returns:
+        list of tuples: Список (слово, количество) по убыванию частоты
+    """
+    return heapq.nlargest(n, counts.items(), key=itemgetter(1))
 
 def count_lines(text):
     """
     Подсчитывает количество строк в тексте.
 
     Args:
-        text (str): Входной текст
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст
 
     Returns:
         int: Количество строк (включая пустые)
     """
-    return len(text.splitlines())
+    return tokenize(text).line_count
 
 def average_word_length(text):
     """
     Вычисляет среднюю длину слова в тексте.
 
     Args:
-        text (str): Входной текст.
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Входной текст.
 
     Returns:
         float: Средняя длина слова. Если слов нет, возвращает 0.
     """
-    words = text.split()
+    tokens = tokenize(text)
     
-    if not words:
+    if not tokens.word_count:
         return 0
     
-    total_length = sum(len(word) for word in words)
-    return total_length / len(words)
+    return tokens.total_length / tokens.word_count
+
+
+def set_verbose(verbose):
+    """
+    Включает или выключает отладочный вывод при расчёте метрик.
+
+    Args:
+        verbose (bool): Выводить ли подробности по каждому тексту
+    """
+    global VERBOSE
+    VERBOSE = verbose
 
 
-def calculate_lexical_density(text):
+def _get_default_pos_cache():
+    """Возвращает общий кэш частей речи процесса (только в памяти)."""
+    global _default_pos_cache
+    if _default_pos_cache is None:
+        _default_pos_cache = PosTagCache(path=None)
+    return _default_pos_cache
+
+
+def calculate_lexical_density(text, morph=None, pos_cache=None):
     """
     Вычисляет лексическую плотность для ВСЕГО текста.
     
     Args:
-        text (str): Исходный текст
+        text (str | TokenizedText | EncodedText | StreamingTextStats): Исходный текст
+        morph (pymorphy3.MorphAnalyzer): Готовый анализатор (если нет pos_cache)
+        pos_cache (PosTagCache): Кэш частей речи. Если не передан, используется
+                                 общий кэш процесса в памяти (или временный,
+                                 если передан morph)
     
     Returns:
         dict: Словарь с метриками лексической плотности
     """
     try:
-        import pymorphy3
-        import re
-        import sys
-        
-        # Проверяем, что текст - строка
-        if not isinstance(text, str) or not text.strip():
+        # Проверяем, что текст - строка или уже разобранный текст
+        if not isinstance(text, (str, TokenizedText, EncodedText, StreamingTextStats)):
             return {
                 'lexical_density': 0.0,
                 'noun_density': 0.0,
@@ -126,50 +942,14 @@ def calculate_lexical_density(text):
                 'verb_density': 0.0
             }
         
-        # Инициализация анализатора с русским языком
-        try:
-            morph = pymorphy3.MorphAnalyzer(lang='ru')
-        except:
-            morph = pymorphy3.MorphAnalyzer()
-        
-        def preprocess_text(text):
-            """Очистка текста для морфологического анализа"""
-            # Приводим к нижнему регистру
-            text = text.lower()
-            # Оставляем только русские буквы и пробелы
-            text = re.sub(r'[^а-яё\s]', ' ', text)
-            # Убираем лишние пробелы
-            text = re.sub(r'\s+', ' ', text).strip()
-            return text
-        
-        def get_pos_tag(word):
-            """Определяет часть речи для слова"""
-            try:
-                if len(word) < 2:  # Слишком короткие слова пропускаем
-                    return 'OTHER'
-                
-                parsed = morph.parse(word)[0]
-                pos = parsed.tag.POS
-                
-                # Существительные
-                if pos in ['NOUN', 'NPRO']:
-                    return 'NOUN'
-                # Прилагательные
-                elif pos in ['ADJF', 'ADJS', 'COMP']:
-                    return 'ADJ'
-                # Глаголы и их формы
-                elif pos in ['VERB', 'INFN', 'GRND', 'PRTF', 'PRTS']:
-                    return 'VERB'
-                else:
-                    return 'OTHER'
-            except:
-                return 'OTHER'
+        # Кэш частей речи; анализатор pymorphy3 создаётся при первом промахе
+        if pos_cache is None:
+            pos_cache = PosTagCache(path=None, morph=morph) if morph is not None else _get_default_pos_cache()
         
-        # Обрабатываем текст
-        processed_text = preprocess_text(text)
-        words = [w for w in processed_text.split() if len(w) >= 2]  # Берем слова от 2 букв
+        # Слова из русских букв от 2 символов (см. TokenizedText.morph_words)
+        word_counts = tokenize(text).morph_counts
         
-        if not words:
+        if not word_counts:
             return {
                 'lexical_density': 0.0,
                 'noun_density': 0.0,
@@ -177,16 +957,17 @@ def calculate_lexical_density(text):
                 'verb_density': 0.0
             }
         
-        # Считаем части речи
+        # Считаем части речи: каждая словоформа размечается один раз
         counts = {'NOUN': 0, 'ADJ': 0, 'VERB': 0, 'OTHER': 0}
-        for word in words:
-            pos = get_pos_tag(word)
-            counts[pos] += 1
+        tags = pos_cache.tag_many(word_counts)
+        for word, n in word_counts.items():
+            counts[tags[word]] += n
         
-        total = len(words)
+        total = sum(word_counts.values())
         
-        # Для отладки
-        print(f"  Слов для анализа: {total}, существительных: {counts['NOUN']}, прилагательных: {counts['ADJ']}, глаголов: {counts['VERB']}")
+        # Для отладки (см. set_verbose)
+        if VERBOSE:
+            print(f"  Слов для анализа: {total}, существительных: {counts['NOUN']}, прилагательных: {counts['ADJ']}, глаголов: {counts['VERB']}")
         
         # Рассчитываем плотности
         noun_density = counts['NOUN'] / total if total > 0 else 0
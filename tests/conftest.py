@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import shutil
+
+import pytest
+
+# Модули проекта импортируют друг друга по имени (как при запуске main.py из папки)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT = os.path.join(ROOT, 'my_project')
+sys.path.insert(0, PROJECT)
+
+CORPUS = os.path.join(PROJECT, 'corpus')
+METADATA = os.path.join(PROJECT, 'data', 'metadata.csv')
+
+# Файлы results, которые сравниваются между режимами запуска
+OUTPUT_FILES = ('statistics.csv', 'groups.csv', 'ngrams.csv', 'duplicates.csv', 'report.jsonl')
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Копия корпуса проекта во временной папке (её можно менять)."""
+    folder = tmp_path / 'corpus'
+    shutil.copytree(CORPUS, folder)
+    return str(folder)
+
+
+@pytest.fixture
+def run_corpus(tmp_path):
+    """
+    Запускает analyze_corpus, все кэши и результаты — во временной папке.
+
+    Возвращает функцию run(corpus_folder, name='run', **kwargs) -> (results, outputs),
+    где outputs — содержимое файлов results (см. read_outputs).
+    """
+    import main
+
+    def run(corpus_folder, name='run', **kwargs):
+        cache = tmp_path / 'cache'
+        options = dict(pos_cache_path=None, metadata_path=METADATA, manifest_path=str(cache / 'manifest.json'),
+                       ngram_store_path=str(cache / 'ngrams'), report_formats=('txt', 'jsonl'),
+                       metrics=main.parse_metrics('all'))
+        options.update(kwargs)
+        folder = str(tmp_path / name)
+        results = main.analyze_corpus(corpus_folder, results_folder=folder, **options)
+        return results, read_outputs(folder)
+
+    return run
+
+
+def read_outputs(folder):
+    """
+    Читает файлы результатов для сравнения.
+
+    Заголовок report.jsonl содержит путь к корпусу и в сравнение не входит.
+
+    Returns:
+        dict: {имя файла: содержимое} (None, если файла нет)
+    """
+    outputs = {}
+    for name in OUTPUT_FILES:
+        path = os.path.join(folder, name)
+        if not os.path.exists(path):
+            outputs[name] = None
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            if name.endswith('.jsonl'):
+                outputs[name] = [record for record in map(json.loads, f) if record['type'] != 'header']
+            else:
+                outputs[name] = f.read()
+    return outputs
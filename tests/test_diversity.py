@@ -0,0 +1,87 @@
+"""MATTR, MTLD и HD-D: быстрые реализации против определений, в памяти и потоком."""
+import math
+import random
+
+import pytest
+
+from text_utils import (TokenizedText, EncodedText, StreamingTextStats, Vocabulary, calculate_mattr,
+                        calculate_mtld, calculate_hdd)
+
+
+def naive_mattr(words, window):
+    if len(words) <= window:
+        return len(set(words)) / len(words)
+    ttrs = [len(set(words[i:i + window])) / window for i in range(len(words) - window + 1)]
+    return sum(ttrs) / len(ttrs)
+
+
+def naive_mtld_pass(words, threshold):
+    factors, start = 0.0, 0
+    for end in range(1, len(words) + 1):
+        segment = words[start:end]
+        if len(set(segment)) / len(segment) <= threshold:
+            factors += 1
+            start = end
+    rest = words[start:]
+    if rest:
+        factors += (1 - len(set(rest)) / len(rest)) / (1 - threshold)
+    return len(words) / factors if factors else len(words)
+
+
+def naive_hdd(words, sample):
+    n = len(words)
+    sample = min(sample, n)
+    counts = {}
+    for word in words:
+        counts[word] = counts.get(word, 0) + 1
+    return sum(1 - math.comb(n - f, sample) / math.comb(n, sample) for f in counts.values()) / sample
+
+
+def random_words(seed, size=None):
+    rng = random.Random(seed)
+    vocabulary = [f'w{i}' for i in range(rng.choice([3, 20, 200]))]
+    return [rng.choice(vocabulary) for _ in range(size if size is not None else rng.randrange(1, 400))]
+
+
+@pytest.mark.parametrize('seed', range(15))
+def test_metrics_match_definitions(seed):
+    words = random_words(seed)
+    text = ' '.join(words)
+    for window in (1, 10, 50):
+        assert calculate_mattr(text, window) == pytest.approx(naive_mattr(words, window))
+    for threshold in (0.5, 0.72):
+        expected = (naive_mtld_pass(words, threshold) + naive_mtld_pass(words[::-1], threshold)) / 2
+        assert calculate_mtld(text, threshold) == pytest.approx(expected)
+    assert calculate_hdd(text) == pytest.approx(naive_hdd(words, 42))
+
+
+def test_empty_text():
+    for metric in (calculate_mattr, calculate_mtld, calculate_hdd):
+        assert metric('') == 0
+        assert metric(StreamingTextStats.from_chunks([])) == 0
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('spill_ids', [5, 64, 1 << 20])
+def test_streaming_matches_in_memory(seed, spill_ids):
+    text = ' '.join(random_words(seed, 1000))
+    vocabulary = Vocabulary()
+    stats = StreamingTextStats(vocabulary, spill_ids=spill_ids)
+    for start in range(0, len(text), 97):
+        stats.feed(text[start:start + 97])
+        # В памяти — не больше spill_ids номеров слов, остальное во временном файле
+        assert len(stats._ids) < spill_ids
+    stats.finish()
+    expected = EncodedText(text, vocabulary)
+    try:
+        assert list(stats.iter_ids()) == list(expected.ids)
+        assert list(stats.iter_ids(reverse=True)) == list(reversed(expected.ids))
+        # Окно и порог по умолчанию считаются по ходу чтения, другие — по номерам из файла
+        for window in (50, 7):
+            assert calculate_mattr(stats, window) == calculate_mattr(expected, window)
+        for threshold in (0.72, 0.5):
+            assert calculate_mtld(stats, threshold) == calculate_mtld(expected, threshold)
+        assert calculate_hdd(stats) == calculate_hdd(expected)
+        assert calculate_mattr(stats) == calculate_mattr(TokenizedText(text))
+    finally:
+        stats.close()
@@ -0,0 +1,96 @@
+"""Почти одинаковые тексты по подписям MinHash из результатов анализа."""
+import functools
+import json
+import os
+import random
+import tracemalloc
+
+import similarity_utils
+from similarity_utils import MINHASH_KEY, find_duplicates, get_minhasher, minhash_signature, write_duplicates
+from text_utils import (TokenizedText, StreamingTextStats, Vocabulary, count_ngrams, count_word_frequencies,
+                        iter_ngram_batches)
+
+
+def analysed(filename, text):
+    return {'filename': filename,
+            MINHASH_KEY: minhash_signature(TokenizedText(text), count_word_frequencies(text))}
+
+
+def test_near_copies_are_grouped(corpus, run_corpus, tmp_path):
+    names = sorted(os.listdir(corpus))[:2]
+    with open(os.path.join(corpus, names[0]), encoding='utf-8') as f:
+        words = f.read().split()
+    words[len(words) // 2] = 'правка'
+    with open(os.path.join(corpus, 'copy.txt'), 'w', encoding='utf-8') as f:
+        f.write(' '.join(words))
+
+    results, outputs = run_corpus(corpus, 'run', incremental=False)
+
+    clusters = {result['filename']: result['duplicate_cluster'] for result in results}
+    assert clusters['copy.txt'] != '' and clusters['copy.txt'] == clusters[names[0]]
+    assert clusters[names[1]] == ''
+    rows = outputs['duplicates.csv'].splitlines()[1:]
+    assert sorted(row.split(',')[1] for row in rows) == sorted(['copy.txt', names[0]])
+
+
+def test_signatures_from_manifest_json_work():
+    text = ' '.join(f'слово{i}' for i in range(200))
+    results = [analysed('a.txt', text), analysed('b.txt', text + ' ещё'), analysed('c.txt', 'совсем другой текст')]
+    # Подписи из манифеста приходят списками
+    restored = json.loads(json.dumps(results))
+    assert find_duplicates(restored) == find_duplicates(results)
+    [members] = find_duplicates(results)
+    assert [i for i, _, _ in members] == [0, 1]
+    assert all(score >= 0.8 for _, _, score in members)
+
+
+def test_empty_text_has_no_signature(tmp_path):
+    assert analysed('empty.txt', '')[MINHASH_KEY] is None
+    assert write_duplicates([{'filename': 'a.txt'}], str(tmp_path / 'duplicates.csv')) is None
+    assert not os.path.exists(tmp_path / 'duplicates.csv')
+
+
+def streamed(text, chunk=1 << 16):
+    stats = StreamingTextStats(Vocabulary(), spill_ids=1 << 12)
+    for start in range(0, len(text), chunk):
+        stats.feed(text[start:start + chunk])
+    stats.finish()
+    return stats
+
+
+def test_signature_does_not_depend_on_batches(monkeypatch):
+    rng = random.Random(1)
+    text = ' '.join(rng.choice(['в', 'и'] + [f'слово{i}' for i in range(300)]) for _ in range(5000))
+    word_freq = count_word_frequencies(text)
+    expected = get_minhasher().signature(set(word_freq) | set(count_ngrams(text, 2)))
+    assert minhash_signature(TokenizedText(text), word_freq) == expected
+    # Мелкие порции: биграммы повторяются в разных порциях, подпись та же
+    monkeypatch.setattr(similarity_utils, 'iter_ngram_batches', functools.partial(iter_ngram_batches, batch=50))
+    stats = streamed(text, 97)
+    try:
+        assert minhash_signature(stats, count_word_frequencies(stats)) == expected
+    finally:
+        stats.close()
+
+
+def test_streamed_signature_memory_does_not_grow_with_file():
+    rng = random.Random(0)
+    words = [f'слово{i}' for i in range(20000)]
+    stats = streamed(' '.join(rng.choice(words) for _ in range(100000)))
+    try:
+        word_freq = count_word_frequencies(stats)
+        get_minhasher()
+        peaks = []
+        for compute in (lambda: minhash_signature(stats, word_freq), lambda: count_ngrams(stats, 2)):
+            tracemalloc.start()
+            try:
+                compute()
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+    finally:
+        stats.close()
+    signature_peak, bigram_table_peak = peaks
+    # Таблица из ~95 тысяч различных биграмм занимает десятки мегабайт, подпись — порцию
+    assert signature_peak < 12 * 2 ** 20
+    assert signature_peak * 3 < bigram_table_peak
@@ -0,0 +1,50 @@
+"""Все режимы запуска дают одни и те же файлы результатов."""
+import os
+
+import pytest
+
+import main
+from pack_utils import build_pack
+from conftest import METADATA, read_outputs
+
+
+@pytest.fixture
+def baseline(corpus, run_corpus):
+    """Последовательный полный анализ — образец для остальных режимов."""
+    _, outputs = run_corpus(corpus, 'baseline', incremental=False)
+    assert outputs['statistics.csv'] and outputs['ngrams.csv']
+    return outputs
+
+
+@pytest.mark.parametrize('options', [
+    pytest.param({'workers': 2}, id='pool'),
+    pytest.param({'stream_threshold': 0}, id='stream'),
+    pytest.param({'workers': 2, 'stream_threshold': 0}, id='pool-stream'),
+    pytest.param({'prefetch': 4}, id='prefetch'),
+    pytest.param({'ngram_memory': 20}, id='ngram-spill'),
+])
+def test_run_modes_match_serial(corpus, run_corpus, baseline, options):
+    _, outputs = run_corpus(corpus, 'mode', incremental=False, **options)
+    assert outputs == baseline
+
+
+def test_incremental_run_matches_full(corpus, run_corpus, baseline):
+    # Второй запуск берёт все результаты из манифеста и таблицы n-грамм из хранилища
+    _, outputs = run_corpus(corpus, 'incremental')
+    assert outputs == baseline
+
+
+def test_pack_matches_folder(corpus, run_corpus, baseline, tmp_path):
+    pack_path = str(tmp_path / 'corpus.pack')
+    build_pack(corpus, pack_path, METADATA)
+    _, outputs = run_corpus(pack_path, 'pack', incremental=False)
+    assert outputs == baseline
+
+
+def test_map_reduce_matches_single_node(corpus, baseline, tmp_path):
+    shards = [str(tmp_path / f'shard{index}.json.gz') for index in range(3)]
+    for index, path in enumerate(shards):
+        main.map_corpus(corpus, shard=f'{index}/3', output=path, pos_cache_path=None)
+    folder = str(tmp_path / 'reduce')
+    main.reduce_shards(shards, results_folder=folder, metadata_path=METADATA, report_formats=('txt', 'jsonl'))
+    assert read_outputs(folder) == baseline
@@ -0,0 +1,160 @@
+"""Ошибка в одном файле не останавливает запуск; прерванный запуск продолжается."""
+import os
+import time
+import threading
+
+import pytest
+
+import main
+import fault_utils
+from manifest_utils import CheckpointLog, load_manifest
+from profile_utils import Profiler
+
+MODES = [
+    pytest.param({}, id='serial'),
+    pytest.param({'workers': 2}, id='pool'),
+    pytest.param({'prefetch': 4}, id='prefetch'),
+    pytest.param({'stream_threshold': 0}, id='stream'),
+]
+
+
+def read_errors(folder):
+    with open(os.path.join(folder, 'errors.csv'), encoding='utf-8') as f:
+        return f.read().splitlines()[1:]
+
+
+@pytest.mark.parametrize('options', MODES)
+def test_undecodable_file_is_skipped(corpus, run_corpus, tmp_path, options):
+    files = len(os.listdir(corpus))
+    with open(os.path.join(corpus, 'broken.txt'), 'wb') as f:
+        f.write(b'\xff\xfe\xfa not utf-8')
+
+    results, outputs = run_corpus(corpus, 'run', incremental=False, **options)
+
+    assert len(results) == files
+    assert 'broken.txt' not in outputs['statistics.csv']
+    errors = read_errors(tmp_path / 'run')
+    assert len(errors) == 1 and errors[0].startswith('broken.txt,UnicodeDecodeError')
+    # Файл с ошибкой не попадает в манифест и будет проанализирован снова
+    manifest = load_manifest(str(tmp_path / 'cache' / 'manifest.json'))
+    assert not any(path.endswith('broken.txt') for path in manifest)
+    assert len(manifest) == files
+
+
+@pytest.mark.parametrize('options', MODES[:2])
+def test_slow_file_is_interrupted(corpus, run_corpus, tmp_path, monkeypatch, options):
+    slow = sorted(os.listdir(corpus))[3]
+    analyze = main.analyze_single_text
+
+    def hanging(filepath, filename, **kwargs):
+        if filename == slow:
+            time.sleep(30)
+        return analyze(filepath, filename, **kwargs)
+
+    # Процессы-обработчики создаются после подмены и получают её через fork
+    monkeypatch.setattr(main, 'analyze_single_text', hanging)
+    started = time.monotonic()
+    results, _ = run_corpus(corpus, 'run', incremental=False, file_timeout=1, **options)
+
+    assert time.monotonic() - started < 20
+    assert slow not in {result['filename'] for result in results}
+    assert len(results) == len(os.listdir(corpus)) - 1
+    errors = read_errors(tmp_path / 'run')
+    assert len(errors) == 1 and errors[0].startswith(f'{slow},AnalysisTimeout')
+
+
+def test_interrupted_run_resumes_from_checkpoint_log(corpus, run_corpus, tmp_path, monkeypatch):
+    store = main.store_ngrams
+    stored = []
+
+    def interrupt_after_ten(*args):
+        if len(stored) == 10:
+            raise KeyboardInterrupt
+        stored.append(args)
+        return store(*args)
+
+    monkeypatch.setattr(main, 'store_ngrams', interrupt_after_ten)
+    with pytest.raises(KeyboardInterrupt):
+        run_corpus(corpus, 'interrupted', checkpoint_interval=0.001)
+    monkeypatch.setattr(main, 'store_ngrams', store)
+
+    manifest_path = str(tmp_path / 'cache' / 'manifest.json')
+    # Манифест целиком не записывался: готовые результаты — только в журнале
+    assert not os.path.exists(manifest_path)
+    assert len(load_manifest(manifest_path)) == 10
+
+    profiler = Profiler()
+    results, outputs = run_corpus(corpus, 'resumed', profiler=profiler)
+    assert profiler.counters['files_cached'] == 10
+    assert not os.path.exists(manifest_path + '.log')
+    assert len(load_manifest(manifest_path)) == len(results)
+    _, full = run_corpus(corpus, 'full', incremental=False)
+    assert outputs == full
+
+
+def test_torn_checkpoint_line_is_skipped(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    entry = {'size': 1, 'mtime': 1, 'sha256': 'a', 'result': {'filename': 'a.txt', 'most_common': [['вода', 2]]}}
+    log = CheckpointLog(path)
+    log.append('a.txt', entry)
+    log.close()
+    # Сбой во время записи: строка оборвана
+    with open(path + '.log', 'a', encoding='utf-8') as f:
+        f.write('{"path": "b.txt", "ent')
+    log = CheckpointLog(path)
+    log.append('c.txt', dict(entry, sha256='c'))
+    log.close()
+
+    manifest = load_manifest(path)
+    assert sorted(manifest) == ['a.txt', 'c.txt']
+    assert manifest['a.txt']['result']['most_common'] == [('вода', 2)]
+
+
+def test_crashed_pool_marks_remaining_files(corpus, run_corpus, tmp_path, monkeypatch):
+    # Файлы анализируются в порядке папки: упавший процесс — в середине запуска
+    order = main.get_files_in_folder(corpus, '.txt')
+    files, crash = sorted(order), order[len(order) // 2]
+    analyze = main.analyze_single_text
+
+    def crashing(filepath, filename, **kwargs):
+        if filename == crash:
+            # Пока готовые результаты доходят до главного процесса, затем — как segfault
+            # или OOM: процесс пула исчезает без исключения
+            time.sleep(1)
+            os._exit(1)
+        return analyze(filepath, filename, **kwargs)
+
+    monkeypatch.setattr(main, 'analyze_single_text', crashing)
+    results, _ = run_corpus(corpus, 'crashed', incremental=False, workers=2)
+
+    analyzed = {result['filename'] for result in results}
+    errors = read_errors(tmp_path / 'crashed')
+    failed = [row.split(',')[0] for row in errors]
+    assert crash in failed and crash not in analyzed
+    assert order[0] in analyzed
+    assert all('BrokenProcessPool' in row for row in errors)
+    assert sorted(analyzed | set(failed)) == files
+    manifest_path = str(tmp_path / 'cache' / 'manifest.json')
+    assert {os.path.basename(path) for path in load_manifest(manifest_path)} == analyzed
+
+    # Следующий запуск берёт готовые результаты из манифеста и анализирует только отмеченные файлы
+    monkeypatch.setattr(main, 'analyze_single_text', analyze)
+    profiler = Profiler()
+    results, _ = run_corpus(corpus, 'resumed', workers=2, profiler=profiler)
+    assert sorted(result['filename'] for result in results) == files
+    assert profiler.counters['files_cached'] == len(analyzed)
+
+
+def test_time_limit_off_main_thread_warns(capsys, monkeypatch):
+    monkeypatch.setattr(fault_utils, '_time_limit_warned', False)
+
+    def limited():
+        for _ in range(2):
+            with fault_utils.time_limit(1):
+                pass
+
+    thread = threading.Thread(target=limited)
+    thread.start()
+    thread.join()
+    # Ограничение в потоке не действует: предупреждение выводится один раз
+    assert capsys.readouterr().out.count('Ограничение времени на файл не действует') == 1
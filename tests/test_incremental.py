@@ -0,0 +1,57 @@
+"""Инкрементальный анализ: из манифеста берутся только неизменённые файлы."""
+import os
+
+from profile_utils import Profiler
+
+
+def _edit_corpus(corpus):
+    """Меняет, удаляет и «трогает» по одному файлу корпуса."""
+    names = sorted(os.listdir(corpus))
+    modified, deleted, touched = names[0], names[1], names[2]
+    with open(os.path.join(corpus, modified), 'a', encoding='utf-8') as f:
+        f.write('\nновая строка новая строка')
+    os.remove(os.path.join(corpus, deleted))
+    # Только время изменения: файл перечитывается, но хэш тот же
+    stat = os.stat(os.path.join(corpus, touched))
+    os.utime(os.path.join(corpus, touched), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    return modified, deleted, touched
+
+
+def test_changed_files_are_reanalysed(corpus, run_corpus):
+    before, _ = run_corpus(corpus, 'first')
+    modified, deleted, touched = _edit_corpus(corpus)
+
+    profiler = Profiler()
+    after, _ = run_corpus(corpus, 'second', profiler=profiler)
+
+    by_name = {result['filename']: result for result in after}
+    assert deleted not in by_name
+    assert len(after) == len(before) - 1
+    # Заново проанализирован только изменённый файл
+    assert profiler.counters['files_cached'] == len(after) - 1
+    old = next(result for result in before if result['filename'] == modified)
+    assert by_name[modified]['word_count'] == old['word_count'] + 4
+
+
+def test_incremental_outputs_match_full_run(corpus, run_corpus):
+    run_corpus(corpus, 'first')
+    _edit_corpus(corpus)
+    _, incremental = run_corpus(corpus, 'incremental')
+    _, full = run_corpus(corpus, 'full', incremental=False)
+    assert incremental == full
+
+
+def test_changed_metric_set_reanalyses_missing_metrics(corpus, run_corpus):
+    import main
+
+    run_corpus(corpus, 'basic', metrics=main.parse_metrics('basic'))
+    profiler = Profiler()
+    results, _ = run_corpus(corpus, 'diversity', profiler=profiler, metrics=main.parse_metrics('basic,diversity'))
+    # В манифесте нет MATTR, поэтому все файлы считаются заново
+    assert 'files_cached' not in profiler.counters
+    assert all('mattr' in result for result in results)
+    # Более узкий набор берётся из манифеста целиком, лишние метрики отбрасываются
+    profiler = Profiler()
+    results, _ = run_corpus(corpus, 'narrow', profiler=profiler, metrics=main.parse_metrics('basic'))
+    assert profiler.counters['files_cached'] == len(results)
+    assert not any('mattr' in result for result in results)
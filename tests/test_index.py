@@ -0,0 +1,38 @@
+"""Инвертированный индекс: конкорданс по исходным строкам и пропуск нечитаемых файлов."""
+import os
+
+from index_utils import CorpusIndex, update_index
+
+
+def build(tmp_path, texts):
+    folder = tmp_path / 'corpus'
+    folder.mkdir()
+    for name, data in texts.items():
+        (folder / name).write_bytes(data if isinstance(data, bytes) else data.encode('utf-8'))
+    index_path = str(tmp_path / 'index.sqlite')
+    stats = update_index(str(folder), sorted(texts), index_path=index_path)
+    return stats, CorpusIndex(index_path)
+
+
+def test_concordance_keeps_original_offsets(tmp_path):
+    # У 'İ' нижний регистр длиннее на символ: границы слов сдвигаются
+    _, index = build(tmp_path, {'a.txt': 'İİ Слово и ещё\nİstanbul, слово!'})
+    try:
+        assert index.concordance('слово') == [
+            ('a.txt', 1, 'İİ ', 'Слово', ' и ещё'),
+            ('a.txt', 2, 'İstanbul, ', 'слово', '!'),
+        ]
+    finally:
+        index.close()
+
+
+def test_unreadable_file_is_skipped(tmp_path, capsys):
+    stats, index = build(tmp_path, {'a.txt': 'слово', 'bad.txt': b'\xff\xfe\xfa', 'c.txt': 'ещё слово'})
+    try:
+        assert stats == {'indexed': 2, 'unchanged': 0, 'removed': 0}
+        assert index.document_frequency('слово') == 2
+        assert [filename for filename, _, _ in index.postings('слово')] == ['a.txt', 'c.txt']
+    finally:
+        index.close()
+    assert 'Пропуск bad.txt: UnicodeDecodeError' in capsys.readouterr().out
+    assert os.path.exists(tmp_path / 'index.sqlite')
@@ -0,0 +1,32 @@
+"""Ленивый индекс метаданных: строки по запросу и закрытие файла после запуска."""
+import main
+from conftest import METADATA
+from file_utils import MetadataIndex
+
+
+def test_rows_are_read_on_demand():
+    metadata = MetadataIndex(METADATA)
+    try:
+        filename = next(iter(metadata))
+        assert metadata[filename]['filename'] == filename
+        assert metadata.get('нет такого файла.txt') is None
+    finally:
+        metadata.close()
+    assert metadata._file is None
+
+
+def test_analyze_corpus_closes_metadata(corpus, run_corpus, monkeypatch):
+    opened = []
+    load = main.load_metadata
+
+    def tracked(*args, **kwargs):
+        opened.append(load(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(main, 'load_metadata', tracked)
+    results, _ = run_corpus(corpus, 'run', metrics=main.parse_metrics('basic'))
+
+    [metadata] = opened
+    # Строки метаданных читались с диска, а после запуска файл таблицы закрыт
+    assert any(result['author'] != 'Неизвестно' for result in results)
+    assert metadata._file is None
@@ -0,0 +1,77 @@
+"""План метрик: зависимости, промежуточные данные и выбор наборов."""
+import pytest
+
+from metric_utils import (ALL_METRICS, METRIC_SETS, METRICS, REQUIRED_METRICS, MetricPlan, SOURCES,
+                          get_plan, parse_metrics)
+from profile_utils import Profiler
+from text_utils import EncodedText, Vocabulary
+
+TEXT = 'вода вода нити и свобода есть свобода\nдруг друга'
+
+
+def test_dependencies_come_first_and_once():
+    plan = MetricPlan()
+    names = [metric.name for metric in plan.steps]
+    assert len(names) == len(set(names))
+    for position, metric in enumerate(plan.steps):
+        for source in metric.inputs:
+            assert source in SOURCES or names.index(source) < position
+
+
+def test_only_needed_steps_are_planned():
+    plan = MetricPlan(('mattr',))
+    names = {metric.name for metric in plan.steps}
+    assert names == set(REQUIRED_METRICS) | {'mattr'}
+    assert plan.metrics == tuple(name for name in ALL_METRICS if name in names)
+    assert not plan.uses_morphology
+
+
+def test_intermediate_data_is_computed_but_not_returned():
+    plan = MetricPlan(('noun_density',))
+    assert 'pos_densities' in {metric.name for metric in plan.steps}
+    assert plan.uses_morphology
+    values = MetricPlan(('minhash',)).compute(Profiler(enabled=False), tokens=EncodedText(TEXT, Vocabulary()),
+                                              pos_cache=None)
+    # Биграммы нужны подписи MinHash, но в результат без набора ngrams не входят
+    assert 'minhash' in values and 'bigram_freq' not in values
+
+
+def test_plan_values_match_direct_calls():
+    tokens = EncodedText(TEXT, Vocabulary())
+    values = MetricPlan(METRIC_SETS['basic'] + METRIC_SETS['diversity']).compute(
+        Profiler(enabled=False), tokens=tokens, pos_cache=None)
+    for name, value in values.items():
+        metric = METRICS[name]
+        if metric.inputs == ('tokens',):
+            assert metric.compute(tokens) == value, name
+    assert values['most_common'] == [('вода', 2)]
+
+
+def test_parse_metrics_sets_and_names():
+    assert parse_metrics('all') == ALL_METRICS
+    default = parse_metrics('default')
+    assert 'mattr' in default and 'minhash' in default and 'bigram_freq' not in default
+    assert parse_metrics('basic, mattr,') == tuple(
+        name for name in ALL_METRICS if name in set(METRIC_SETS['basic']) | {'mattr'} | set(REQUIRED_METRICS))
+    with pytest.raises(ValueError):
+        parse_metrics('basic,nonsense')
+    with pytest.raises(ValueError):
+        MetricPlan(('nonsense',))
+
+
+def test_covers_and_select():
+    plan = get_plan(parse_metrics('basic'))
+    assert get_plan(parse_metrics('basic')) is plan
+    assert plan.covers(None) and plan.covers(ALL_METRICS)
+    assert not plan.covers(REQUIRED_METRICS)
+    result = {'filename': 'a.txt', 'word_count': 3, 'mattr': 0.5}
+    assert plan.select(result) == {'filename': 'a.txt', 'word_count': 3}
+    full = get_plan()
+    assert full.select(result) is result
+
+
+def test_stages_are_timed_once_per_run_of_steps():
+    profiler = Profiler()
+    get_plan(parse_metrics('basic,diversity')).compute(profiler, tokens=EncodedText(TEXT, Vocabulary()),
+                                                       pos_cache=None)
+    assert set(profiler.stages) == {'tokenize', 'metrics'}
@@ -0,0 +1,79 @@
+"""N-граммы: подсчёт со сбросом на диск совпадает с подсчётом в памяти."""
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from ngram_utils import NgramCounter, NgramStore, write_ngrams
+
+WORDS = ['вода', 'нити', 'свобода', 'есть', 'друг', 'друга', 'спал', 'некрасов']
+
+
+def random_tables(seed, texts=30):
+    """Таблицы биграмм текстов и их области (авторы)."""
+    rng = random.Random(seed)
+    tables = []
+    for _ in range(texts):
+        scope = rng.choice(['Лимонов', 'Некрасов', 'Сапгир'])
+        table = Counter()
+        for _ in range(rng.randrange(1, 40)):
+            table[f'{rng.choice(WORDS)} {rng.choice(WORDS)}'] += rng.randint(1, 3)
+        tables.append((scope, table))
+    return tables
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('max_items', [1, 7, 100, 10 ** 6])
+def test_spilled_counts_match_in_memory(tmp_path, seed, max_items):
+    tables = random_tables(seed)
+    expected = {}
+    for scope, table in tables:
+        for gram, count in table.items():
+            expected.setdefault(gram, Counter())[scope] += count
+
+    counter = NgramCounter(max_items=max_items, folder=str(tmp_path))
+    for scope, table in tables:
+        counter.add(scope, table.items(), {})
+    if max_items < 100:
+        assert counter.runs
+    merged = list(counter.iter_ngrams())
+    counter.close()
+
+    assert [gram for gram, _ in merged] == sorted(expected)
+    assert {gram: Counter(dict(scopes)) for gram, scopes in merged} == expected
+    # Серии удалены
+    assert os.listdir(tmp_path) == []
+
+
+def test_write_ngrams_does_not_depend_on_memory_limit(tmp_path):
+    results = []
+    for i, (scope, table) in enumerate(random_tables(11)):
+        words = Counter(word for gram in table for word in gram.split())
+        results.append({'filename': f'{i}.txt', 'author': scope, 'word_freq': words,
+                        'bigram_freq': table, 'top_ngrams': []})
+    outputs = []
+    for max_items in (3, 10 ** 6):
+        path = str(tmp_path / f'ngrams{max_items}.csv')
+        write_ngrams(results, path, max_items=max_items, folder=str(tmp_path))
+        with open(path, encoding='utf-8') as f:
+            outputs.append(f.read())
+    assert outputs[0] == outputs[1]
+    assert 'вода' in outputs[0]
+
+
+def test_write_ngrams_skipped_without_summaries(tmp_path):
+    path = str(tmp_path / 'ngrams.csv')
+    assert write_ngrams([{'filename': 'a.txt', 'word_freq': Counter()}], path) is None
+    assert not os.path.exists(path)
+
+
+def test_store_round_trip_and_prune(tmp_path):
+    store = NgramStore(str(tmp_path / 'store'))
+    store.save('a', [{'вода вода': 3}, {'вода вода вода': 2}])
+    store.save('b', [{'нити нити': 1}])
+    assert store.has('a') and not store.has('c') and not store.has(None)
+    assert list(store.iter_items('a')) == [('вода вода', 3), ('вода вода вода', 2)]
+    assert list(store.iter_items('c')) == []
+    store.prune({'a'})
+    assert store.has('a') and not store.has('b')
@@ -0,0 +1,110 @@
+"""Частые слова и словарь корпуса: Space-Saving и HyperLogLog в пределах заявленной ошибки."""
+import random
+from collections import Counter
+
+import pytest
+
+import main
+from sketch_utils import DistinctSet, HyperLogLog, SpaceSaving, new_distinct_counter
+
+
+def words(start, stop):
+    return [f'слово{i}' for i in range(start, stop)]
+
+
+def zipf_stream(seed, size):
+    rng = random.Random(seed)
+    population = words(0, 300)
+    return rng.choices(population, weights=[1 / (rank + 1) for rank in range(len(population))], k=size)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_merged_space_saving_keeps_bounds(seed):
+    streams = [zipf_stream(seed * 10 + part, 3000) for part in range(3)]
+    sketches = []
+    for stream in streams:
+        sketch = SpaceSaving(40)
+        for item in stream:
+            sketch.add(item)
+        sketches.append(sketch)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    exact = Counter(item for stream in streams for item in stream)
+    total = sum(exact.values())
+
+    assert len(merged.counts) == 40
+    for item, count in merged.counts.items():
+        # Счётчик — верхняя оценка, счётчик минус ошибка — нижняя
+        assert count - merged.errors[item] <= exact[item] <= count
+    # Частые элементы (чаще N / capacity) не теряются при объединении
+    assert all(item in merged.counts for item, count in exact.items() if count > total / 40)
+
+
+def test_merge_of_unfilled_tables_is_exact():
+    first, second = SpaceSaving(10), SpaceSaving(10)
+    first.update({'а': 3, 'б': 1})
+    second.update({'б': 2, 'в': 5})
+    first.merge(second)
+    assert first.most_common() == [('в', 5), ('а', 3), ('б', 3)]
+    assert set(first.errors.values()) == {0}
+
+
+@pytest.mark.parametrize('precision', [4, 5, 6, 10, 12, 14])
+@pytest.mark.parametrize('cardinality', [50, 2000, 60000])
+def test_estimate_within_error_bound(precision, cardinality):
+    sketch = HyperLogLog(precision)
+    sketch.update(words(0, cardinality))
+    # Повторы не меняют оценку
+    sketch.update(words(0, cardinality // 2))
+    # Три стандартные ошибки: хэш детерминирован, поэтому тест не «мигает»
+    assert abs(sketch.count() - cardinality) <= 3 * sketch.relative_error * cardinality + 1
+
+
+@pytest.mark.parametrize('precision, alpha', [(4, 0.673), (5, 0.697), (6, 0.709), (7, 0.7213 / (1 + 1.079 / 128))])
+def test_small_register_counts_use_their_alpha(precision, alpha):
+    sketch = HyperLogLog(precision)
+    size = len(sketch.registers)
+    # Все регистры равны 10: оценка — alpha · m² / (m · 2^-10)
+    sketch.registers = bytearray([10] * size)
+    assert sketch.count() == round(alpha * size * 1024)
+
+
+def test_merge_is_union():
+    first, second, both = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+    first.update(words(0, 3000))
+    second.update(words(2000, 5000))
+    both.update(words(0, 5000))
+    first.merge(second)
+    assert first.registers == both.registers
+
+
+def test_precision_is_checked():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+
+def test_exact_counter_and_factory():
+    counter = new_distinct_counter()
+    assert isinstance(counter, DistinctSet)
+    counter.update(['а', 'б', 'а'])
+    other = DistinctSet()
+    other.update(['б', 'в'])
+    counter.merge(other)
+    assert counter.count() == 3
+    assert isinstance(new_distinct_counter(12), HyperLogLog)
+
+
+def test_corpus_vocabulary_is_distinct_words_not_sum():
+    results = [
+        {'author': 'А', 'word_freq': {'вода': 2, 'нити': 1}, 'stopwords_found': ['и']},
+        {'author': 'А', 'word_freq': {'вода': 1}, 'stopwords_found': []},
+        {'author': 'Б', 'word_freq': {'нити': 1, 'свобода': 1}, 'stopwords_found': ['и']},
+    ]
+    exact = main.count_vocabulary(results)
+    assert exact['corpus'].count() == 4
+    assert {author: counter.count() for author, counter in exact['authors'].items()} == {'А': 3, 'Б': 3}
+    approximate = main.count_vocabulary(results, precision=12)
+    assert round(approximate['corpus'].count()) == 4
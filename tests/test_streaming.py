@@ -0,0 +1,96 @@
+"""Потоковый разбор больших файлов даёт те же метрики, что и разбор в памяти."""
+import os
+import random
+
+import pytest
+
+import main
+import file_utils
+from text_utils import (TokenizedText, EncodedText, StreamingTextStats, Vocabulary, count_words,
+                        count_unique_words, calculate_ttr, count_word_frequencies, find_stopwords,
+                        count_lines, average_word_length, count_ngrams)
+
+METRICS = (count_words, count_unique_words, calculate_ttr, count_word_frequencies, find_stopwords,
+           count_lines, average_word_length)
+
+WORDS = ['слово', 'Слово', 'вода', 'в', 'и', '—', 'İstanbul', 'ёлка', 'a-b', 'x']
+SEPARATORS = [' ', '  ', '\n', '\r\n', '\t', ' ', '\x1c']
+
+
+def random_text(rng, size):
+    parts = []
+    for _ in range(size):
+        parts.append(rng.choice(WORDS + [f'w{rng.randrange(50)}']))
+        parts.append(rng.choice(SEPARATORS))
+    return ''.join(parts[:rng.randrange(len(parts) + 1)])
+
+
+def stream(text, rng, vocabulary, **kwargs):
+    """Подаёт текст частями случайной длины (слова и \\r\\n разрезаются границами)."""
+    stats = StreamingTextStats(vocabulary, **kwargs)
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 40)
+        stats.feed(text[position:position + size])
+        position += size
+    stats.finish()
+    return stats
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_chunked_counts_match_in_memory(seed):
+    rng = random.Random(seed)
+    text = random_text(rng, rng.randrange(300))
+    vocabulary = Vocabulary()
+    stats = stream(text, rng, vocabulary)
+    expected = TokenizedText(text)
+    for metric in METRICS:
+        assert metric(stats) == metric(expected), metric.__name__
+    assert stats.morph_counts == expected.morph_counts
+    for n in (2, 3):
+        assert count_ngrams(stats, n) == count_ngrams(EncodedText(text, vocabulary), n)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_encoded_counts_match_tokenized(seed):
+    rng = random.Random(seed)
+    text = random_text(rng, rng.randrange(300))
+    encoded = EncodedText(text, Vocabulary())
+    expected = TokenizedText(text)
+    for metric in METRICS:
+        assert metric(encoded) == metric(expected), metric.__name__
+    # Метрики считаются по номерам: строки собираются только для выходных таблиц
+    assert 'counts' not in vars(encoded)
+    assert encoded.counts == expected.counts
+    assert list(encoded.counts) == list(expected.counts)
+
+
+@pytest.mark.parametrize('text, lines', [
+    ('', 0),
+    ('один', 1),
+    ('один\n', 1),
+    ('один\r\nдва', 2),
+    ('один\r\n\r\n', 2),
+    ('\n\n\n', 3),
+    ('один\rдва три', 3),
+])
+def test_line_breaks_split_between_chunks(text, lines):
+    assert len(text.splitlines()) == lines
+    for cut in range(len(text) + 1):
+        stats = StreamingTextStats(Vocabulary())
+        stats.feed(text[:cut])
+        stats.feed(text[cut:])
+        stats.finish()
+        assert stats.line_count == lines, cut
+
+
+def test_streamed_file_matches_in_memory_analysis(tmp_path, monkeypatch):
+    # Маленькие части: в файле много границ частей
+    monkeypatch.setattr(main, 'iter_text_chunks', lambda path: file_utils.iter_text_chunks(path, 64))
+    rng = random.Random(7)
+    path = tmp_path / 'big.txt'
+    path.write_text('\n'.join(random_text(rng, 200) for _ in range(50)), encoding='utf-8')
+    metrics = main.parse_metrics('all')
+    in_memory = main.analyze_single_text(str(path), 'big.txt', stream_threshold=None, metrics=metrics)
+    streamed = main.analyze_single_text(str(path), 'big.txt', stream_threshold=0, metrics=metrics)
+    assert streamed == in_memory